@@ -0,0 +1,49 @@
+"""Per-event cost of drawing 1000 negative candidates in the evaluation protocol.
+
+Usage: python benchmarks/bench_candidate_sampler.py [n_item] [n_event] [maxlen]
+
+Replays a synthetic stream (item popularity ~ 1/sqrt(rank)) through BufferSampler
+and PoolSampler, and prints the mean time of `sample` over the last events.
+BufferSampler rebuilds and shuffles the whole set of buffered items on every call,
+while PoolSampler draws from an incrementally maintained pool by rejection.
+"""
+import sys
+import time
+
+import numpy as np
+
+from flurs.candidate_sampler import BufferSampler, PoolSampler
+from flurs.data.entity import User, Item, Event
+
+
+def main(n_item=50000, n_event=200000, maxlen=0, n_user=5000, n_sample=200):
+    maxlen = maxlen or None
+
+    rng = np.random.RandomState(0)
+    p = 1. / np.sqrt(np.arange(1, n_item + 1))
+    items = rng.choice(n_item, n_event, p=p / p.sum())
+    users = [User(u) for u in range(n_user)]
+    events = [Event(users[u], Item(i)) for u, i in zip(rng.randint(0, n_user, n_event), items)]
+
+    for e in events:
+        e.user.known_item(e.item.index)
+
+    for sampler in [BufferSampler(maxlen), PoolSampler(maxlen)]:
+        start = time.perf_counter()
+        for e in events:
+            sampler.observe(e)
+        observe_time = time.perf_counter() - start
+
+        targets = events[-n_sample:]
+        start = time.perf_counter()
+        for e in targets:
+            candidates = sampler.sample(e)
+        sample_time = time.perf_counter() - start
+
+        assert len(candidates) == 1000
+        print('{:>13s}: observe {:.2f} us/event, sample {:.3f} ms/event'.format(
+            sampler.__class__.__name__, observe_time / n_event * 1e6, sample_time / n_sample * 1e3))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
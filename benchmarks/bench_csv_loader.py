@@ -0,0 +1,50 @@
+"""Memory and time of csv_loader with Event objects vs. the columnar mode.
+
+Usage: python benchmarks/bench_csv_loader.py [n_line] [n_user] [n_item]
+
+Writes a synthetic `user_id,item_id,rating,timestamp` file and loads it both ways,
+printing the wall-clock time and the peak of traced allocations per line.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from flurs.datasets import csv_loader
+
+
+def measure(path, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    data = csv_loader(path, **kwargs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return data, elapsed, current, peak
+
+
+def main(n_line=1000000, n_user=6040, n_item=3706):
+    rng = np.random.RandomState(0)
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    with os.fdopen(fd, 'w') as f:
+        for u, i, r, t in zip(rng.randint(n_user, size=n_line), rng.randint(n_item, size=n_line),
+                              rng.randint(1, 6, size=n_line), 956703932 + np.arange(n_line)):
+            f.write('{},{},{},{}\n'.format(u, i, r, t))
+
+    try:
+        for name, kwargs in [('events', {}), ('columnar', {'columnar': True})]:
+            data, elapsed, current, peak = measure(path, **kwargs)
+            assert data.n_sample == n_line
+            print('{:>9s}: {:.2f} s, {:.0f} bytes/line retained, {:.0f} bytes/line peak'.format(
+                name, elapsed, current / n_line, peak / n_line))
+            del data
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
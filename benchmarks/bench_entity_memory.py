@@ -0,0 +1,77 @@
+"""Memory per event of the loaded MovieLens-1M stream.
+
+Usage: python benchmarks/bench_entity_memory.py [data_home]
+
+Loads ML-1M with `fetch_movielens` (and its ratings with `csv_loader`) and prints the
+traced memory retained per event. Without `data_home`, files with the shape of ML-1M
+(1,000,209 ratings by 6,040 users on 3,706 movies) are synthesized in a temporary directory.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+from flurs.datasets import csv_loader, fetch_movielens
+
+GENRES = ['Action', 'Adventure', 'Animation', "Children's", 'Comedy', 'Crime', 'Documentary', 'Drama',
+          'Fantasy', 'Film-Noir', 'Horror', 'Musical', 'Mystery', 'Romance', 'Sci-Fi', 'Thriller', 'War',
+          'Western']
+
+
+def synthesize(data_home, n_rating=1000209, n_user=6040, n_movie=3706):
+    rng = np.random.RandomState(0)
+    with open(os.path.join(data_home, 'users.dat'), 'w') as f:
+        for u in range(1, n_user + 1):
+            f.write('{}::{}::{}::{}::00000\n'.format(u, 'MF'[rng.randint(2)], [1, 18, 25, 35, 45, 50, 56][rng.randint(7)],
+                                                      rng.randint(21)))
+    with open(os.path.join(data_home, 'movies.dat'), 'w') as f:
+        for i in range(1, n_movie + 1):
+            genres = '|'.join(rng.choice(GENRES, rng.randint(1, 4), replace=False))
+            f.write('{}::Movie {} (2000)::{}\n'.format(i, i, genres))
+    with open(os.path.join(data_home, 'ratings.dat'), 'w') as f:
+        for u, i, r, t in zip(rng.randint(1, n_user + 1, n_rating), rng.randint(1, n_movie + 1, n_rating),
+                              rng.randint(1, 6, n_rating), 956703932 + np.sort(rng.randint(0, 10 ** 8, n_rating))):
+            f.write('{}::{}::{}::{}\n'.format(u, i, r, t))
+
+
+def retained(load):
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    data = load()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return data, after - before
+
+
+def main(data_home=None):
+    tmp = None
+    if data_home is None:
+        tmp = data_home = tempfile.mkdtemp()
+        synthesize(data_home)
+
+    try:
+        data, size = retained(lambda: fetch_movielens(data_home, size='1m'))
+        print('fetch_movielens: {} events, {:.0f} bytes/event'.format(data.n_sample, size / data.n_sample))
+        del data
+
+        # csv_loader reads `user,item,rating,timestamp` lines
+        path = os.path.join(tempfile.mkdtemp(dir=tmp), 'ratings.csv') if tmp else tempfile.mktemp(suffix='.csv')
+        with open(os.path.join(data_home, 'ratings.dat')) as src, open(path, 'w') as dst:
+            for line in src:
+                dst.write(line.replace('::', ','))
+        for name, kwargs in [('csv_loader', {}), ('csv_loader(columnar)', {'columnar': True})]:
+            data, size = retained(lambda: csv_loader(path, **kwargs))
+            print('{}: {} events, {:.0f} bytes/event'.format(name, data.n_sample, size / data.n_sample))
+            del data
+        if not tmp:
+            os.remove(path)
+    finally:
+        if tmp:
+            shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
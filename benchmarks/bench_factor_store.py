@@ -0,0 +1,41 @@
+"""Registration cost of MFRecommender as the item catalog grows.
+
+Usage: python benchmarks/bench_factor_store.py [n_item]
+
+Prints the mean wall-clock time of `register_item` in consecutive blocks.
+With the capacity-doubling factor store the cost per registration stays flat
+(apart from the occasional reallocation) instead of growing linearly with the
+number of registered items.
+"""
+import sys
+import time
+
+import numpy as np
+
+from flurs.data.entity import Item
+from flurs.forgetting import NoForgetting
+from flurs.recommender import MFRecommender
+
+
+def main(n_item=2 ** 21, k=40, n_block=8):
+    rec = MFRecommender(k, .01, .02, NoForgetting(), 0)
+    rec.initialize()
+
+    block = n_item // n_block
+    for b in range(n_block):
+        items = [Item(i) for i in range(b * block, (b + 1) * block)]
+
+        start = time.perf_counter()
+        for item in items:
+            rec.register_item(item)
+        elapsed = time.perf_counter() - start
+
+        print('items {:>9d}-{:>9d}: {:.3f} us/registration (capacity={})'.format(
+            b * block, (b + 1) * block, elapsed / block * 1e6, rec.item_factors.capacity))
+
+    assert rec.B.shape == (n_block * block, k)
+    assert np.all(np.isfinite(rec.B))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,52 @@
+"""Ingestion rate of MatrixFactorization: per-event `update_model` vs. `update_batch`.
+
+Usage: python benchmarks/bench_mf_batch.py [n_event] [block_size]
+
+Item popularity follows a long-tailed power law (the most popular item covers
+about 1% of events, similar to MovieLens), so blocks contain repeated users and
+items just like the shuffled `Evaluator.fit` pre-training chunks do.
+"""
+import sys
+import time
+
+import numpy as np
+
+from flurs.data.entity import User, Item
+from flurs.forgetting import NoForgetting
+from flurs.recommender import MFRecommender
+
+
+def create(n_user, n_item, k):
+    rec = MFRecommender(k, .01, .02, NoForgetting(), 0)
+    rec.initialize()
+    rec.register_user(User(n_user - 1))
+    rec.register_item(Item(n_item - 1))
+    return rec
+
+
+def main(n_event=200000, block_size=10000, n_user=6000, n_item=4000, k=40):
+    rng = np.random.RandomState(0)
+    users = rng.randint(n_user, size=n_event)
+    popularity = 1. / np.sqrt(np.arange(1, n_item + 1))
+    items = rng.choice(n_item, size=n_event, p=popularity / popularity.sum())
+    ratings = np.ones(n_event)
+
+    rec = create(n_user, n_item, k)
+    n = min(n_event, 20000)
+    start = time.perf_counter()
+    for ua, ia, rating in zip(users[:n], items[:n], ratings[:n]):
+        rec.update_model(ua, ia, rating)
+    sequential = n / (time.perf_counter() - start)
+    print('update_model: {:>10.0f} events/sec'.format(sequential))
+
+    rec = create(n_user, n_item, k)
+    start = time.perf_counter()
+    for head in range(0, n_event, block_size):
+        tail = head + block_size
+        rec.update_batch(users[head:tail], items[head:tail], ratings[head:tail])
+    batch = n_event / (time.perf_counter() - start)
+    print('update_batch: {:>10.0f} events/sec (block_size={}, x{:.1f})'.format(batch, block_size, batch / sequential))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,64 @@
+"""Events/sec of the MF/BRISMF SGD step: pure Python vs. numba kernels.
+
+Usage: python benchmarks/bench_mf_kernels.py [n_event] [k]
+
+For each forgetting technique, `update_model` is timed with `use_jit=False`
+and `use_jit=True`, and `update_batch` with the compiled in-order kernel.
+Compilation happens in a warm-up run which is excluded from the timing.
+"""
+import sys
+import time
+
+import numpy as np
+
+from flurs.data.entity import User, Item
+from flurs.forgetting import NoForgetting, UserFactorFading, SDUserFactorFading, MappedUserFactorFading, ForgetUnpopularItems
+from flurs.recommender import MFRecommender, BRISMFRecommender
+
+
+def create(Recommender, Forgetting, use_jit, n_user, n_item, k):
+    rec = Recommender(k, .01, .02, Forgetting(), 0, use_jit=use_jit)
+    rec.initialize()
+    rec.register(User(n_user - 1))
+    rec.register(Item(n_item - 1))
+    return rec
+
+
+def events_per_sec(rec, users, items, ratings):
+    start = time.perf_counter()
+    for ua, ia, rating in zip(users, items, ratings):
+        rec.update_model(ua, ia, rating)
+    return len(users) / (time.perf_counter() - start)
+
+
+def main(n_event=50000, k=40, n_user=6000, n_item=4000):
+    rng = np.random.RandomState(0)
+    users = rng.randint(n_user, size=n_event)
+    items = rng.randint(n_item, size=n_event)
+    ratings = np.ones(n_event)
+
+    print('{:<18s} {:<24s} {:>12s} {:>12s} {:>8s} {:>14s}'.format(
+        'recommender', 'forgetting', 'python', 'jit', 'x', 'jit batch'))
+
+    for Recommender in [MFRecommender, BRISMFRecommender]:
+        for Forgetting in [NoForgetting, UserFactorFading, SDUserFactorFading, MappedUserFactorFading, ForgetUnpopularItems]:
+            python = events_per_sec(create(Recommender, Forgetting, False, n_user, n_item, k), users, items, ratings)
+
+            # warm up (compile) before timing
+            events_per_sec(create(Recommender, Forgetting, True, n_user, n_item, k), users[:10], items[:10], ratings[:10])
+            jit = events_per_sec(create(Recommender, Forgetting, True, n_user, n_item, k), users, items, ratings)
+
+            batch = ''
+            if hasattr(Recommender, 'update_batch'):
+                rec = create(Recommender, Forgetting, True, n_user, n_item, k)
+                rec.update_batch(users[:10], items[:10], ratings[:10])
+                start = time.perf_counter()
+                rec.update_batch(users, items, ratings)
+                batch = '{:.0f}'.format(n_event / (time.perf_counter() - start))
+
+            print('{:<18s} {:<24s} {:>12.0f} {:>12.0f} {:>8.1f} {:>14s}'.format(
+                Recommender.__name__, Forgetting.__name__, python, jit, jit / python, batch))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,70 @@
+"""Accuracy and ingestion rate of the sketches: OnlineSketch (exact/buffered) vs. OnlineRandomSketch.
+
+Usage: python benchmarks/bench_online_sketch.py [k] [ell] [n_event] [block_size]
+
+Inputs are drawn around a 2 ell dimensional subspace with decaying weights plus
+isotropic noise, and fed one by one (`update_model`) or in blocks (`update_batch`).
+The accuracy is the covariance error ||A A^T - B B^T||_2 / ||A||_F^2 of the sketch B
+over the normalized inputs A (Frequent Directions bounds it by 1 / ell), and the
+share of the energy of A captured by U_r relative to the best rank-r subspace.
+"""
+import sys
+import time
+
+import numpy as np
+
+from flurs.model import OnlineSketch, OnlineRandomSketch
+
+
+def accuracy(sketch, A):
+    B = sketch.B[:, :sketch.n_filled]
+    cov_err = np.linalg.norm(A.dot(A.T) - B.dot(B.T), 2) / A.shape[1]
+
+    s = np.linalg.svd(A, compute_uv=False)
+    captured = np.sum(sketch.U_r.T.dot(A) ** 2) / np.sum(s[:sketch.r] ** 2)
+    return cov_err, captured
+
+
+def main(k=1000, ell=100, n_event=20000, block_size=500):
+    rng = np.random.RandomState(0)
+    basis = np.linalg.qr(rng.normal(size=(k, 2 * ell)))[0]
+    weights = 1. / np.sqrt(np.arange(1, 2 * ell + 1))
+    Y = (basis * weights).dot(rng.normal(size=(2 * ell, n_event))) + .05 * rng.normal(size=(k, n_event))
+    A = Y / np.linalg.norm(Y, axis=0)
+
+    sketches = [('OnlineSketch(exact)', lambda: OnlineSketch(p=k, ell=ell)),
+                ('OnlineSketch(buffered)', lambda: OnlineSketch(p=k, ell=ell, mode='buffered')),
+                ('OnlineRandomSketch', lambda: OnlineRandomSketch(p=k, ell=ell))]
+
+    for name, create in sketches:
+        np.random.seed(0)
+        sketch = create()
+
+        # the exact mode is only timed on a prefix of the stream
+        n = min(n_event, 1000) if sketch.mode == 'exact' else n_event
+        start = time.perf_counter()
+        for t in range(n):
+            sketch.update_model(Y[:, t])
+        rate = n / (time.perf_counter() - start)
+        for t in range(n, n_event):
+            sketch.update_model(Y[:, t])
+        cov_err, captured = accuracy(sketch, A)
+        print('{:<24} update_model: {:>8.0f} events/sec, cov. error {:.4f}, captured {:.3f}'.format(
+            name, rate, cov_err, captured))
+
+        if sketch.mode == 'exact':
+            continue
+
+        np.random.seed(0)
+        sketch = create()
+        start = time.perf_counter()
+        for head in range(0, n_event, block_size):
+            sketch.update_batch(Y[:, head:head + block_size])
+        rate = n_event / (time.perf_counter() - start)
+        cov_err, captured = accuracy(sketch, A)
+        print('{:<24} update_batch: {:>8.0f} events/sec, cov. error {:.4f}, captured {:.3f}'.format(
+            name, rate, cov_err, captured))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
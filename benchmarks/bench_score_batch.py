@@ -0,0 +1,66 @@
+"""Throughput of per-user `recommend` vs. `recommend_batch` for MFRecommender.
+
+Usage: python benchmarks/bench_score_batch.py [n_user] [n_item] [batch_size]
+
+Serves top-10 recommendations over the full catalog (as the Faust example does)
+for `n_user` users, either one user at a time or in blocks of `batch_size` users
+scored by a single GEMM. Also times per-user candidate lists given as CSR rows.
+"""
+import sys
+import timeit
+
+import numpy as np
+import scipy.sparse as sp
+
+from flurs.data.entity import User, Item
+from flurs.forgetting import NoForgetting
+from flurs.recommender import MFRecommender
+
+
+def best_of(f, repeat=5):
+    return min(timeit.repeat(f, number=1, repeat=repeat))
+
+
+def main(n_user=4096, n_item=1682, batch_size=256, k=40, n_candidate=200):
+    rec = MFRecommender(k, .01, .02, NoForgetting(), 0)
+    rec.initialize()
+    users = [User(u) for u in range(n_user)]
+    for user in users:
+        rec.register(user)
+    for i in range(n_item):
+        rec.register(Item(i))
+
+    candidates = np.arange(n_item)
+
+    def one_by_one():
+        for user in users:
+            rec.recommend(user, candidates, top_n=10)
+
+    def batched():
+        for b in range(0, n_user, batch_size):
+            rec.recommend_batch(users[b:b + batch_size], candidates, top_n=10)
+
+    single = best_of(one_by_one)
+    batch = best_of(batched)
+
+    print('full catalog: {:.0f} users/s one by one, {:.0f} users/s in batches of {} ({:.1f}x)'.format(
+        n_user / single, n_user / batch, batch_size, single / batch))
+
+    rng = np.random.RandomState(0)
+    indices = np.concatenate([rng.choice(n_item, n_candidate, replace=False) for _ in range(batch_size)])
+    indptr = np.arange(batch_size + 1) * n_candidate
+    csr = sp.csr_matrix((np.ones(indices.size), indices, indptr), shape=(batch_size, n_item))
+
+    def one_by_one_csr():
+        for u, user in enumerate(users[:batch_size]):
+            rec.score(user, indices[indptr[u]:indptr[u + 1]])
+
+    single = best_of(one_by_one_csr)
+    batch = best_of(lambda: rec.score_batch(users[:batch_size], csr))
+
+    print('{} candidates per user (CSR): {:.0f} users/s one by one, {:.0f} users/s batched ({:.1f}x)'.format(
+        n_candidate, batch_size / single, batch_size / batch, single / batch))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,92 @@
+"""OnlineSparseSketch vs. the dense buffered OnlineSketch on feature-hashed events.
+
+Usage: python benchmarks/bench_sparse_sketch.py [n_event] [ell] [log2_p] [buffer_size] [block_size]
+
+Every event is the user, the item, and five categorical context fields, each value
+hashed by `feature_hash` into a single 2^log2_p dimensional space (without projection,
+i.e. k = p), so that an input has seven nonzero entries. The accuracy is the covariance
+error ||A A^T - B B^T||_2 / ||A||_F^2 of the sketch B over the normalized inputs A, which
+Frequent Directions bounds by 1 / ell. The sparse sketch merges its buffer every `buffer_size`
+events within the timed stream; the events left in the buffer are merged afterwards for the
+accuracy. The dense sketch is only timed on a prefix.
+"""
+import sys
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import LinearOperator, eigsh
+
+from flurs.model import OnlineSketch, OnlineSparseSketch
+from flurs.utils.feature_hash import feature_hash
+
+
+def hashed_events(n_event, p, rng):
+    fields = [('user', 5000), ('item', 3000), ('hour', 24), ('weekday', 7), ('device', 5), ('city', 500), ('genre', 20)]
+
+    indices = []
+    for name, n_value in fields:
+        popularity = 1. / np.arange(1, n_value + 1)
+        values = rng.choice(n_value, n_event, p=popularity / popularity.sum())
+
+        # hash each distinct value once
+        table = {v: np.flatnonzero(feature_hash('%s=%d' % (name, v), p))[0] for v in np.unique(values).tolist()}
+        indices.append([table[v] for v in values.tolist()])
+
+    indices = np.array(indices).T.ravel()
+    indptr = np.arange(0, indices.size + 1, len(fields))
+    Y = sp.csc_matrix((np.ones(indices.size), indices, indptr), shape=(p, n_event))
+    Y.sum_duplicates()
+    return Y
+
+
+def covariance_error(A, B):
+    M = LinearOperator((A.shape[0], A.shape[0]), dtype=float,
+                       matvec=lambda x: A.dot(A.T.dot(np.ravel(x))) - B.dot(B.T.dot(np.ravel(x))))
+    return np.abs(eigsh(M, k=1, which='LM', return_eigenvectors=False)[0]) / A.shape[1]
+
+
+def report(name, sketch, rate, A):
+    n_pending = sketch.n_pending
+    sketch.flush()
+    cov_err = covariance_error(A, sketch.B[:, :sketch.n_filled])
+    print('{:<34} {:>8.0f} events/sec, cov. error {:.4f} (bound {:.4f}), {} merges, {} spectral tests, '
+          '{} events left in the buffer'.format(name, rate, cov_err, 1. / sketch.ell, sketch.n_basis,
+                                               sketch.n_verify, n_pending))
+
+
+def main(n_event=20000, ell=8, log2_p=20, buffer_size=1000, block_size=100):
+    p = 2 ** log2_p
+    Y = hashed_events(n_event, p, np.random.RandomState(0))
+    norms = np.sqrt(np.ravel(Y.multiply(Y).sum(axis=0)))
+    A = Y.dot(sp.diags(1. / norms))
+
+    np.random.seed(0)
+    sketch = OnlineSparseSketch(p=p, ell=ell, buffer_size=buffer_size)
+    start = time.perf_counter()
+    for t in range(n_event):
+        sketch.update_model(Y[:, t])
+    rate = n_event / (time.perf_counter() - start)
+    report('OnlineSparseSketch update_model', sketch, rate, A)
+
+    np.random.seed(0)
+    sketch = OnlineSparseSketch(p=p, ell=ell, buffer_size=buffer_size)
+    start = time.perf_counter()
+    for head in range(0, n_event, block_size):
+        sketch.update_batch(Y[:, head:head + block_size])
+    rate = n_event / (time.perf_counter() - start)
+    report('OnlineSparseSketch update_batch', sketch, rate, A)
+
+    # every input is densified to p entries, and the (p, 2 ell) buffer is decomposed every ell events
+    sketch = OnlineSketch(p=p, ell=ell, mode='buffered')
+    n = min(n_event, 10 * ell)
+    start = time.perf_counter()
+    for t in range(n):
+        sketch.update_model(Y[:, t])
+    sketch.U_r
+    rate = n / (time.perf_counter() - start)
+    print('{:<34} {:>8.0f} events/sec'.format('OnlineSketch(buffered) update_model', rate))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,68 @@
+"""Latency of UserKNNRecommender.score against a per-candidate loop over the neighbors.
+
+Usage: python benchmarks/bench_user_knn_score.py [n_candidate] [k] [n_user] [n_item] [n_event]
+
+Feeds a synthetic rating stream (item popularity ~ 1/sqrt(rank)) to the recommender and
+scores `n_candidate` items for users having `k` neighbors, either by gathering the
+neighbors' ratings at once (`score`) or by looking up every (candidate, neighbor) pair.
+"""
+import sys
+import timeit
+
+import numpy as np
+
+from flurs.data.entity import User, Item, Event
+from flurs.recommender import UserKNNRecommender
+
+
+def best_of(f, repeat=5, number=20):
+    return min(timeit.repeat(f, number=number, repeat=repeat)) / number
+
+
+def loop_score(rec, user, candidates):
+    top_uys, top_S = rec.neighbors[user.index]
+    denom = np.sum(top_S)
+    pred = np.full(len(candidates), rec.means[user.index])
+    for pi, ii in enumerate(candidates.tolist()):
+        raters = rec.item_ratings.get(ii, {})
+        numer = 0.
+        for uy, s in zip(top_uys.tolist(), top_S.tolist()):
+            if uy in raters:
+                numer += (raters[uy] - rec.means[uy]) * s
+        if denom != 0.:
+            pred[pi] += numer / denom
+    return np.abs(pred)
+
+
+def main(n_candidate=1000, k=50, n_user=2000, n_item=3000, n_event=100000):
+    rec = UserKNNRecommender(k=k)
+    rec.initialize()
+    users = [User(u) for u in range(n_user)]
+    for user in users:
+        rec.register(user)
+    for i in range(n_item):
+        rec.register(Item(i))
+
+    rng = np.random.RandomState(0)
+    p = 1. / np.sqrt(np.arange(1, n_item + 1))
+    items = rng.choice(n_item, n_event, p=p / p.sum())
+    for u, i, r in zip(rng.randint(0, n_user, n_event).tolist(), items.tolist(), rng.randint(1, 6, n_event).tolist()):
+        rec.update(Event(users[u], Item(i), float(r)))
+
+    targets = [user for user in users if len(rec.neighbors[user.index][0]) == k][:10]
+    if not targets:
+        raise ValueError('no user has %d neighbors; feed more events' % k)
+    candidates = rng.choice(n_item, n_candidate, replace=False)
+
+    for user in targets:
+        assert np.allclose(rec.score(user, candidates), loop_score(rec, user, candidates))
+
+    vectorized = best_of(lambda: [rec.score(user, candidates) for user in targets]) / len(targets)
+    loop = best_of(lambda: [loop_score(rec, user, candidates) for user in targets], number=2) / len(targets)
+
+    print('{} candidates x {} neighbors: {:.1f} us vectorized, {:.1f} us looped ({:.1f}x)'.format(
+        n_candidate, k, vectorized * 1e6, loop * 1e6, loop / vectorized))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -24,12 +24,18 @@ for i in range(1, n_item + 1):
     recommender.register(Item(i - 1))
 
 
+candidates = np.arange(0, n_item)
+
+
 @app.agent(topic)
 async def process(stream):
-    async for obj in stream:
-        event = json.loads(obj)
-        if event['rating'] < 3:
+    # serve the events arrived within a second together by a single matrix product
+    async for objs in stream.take(256, within=1):
+        events = [json.loads(obj) for obj in objs]
+        events = [event for event in events if event['rating'] >= 3]
+        if not events:
             continue
-        user, item = User(event['user'] - 1), Item(event['item'] - 1)
-        print(recommender.recommend(user, np.arange(0, n_item)))
-        recommender.update(Event(user, item))
+        users = [User(event['user'] - 1) for event in events]
+        print(recommender.recommend_batch(users, candidates, top_n=10))
+        for user, event in zip(users, events):
+            recommender.update(Event(user, Item(event['item'] - 1)))
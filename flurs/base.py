@@ -1,6 +1,8 @@
 from .data.entity import User, Item
+from .utils.trace import Tracer
 
 import numpy as np
+import scipy.sparse as sp
 import logging
 
 
@@ -25,6 +27,7 @@ class RecommenderMixin(object):
 
         # create log configuration
         self.logger = logging.getLogger("experimenter.recommender")
+        self.trace = Tracer(self.logger)
 
     def is_new_user(self, u):
         """Check if user is new.
@@ -84,6 +87,19 @@ class RecommenderMixin(object):
         """
         pass
 
+    def update_events(self, events):
+        """Update model parameters based on a block of events.
+
+        Recommenders which support vectorized updates override this method;
+        by default, events are processed one by one.
+
+        Args:
+            events (list of Event): Observed events.
+
+        """
+        for e in events:
+            self.update(e)
+
     def score(self, user, candidates):
         """Compute scores for the pairs of given user and item candidates.
 
@@ -97,7 +113,7 @@ class RecommenderMixin(object):
         """
         return
 
-    def recommend(self, user, candidates):
+    def recommend(self, user, candidates, top_n=None):
         """Recommend items for a user represented as a dictionary d.
 
         First, scores are computed.
@@ -106,6 +122,7 @@ class RecommenderMixin(object):
         Args:
             user (User): Target user.
             candidates (numpy array; (# target items, )): Target items' indices. Only these items are considered as the recommendation candidates.
+            top_n (int): Only return the best `top_n` items, if given.
 
         Returns:
             (numpy array, numpy array) : (Sorted list of items, Sorted scores).
@@ -113,7 +130,69 @@ class RecommenderMixin(object):
         """
         return
 
-    def scores2recos(self, scores, candidates, rev=False):
+    def score_batch(self, users, candidates):
+        """Compute scores for many users at once.
+
+        Recommenders with a vectorized implementation override this method;
+        by default, users are scored one by one.
+
+        Args:
+            users (list of User): Target users.
+            candidates (numpy array; (# candidates, ) or scipy CSR matrix; (# users, # items)):
+                Target items' indices shared by all users, or candidate lists of each user
+                given by the column indices of the corresponding CSR row.
+
+        Returns:
+            numpy array; (# users, # candidates) or scipy CSR matrix; (# users, # items):
+            Scores; for CSR candidates, a CSR matrix with the same structure as `candidates`.
+
+        """
+        if not sp.issparse(candidates):
+            return np.array([self.score(user, candidates) for user in users]).reshape((len(users), len(candidates)))
+
+        indices, indptr = candidates.indices, candidates.indptr
+        data = np.zeros(indices.size)
+        for u, user in enumerate(users):
+            lo, hi = indptr[u], indptr[u + 1]
+            if hi > lo:
+                data[lo:hi] = self.score(user, indices[lo:hi])
+        return sp.csr_matrix((data, indices.copy(), indptr.copy()), shape=candidates.shape)
+
+    def recommend_batch(self, users, candidates, top_n=None):
+        """Recommend items for many users at once.
+
+        Args:
+            users (list of User): Target users.
+            candidates (numpy array; (# candidates, ) or scipy CSR matrix; (# users, # items)):
+                Same as `score_batch`.
+            top_n (int): Only return the best `top_n` items for each user, if given.
+
+        Returns:
+            (numpy array, numpy array) or list of (numpy array, numpy array):
+            (Sorted items, Sorted scores) as (# users, top_n) arrays, or a list of
+            per-user results (as `recommend`) for CSR candidates.
+
+        """
+        scores = self.score_batch(users, candidates)
+
+        if sp.issparse(scores):
+            indptr = scores.indptr
+            return [self.scores2recos(scores.data[lo:hi], candidates.indices[lo:hi], top_n=top_n)
+                    for lo, hi in zip(indptr[:-1], indptr[1:])]
+
+        n_candidate = scores.shape[1]
+        if top_n is not None and top_n <= 0:
+            sorted_indices = np.zeros((scores.shape[0], 0), dtype=int)
+        elif top_n is not None and top_n < n_candidate:
+            top_indices = np.argpartition(scores, n_candidate - top_n, axis=1)[:, n_candidate - top_n:]
+            order = np.argsort(np.take_along_axis(scores, top_indices, axis=1), axis=1)[:, ::-1]
+            sorted_indices = np.take_along_axis(top_indices, order, axis=1)
+        else:
+            sorted_indices = np.argsort(scores, axis=1)[:, ::-1]
+
+        return candidates[sorted_indices], np.take_along_axis(scores, sorted_indices, axis=1)
+
+    def scores2recos(self, scores, candidates, rev=False, top_n=None):
         """Get recommendation list for a user u_index based on scores.
 
         Args:
@@ -121,15 +200,48 @@ class RecommenderMixin(object):
                 Scores for the target items. Smaller score indicates a promising item.
             candidates (numpy array; (# target items, )): Target items' indices. Only these items are considered as the recommendation candidates.
             rev (bool): If true, return items in an descending order. A ascending order (i.e., smaller scores are more promising) is default.
+            top_n (int): Only return the best `top_n` items, if given.
+                They are selected in O(n_target_items) and only they are sorted.
 
         Returns:
             (numpy array, numpy array) : (Sorted list of items, Sorted scores).
 
         """
-        sorted_indices = np.argsort(scores)[::-1]
+        if top_n is not None and top_n < len(scores):
+            if top_n <= 0:
+                return candidates[:0], scores[:0]
+            top_indices = np.argpartition(scores, len(scores) - top_n)[len(scores) - top_n:]
+            sorted_indices = top_indices[np.argsort(scores[top_indices])[::-1]]
+        else:
+            sorted_indices = np.argsort(scores)[::-1]
 
         return candidates[sorted_indices], scores[sorted_indices]
 
+    def scores2rank(self, scores, target, random_state=None):
+        """Get the rank of a target in the recommendation list without sorting the scores.
+
+        The rank is the number of candidates scoring higher than the target, and the target
+        takes a uniformly random position among the candidates tied with it.
+
+        Args:
+            scores (numpy array; (n_target_items,)): Scores for the target items.
+            target (int): Position of the target item in `scores`.
+            random_state (numpy RandomState): Source of the tie-breaking draws; the global
+                `np.random` stream by default.
+
+        Returns:
+            int: Number of items recommended before the target (i.e., 0 for the top item).
+
+        """
+        score = scores[target]
+        rank = np.count_nonzero(scores > score)
+
+        n_tie = np.count_nonzero(scores == score) - 1
+        if n_tie > 0:
+            rank += (np.random if random_state is None else random_state).randint(n_tie + 1)
+
+        return int(rank)
+
     def register_observer(self, observer):
         """Register a new observer for the user profile estability in the trainning process.
 
@@ -160,7 +272,7 @@ class FeatureRecommenderMixin(RecommenderMixin):
         """
         return
 
-    def recommend(self, user, candidates, context):
+    def recommend(self, user, candidates, context, top_n=None):
         """Recommend items for a user represented as a dictionary d.
 
         First, scores are computed.
@@ -170,6 +282,7 @@ class FeatureRecommenderMixin(RecommenderMixin):
             user (User): Target user.
             candidates (numpy array; (# target items, )): Target items' indices. Only these items are considered as the recommendation candidates.
             context (numpy 1d array): Feature vector representing contextual information.
+            top_n (int): Only return the best `top_n` items, if given.
 
         Returns:
             (numpy array, numpy array) : (Sorted list of items, Sorted scores).
@@ -51,6 +51,45 @@ class BaseForgetting:
         """
         return user_vec
 
+    def update_batch(self, users, items, ratings):
+        """Update the model using a block of ratings in which each user and each item appears at most once.
+
+        Args:
+            users (numpy array): User indices.
+            items (numpy array): Item indices.
+            ratings (numpy array): Ratings given by users to the items.
+        """
+        if type(self).update is BaseForgetting.update:
+            return
+        for user, item, rating in zip(users, items, ratings):
+            self.update(user, item, rating)
+
+    def item_forgetting_batch(self, item_mat, items, last_item_mat):
+        """Apply a forgetting operation in each row of a block of item vectors.
+
+        Args:
+            item_mat (numpy.array): Latent factor vectors with item attributes updated (one row per item).
+            items (numpy.array): Item indices.
+            last_item_mat (numpy.array): Latent factor vectors with item attributes not yet updated.
+        """
+        if type(self).item_forgetting is BaseForgetting.item_forgetting:
+            return item_mat
+        return np.array([self.item_forgetting(item_vec, item, last_item_vec)
+                         for item_vec, item, last_item_vec in zip(item_mat, items, last_item_mat)])
+
+    def user_forgetting_batch(self, user_mat, users, last_user_mat):
+        """Apply a forgetting operation in each row of a block of user vectors.
+
+        Args:
+            user_mat (numpy.array): Latent factor vectors with user attributes updated (one row per user).
+            users (numpy.array): User indices.
+            last_user_mat (numpy.array): Latent factor vectors with user attributes not yet updated.
+        """
+        if type(self).user_forgetting is BaseForgetting.user_forgetting:
+            return user_mat
+        return np.array([self.user_forgetting(user_vec, user, last_user_vec)
+                         for user_vec, user, last_user_vec in zip(user_mat, users, last_user_mat)])
+
     def __repr__(self):
         if self.alpha:
             name = "{}(alpha={})".format(self.__class__.__name__, self.alpha)
@@ -2,6 +2,7 @@ from sklearn.base import BaseEstimator
 from ..base import RecommenderMixin
 
 import numpy as np
+import scipy.sparse as sp
 
 
 class Popular(BaseEstimator, RecommenderMixin):
@@ -28,6 +29,12 @@ class Popular(BaseEstimator, RecommenderMixin):
     def score(self, user, candidates):
         return self.freq[candidates]
 
-    def recommend(self, user, candidates):
+    def score_batch(self, users, candidates):
+        if sp.issparse(candidates):
+            return sp.csr_matrix((self.freq[candidates.indices], candidates.indices.copy(), candidates.indptr.copy()),
+                                 shape=candidates.shape)
+        return np.tile(self.freq[candidates], (len(users), 1))
+
+    def recommend(self, user, candidates, top_n=None):
         scores = self.score(user, candidates)
-        return self.scores2recos(scores, candidates, rev=True)
+        return self.scores2recos(scores, candidates, rev=True, top_n=top_n)
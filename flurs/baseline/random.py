@@ -27,6 +27,6 @@ class Random(BaseEstimator, RecommenderMixin):
     def score(self, user, candidates):
         return np.random.rand(len(candidates))
 
-    def recommend(self, user, candidates):
+    def recommend(self, user, candidates, top_n=None):
         scores = self.score(user, candidates)
-        return self.scores2recos(scores, candidates)
+        return self.scores2recos(scores, candidates, top_n=top_n)
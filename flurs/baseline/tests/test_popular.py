@@ -33,3 +33,16 @@ class PopularTestCase(TestCase):
         self.recommender.register(Item(0))
         self.recommender.update(Event(User(0), Item(0), 1))
         self.assertEqual(self.recommender.score(User(0), np.array([0])), 1)
+
+    def test_score_batch(self):
+        self.recommender.register(User(0))
+        self.recommender.register(User(1))
+        for i in range(3):
+            self.recommender.register(Item(i))
+        self.recommender.update(Event(User(0), Item(2), 1))
+
+        scores = self.recommender.score_batch([User(0), User(1)], np.array([2, 0]))
+        assert_array_equal(scores, np.array([[1, 0], [1, 0]]))
+
+        recos, _ = self.recommender.recommend_batch([User(0), User(1)], np.arange(3), top_n=1)
+        assert_array_equal(recos, np.array([[2], [2]]))
@@ -0,0 +1,145 @@
+from collections import deque
+
+import numpy as np
+
+from .utils.growable import ensure_index
+
+
+class BufferSampler(object):
+
+    """Sample negative candidates among the recently observed items which are unknown to the user.
+
+    Every call builds the set of unknown buffered items and shuffles all of them,
+    so that its cost is O(n log n) in the number of buffered items.
+
+    """
+
+    def __init__(self, maxlen=None, n_candidate=1000):
+        """Set/initialize parameters.
+
+        Args:
+            maxlen (int): Size of an item buffer which stores most recently observed items.
+            n_candidate (int): Number of negative candidates drawn for each event.
+
+        """
+        self.maxlen = maxlen
+        self.n_candidate = n_candidate
+
+        # create a ring buffer
+        # save items which are observed in most recent `maxlen` events
+        self.item_buffer = deque(maxlen=maxlen)
+
+    def observe(self, e):
+        """Record an observed event; `e.user.known_items` must already contain `e.item`.
+
+        Args:
+            e (Event): Observed event.
+
+        """
+        self.item_buffer.append(e.item.index)
+
+    def sample(self, e):
+        """Draw negative candidates for an event.
+
+        Args:
+            e (Event): Event with the target user.
+
+        Returns:
+            numpy array; (n_candidate,): Distinct buffered items unknown to the user
+            (fewer if there are not enough of them).
+
+        """
+        # buffered items except for the user known ones
+        unobserved = np.setdiff1d(np.fromiter(set(self.item_buffer), dtype=int), e.user.known_items)
+
+        # shuffle and select `n_candidate`
+        np.random.shuffle(unobserved)
+        return unobserved[:self.n_candidate]
+
+
+class PoolSampler(BufferSampler):
+
+    """Sample negative candidates in O(n_candidate) per event, equivalently to `BufferSampler`.
+
+    The distinct buffered items are maintained incrementally in a pool array (with
+    their multiplicities in the buffer), and known items are checked in `e.user.known_items`.
+    Candidates are drawn uniformly from the pool and rejected when known or already drawn,
+    which yields a uniformly random subset of the unknown buffered items as `BufferSampler` does.
+    If more than about half of the pool is known to the user, the unknown items are
+    enumerated instead.
+
+    """
+
+    def __init__(self, maxlen=None, n_candidate=1000):
+        """Set/initialize parameters.
+
+        Args:
+            maxlen (int): Size of an item buffer which stores most recently observed items.
+            n_candidate (int): Number of negative candidates drawn for each event.
+
+        """
+        super(PoolSampler, self).__init__(maxlen, n_candidate)
+
+        # unbounded deque; eviction is done by hand to keep the pool in sync
+        self.item_buffer = deque()
+
+        self.pool = np.zeros(0, dtype=int)
+        self.n_pool = 0
+        self.position = {}
+        self.count = {}
+
+    def observe(self, e):
+        self.item_buffer.append(e.item.index)
+        self.__add(e.item.index)
+        if self.maxlen is not None and len(self.item_buffer) > self.maxlen:
+            self.__remove(self.item_buffer.popleft())
+
+    def sample(self, e):
+        excluded = e.user.known_items.items
+        pool = self.pool[:self.n_pool]
+
+        # keep the acceptance rate of the rejection sampling above 1/2
+        if self.n_pool - len(excluded) < self.n_pool // 2 + self.n_candidate:
+            unobserved = pool[np.fromiter((i not in excluded for i in pool.tolist()), dtype=bool, count=self.n_pool)]
+            np.random.shuffle(unobserved)
+            return unobserved[:self.n_candidate]
+
+        chosen = set()
+        candidates = []
+        while len(candidates) < self.n_candidate:
+            draws = pool[np.random.randint(0, self.n_pool, 2 * (self.n_candidate - len(candidates)))]
+            for i in draws.tolist():
+                if i in excluded or i in chosen:
+                    continue
+                chosen.add(i)
+                candidates.append(i)
+                if len(candidates) == self.n_candidate:
+                    break
+
+        return np.array(candidates, dtype=int)
+
+    def __add(self, item):
+        n = self.count.get(item, 0)
+        self.count[item] = n + 1
+        if n > 0:
+            return
+
+        self.pool = ensure_index(self.pool, self.n_pool)
+        self.pool[self.n_pool] = item
+        self.position[item] = self.n_pool
+        self.n_pool += 1
+
+    def __remove(self, item):
+        n = self.count[item] - 1
+        if n > 0:
+            self.count[item] = n
+            return
+        del self.count[item]
+
+        # move the last pool item into the hole
+        pos = self.position.pop(item)
+        self.n_pool -= 1
+        last = int(self.pool[self.n_pool])
+        if last != item:
+            self.pool[pos] = last
+            self.position[last] = pos
@@ -0,0 +1,57 @@
+from .entity import Event, EntityRegistry
+
+import numpy as np
+
+
+class EventColumns(object):
+
+    """Events stored as columns of user indices, item indices, ratings and timestamps.
+
+    Each event costs 20 bytes instead of a set of Python objects. `Event` objects are only
+    created while iterating, and the `User`/`Item` objects they refer to are created once
+    per index and shared by all slices of the same columns, so that user states such as
+    `known_items` persist across them (e.g. from `Evaluator.fit` to `Evaluator.evaluate`).
+
+    """
+
+    def __init__(self, users, items, ratings, timestamps=None, registry=None):
+        """Set/initialize parameters.
+
+        Args:
+            users (numpy array; (n_event,)): User indices.
+            items (numpy array; (n_event,)): Item indices.
+            ratings (numpy array; (n_event,)): Ratings.
+            timestamps (numpy array; (n_event,)): Timestamps; zeros if not given.
+            registry (EntityRegistry): `User`/`Item` objects shared with other columns; created if not given.
+
+        """
+        self.users = np.asarray(users, dtype=np.int32)
+        self.items = np.asarray(items, dtype=np.int32)
+        self.ratings = np.asarray(ratings, dtype=np.float32)
+        if timestamps is None:
+            timestamps = np.zeros(len(self.users), dtype=np.int64)
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+
+        if registry is None:
+            registry = EntityRegistry()
+        self.registry = registry
+
+    def __len__(self):
+        return len(self.users)
+
+    def __getitem__(self, key):
+        """Select events by a slice (views of the columns) or an array of positions.
+        """
+        if isinstance(key, (int, np.integer)):
+            return self.event(key)
+        return EventColumns(self.users[key], self.items[key], self.ratings[key], self.timestamps[key],
+                            registry=self.registry)
+
+    def __iter__(self):
+        user, item = self.registry.user, self.registry.item
+        for u, i, r in zip(self.users.tolist(), self.items.tolist(), self.ratings.tolist()):
+            yield Event(user(u), item(i), r)
+
+    def event(self, position):
+        return Event(self.registry.user(int(self.users[position])), self.registry.item(int(self.items[position])),
+                     float(self.ratings[position]))
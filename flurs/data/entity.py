@@ -1,9 +1,20 @@
 import numpy as np
 import logging
 
+from collections import deque
+
+logger = logging.getLogger("experimenter.user")
+
+# feature/context of the entities and events which have none; shared, hence read-only
+EMPTY_FEATURE = np.array([0.])
+EMPTY_FEATURE.flags.writeable = False
+
+
 class Base(object):
 
-    def __init__(self, index, feature=np.array([0.])):
+    __slots__ = ('index', 'feature')
+
+    def __init__(self, index, feature=EMPTY_FEATURE):
         self.index = index
         self.feature = feature
 
@@ -34,12 +45,69 @@ class Base(object):
         return x
 
 
+class KnownItems(object):
+
+    """Indices of the items known to a user, with constant-time membership and insertion.
+
+    The index array used for masking is only materialized when requested after a change.
+    With `maxlen`, only the most recently added `maxlen` items are remembered.
+
+    """
+
+    __slots__ = ('items', 'history', '_array')
+
+    def __init__(self, maxlen=None):
+        if maxlen is not None and maxlen < 1:
+            raise ValueError('maxlen must be at least 1: %d' % maxlen)
+
+        self.items = set()
+        self.history = deque(maxlen=maxlen) if maxlen is not None else None
+        self._array = None
+
+    def add(self, item_index):
+        """Add an item, and return whether it was unknown.
+        """
+        if item_index in self.items:
+            return False
+
+        history = self.history
+        if history is not None:
+            if len(history) == history.maxlen:
+                self.items.discard(history[0])
+            history.append(item_index)
+
+        self.items.add(item_index)
+        self._array = None
+        return True
+
+    def __contains__(self, item_index):
+        return item_index in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    @property
+    def array(self):
+        """numpy array: Known item indices in no particular order.
+        """
+        if self._array is None:
+            self._array = np.fromiter(self.items, dtype=int, count=len(self.items))
+        return self._array
+
+    def __array__(self, dtype=None, copy=None):
+        return self.array if dtype is None else self.array.astype(dtype)
+
+
 class User(Base):
-    def __init__(self, index):
-        self.known_items = []
-        self.index = index
-        self.feature=np.array([0.])
-        self.logger = logging.getLogger("experimenter.user")
+
+    __slots__ = ('known_items',)
+
+    def __init__(self, index, feature=EMPTY_FEATURE, max_known_items=None):
+        super(User, self).__init__(index, feature)
+        self.known_items = KnownItems(max_known_items)
 
     def __repr__(self):
         if len(self.feature) == 1 and self.feature[0] == 0.:
@@ -47,13 +115,15 @@ class User(Base):
         else:
             return 'User(index={}, feature={})'.format(self.index, self.feature)
     def known_item(self, item_index):
-        if item_index not in self.known_items:
-            self.logger.debug("User {} know Item {} now.".format(self.index, item_index))
-            self.known_items.append(item_index)
+        # `isEnabledFor` is cached by the logger until its configuration changes
+        if self.known_items.add(item_index) and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("User %s know Item %s now.", self.index, item_index)
 
 
 class Item(Base):
 
+    __slots__ = ()
+
     def __repr__(self):
         if len(self.feature) == 1 and self.feature[0] == 0.:
             return 'Item(index={})'.format(self.index)
@@ -63,7 +133,9 @@ class Item(Base):
 
 class Event(object):
 
-    def __init__(self, user, item, rating=1., context=np.array([0.])):
+    __slots__ = ('user', 'item', 'rating', 'context')
+
+    def __init__(self, user, item, rating=1., context=EMPTY_FEATURE):
         self.user = user
         self.item = item
         self.rating = rating
@@ -85,8 +157,109 @@ class Event(object):
 
         return x if not vertical else np.array([x]).T
 
+    def encode_sparse(self, offsets):
+        """Encode into the nonzero entries of the vector built by `encode`.
+
+        Args:
+            offsets (tuple of int or None): Output of `block_offsets`.
+
+        Returns:
+            (numpy array, numpy array): (Indices, Values) of the nonzero entries.
+
+        """
+        user_index, user_feature, context, item_index, item_feature = offsets
+        indices, values = [], []
+
+        if user_index is not None:
+            indices.append(np.array([user_index + self.user.index]))
+            values.append(np.ones(1))
+        if user_feature is not None:
+            _append_nonzero(indices, values, self.user.feature, user_feature)
+        if context is not None:
+            _append_nonzero(indices, values, self.context, context)
+        if item_index is not None:
+            indices.append(np.array([item_index + self.item.index]))
+            values.append(np.ones(1))
+        if item_feature is not None:
+            _append_nonzero(indices, values, self.item.feature, item_feature)
+
+        if not indices:
+            return np.zeros(0, dtype=int), np.zeros(0)
+        return np.concatenate(indices), np.concatenate(values)
+
     def __str__(self):
         if len(self.context) == 1 and self.context[0] == 0.:
             return 'Event(user={}, item={}, value={})'.format(self.user, self.item, self.rating)
         else:
             return 'Event(user={}, item={}, value={}, context={})'.format(self.user, self.item, self.rating, self.context)
+
+
+def block_offsets(n_user, n_user_feature, n_context, n_item,
+                  index=True, feature=True, context=True):
+    """Compute where each block of the vector built by `Event.encode` starts.
+
+    The blocks are laid out as [user index | user feature | context | item index | item feature],
+    and the offsets only change when a user or item is added, so that they can be computed
+    once and passed to `Event.encode_sparse` for every event.
+
+    Args:
+        n_user (int): Number of users (i.e. dimensions of the user index block).
+        n_user_feature (int): Dimensions of user features.
+        n_context (int): Dimensions of contexts.
+        n_item (int): Number of items (i.e. dimensions of the item index block).
+        index, feature, context (boolean): Blocks to encode, as in `Event.encode`.
+
+    Returns:
+        tuple of int or None: Offsets of the (user index, user feature, context, item index, item feature)
+        blocks; None for a block which is not encoded.
+
+    """
+    blocks = [(index, n_user), (feature, n_user_feature), (context, n_context), (index, n_item), (feature, 0)]
+
+    offsets = []
+    p = 0
+    for used, size in blocks:
+        offsets.append(p if used else None)
+        if used:
+            p += size
+    return tuple(offsets)
+
+
+def _append_nonzero(indices, values, vector, offset):
+    nonzero = np.flatnonzero(vector)
+    if nonzero.size:
+        indices.append(nonzero + offset)
+        values.append(vector[nonzero])
+
+
+class EntityRegistry(object):
+
+    """Intern `User`/`Item` objects by index, so that all events of a user (item) share one object.
+    """
+
+    def __init__(self, max_known_items=None):
+        """Set/initialize parameters.
+
+        Args:
+            max_known_items (int): Bound of the known items remembered by each user; unbounded by default.
+
+        """
+        self.max_known_items = max_known_items
+        self.users = {}
+        self.items = {}
+
+    def user(self, index, feature=EMPTY_FEATURE):
+        """Get the user of an index, creating it with `feature` on the first request.
+        """
+        user = self.users.get(index)
+        if user is None:
+            user = self.users[index] = User(index, feature, self.max_known_items)
+        return user
+
+    def item(self, index, feature=EMPTY_FEATURE):
+        """Get the item of an index, creating it with `feature` on the first request.
+        """
+        item = self.items.get(index)
+        if item is None:
+            item = self.items[index] = Item(index, feature)
+        return item
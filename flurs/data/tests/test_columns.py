@@ -0,0 +1,33 @@
+from unittest import TestCase
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from flurs.data.columns import EventColumns
+
+
+class EventColumnsTestCase(TestCase):
+
+    def setUp(self):
+        self.columns = EventColumns([0, 1, 0, 2], [3, 3, 1, 0], [1., 5., 3., 2.], [10, 11, 12, 13])
+
+    def test_dtypes(self):
+        self.assertEqual(self.columns.users.dtype, np.int32)
+        self.assertEqual(self.columns.items.dtype, np.int32)
+        self.assertEqual(self.columns.ratings.dtype, np.float32)
+        self.assertEqual(len(self.columns), 4)
+
+    def test_iter(self):
+        events = list(self.columns)
+        self.assertEqual([(e.user.index, e.item.index, e.rating) for e in events],
+                         [(0, 3, 1.), (1, 3, 5.), (0, 1, 3.), (2, 0, 2.)])
+
+        # entities are shared by events and slices
+        self.assertIs(events[0].user, events[2].user)
+        self.assertIs(next(iter(self.columns[2:])).user, events[0].user)
+        self.assertIs(self.columns[1].item, events[0].item)
+
+    def test_getitem(self):
+        selected = self.columns[np.array([3, 0])]
+        assert_array_equal(selected.users, [2, 0])
+        assert_array_equal(selected.timestamps, [13, 10])
+        self.assertIs(selected.registry, self.columns.registry)
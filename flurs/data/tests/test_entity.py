@@ -2,7 +2,7 @@ from unittest import TestCase
 import numpy as np
 from numpy.testing import assert_array_equal
 
-from flurs.data.entity import User, Item, Event
+from flurs.data.entity import User, Item, Event, EntityRegistry, KnownItems, EMPTY_FEATURE, block_offsets
 
 
 class EntityTestCase(TestCase):
@@ -75,3 +75,91 @@ class EntityTestCase(TestCase):
                                         [0],
                                         [1],
                                         [0]]))
+
+
+class EntityRegistryTestCase(TestCase):
+
+    def test_slots(self):
+        e = Event(User(0), Item(1))
+        for obj in [e, e.user, e.item]:
+            self.assertFalse(hasattr(obj, '__dict__'))
+
+        # entities and events without features share one read-only array
+        self.assertIs(e.user.feature, EMPTY_FEATURE)
+        self.assertIs(e.item.feature, EMPTY_FEATURE)
+        self.assertIs(e.context, EMPTY_FEATURE)
+        self.assertFalse(EMPTY_FEATURE.flags.writeable)
+
+    def test_registry(self):
+        registry = EntityRegistry()
+
+        user = registry.user(3, np.arange(2))
+        self.assertIs(registry.user(3), user)
+        assert_array_equal(user.feature, np.arange(2))
+        self.assertIsNot(registry.user(4), user)
+
+        item = registry.item(3)
+        self.assertIs(registry.item(3), item)
+        self.assertIsInstance(item, Item)
+
+
+class KnownItemsTestCase(TestCase):
+
+    def test_known_items(self):
+        known = KnownItems()
+        self.assertTrue(known.add(3))
+        self.assertFalse(known.add(3))
+        self.assertTrue(known.add(1))
+        self.assertIn(3, known)
+        self.assertNotIn(2, known)
+        self.assertEqual(len(known), 2)
+
+        # the cached array is refreshed after a change
+        assert_array_equal(np.sort(known.array), [1, 3])
+        known.add(5)
+        assert_array_equal(np.sort(known.array), [1, 3, 5])
+
+        # usable as a plain index array
+        assert_array_equal(np.setdiff1d(np.arange(6), known), [0, 2, 4])
+
+    def test_maxlen(self):
+        user = User(0, max_known_items=2)
+        for i in [1, 2, 1, 3]:
+            user.known_item(i)
+        self.assertNotIn(1, user.known_items)
+        assert_array_equal(np.sort(user.known_items.array), [2, 3])
+
+        with self.assertRaises(ValueError):
+            KnownItems(maxlen=0)
+
+    def test_known_item_logging(self):
+        user = User(0)
+        user.known_item(1)
+
+        # logging configured after the import and the first events is honoured
+        with self.assertLogs('experimenter.user', level='DEBUG') as cm:
+            user.known_item(2)
+            user.known_item(2)
+        self.assertEqual(cm.output, ['DEBUG:experimenter.user:User 0 know Item 2 now.'])
+
+
+class EncodeSparseTestCase(TestCase):
+
+    def test_block_offsets(self):
+        self.assertEqual(block_offsets(3, 2, 1, 4), (0, 3, 5, 6, 10))
+        self.assertEqual(block_offsets(3, 2, 1, 4, index=False), (None, 0, 2, None, 3))
+        self.assertEqual(block_offsets(3, 2, 1, 4, feature=False, context=False), (0, None, None, 3, None))
+
+    def test_encode_sparse(self):
+        event = Event(User(1, np.array([0., 2.])), Item(2, np.array([3., 0., 4.])), context=np.array([5.]))
+
+        for index in [True, False]:
+            for feature in [True, False]:
+                x = event.encode(n_user=3, n_item=4, index=index, feature=feature)
+                offsets = block_offsets(3, 2, 1, 4, index=index, feature=feature)
+                indices, values = event.encode_sparse(offsets)
+
+                dense = np.zeros_like(x)
+                dense[indices] = values
+                assert_array_equal(dense, x)
+                self.assertTrue(np.all(values != 0.))
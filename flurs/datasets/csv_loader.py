@@ -1,9 +1,27 @@
 from ..data.entity import User, Item, Event
+from ..data.columns import EventColumns
 import numpy as np
 
+from itertools import islice
 from sklearn.utils import Bunch
 
-def csv_loader(file):
+def csv_loader(file, columnar=False, chunksize=2 ** 16):
+    """Load `user_id,item_id,rating,timestamp` lines.
+
+    Args:
+        file (str): Path to the CSV file.
+        columnar (bool): If true, events are parsed chunk by chunk into `EventColumns`
+            (i.e. int32/float32 arrays) instead of one `Event` object per line.
+        chunksize (int): Number of lines parsed at once in the columnar mode.
+
+    Returns:
+        Bunch: `samples` (list of Event or EventColumns), `n_user`, `n_item`, `n_sample`,
+        and, in the columnar mode, `user_ids`/`item_ids` mapping the original IDs to indices.
+
+    """
+    if columnar:
+        return load_columns(file, chunksize)
+
     u_dict = {}
     i_dict = {}
     samples = []
@@ -38,3 +56,42 @@ def csv_loader(file):
                  n_user=len(u_dict),
                  n_item=len(i_dict),
                  n_sample=len(samples))
+
+
+def load_columns(file, chunksize=2 ** 16):
+    u_dict = {}
+    i_dict = {}
+    chunks = []
+
+    with open(file, 'r') as f:
+        while True:
+            lines = list(islice(f, chunksize))
+            if not lines:
+                break
+
+            lines = [line for line in map(str.strip, lines) if line]
+            if not lines:
+                continue
+            if any(line.count(',') != 3 for line in lines):
+                raise ValueError('each line must have 4 fields: user_id,item_id,rating,timestamp')
+
+            # split the whole chunk at once; fields may be padded with spaces
+            fields = [field.strip() for field in ','.join(lines).split(',')]
+            user_ids, item_ids, ratings, timestamps = fields[0::4], fields[1::4], fields[2::4], fields[3::4]
+
+            # new IDs get the next indices in the order of appearance
+            users = np.array([u_dict.setdefault(u, len(u_dict)) for u in user_ids], dtype=np.int32)
+            items = np.array([i_dict.setdefault(i, len(i_dict)) for i in item_ids], dtype=np.int32)
+            chunks.append((users, items,
+                           np.array(ratings, dtype=np.float32),
+                           np.array(timestamps, dtype=np.int64)))
+
+    columns = [np.concatenate(c) for c in zip(*chunks)] if chunks else [[], [], [], []]
+    samples = EventColumns(*columns)
+
+    return Bunch(samples=samples,
+                 user_ids=u_dict,
+                 item_ids=i_dict,
+                 n_user=len(u_dict),
+                 n_item=len(i_dict),
+                 n_sample=len(samples))
@@ -1,4 +1,4 @@
-from ..data.entity import User, Item, Event
+from ..data.entity import Event, EntityRegistry
 
 import os
 import time
@@ -182,6 +182,9 @@ def fetch_movielens(data_home=None, size='100k'):
     user_ids = {}
     item_ids = {}
 
+    # one User/Item object per index, shared by all of its events
+    registry = EntityRegistry()
+
     head_date = datetime(*time.localtime(ratings[0, 3])[:6])
     dts = []
 
@@ -219,8 +222,8 @@ def fetch_movielens(data_home=None, size='100k'):
 
         others = np.concatenate((weekday_vec, last_item_vec, last_weekday_vec))
 
-        user = User(u_index, users[user_id])
-        item = Item(i_index, movies[item_id])
+        user = registry.user(u_index, users[user_id])
+        item = registry.item(i_index, movies[item_id])
 
         sample = Event(user, item, 1., others)
         samples.append(sample)
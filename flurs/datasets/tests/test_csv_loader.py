@@ -0,0 +1,52 @@
+from unittest import TestCase
+import os
+import tempfile
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from flurs.datasets import csv_loader
+
+
+class CSVLoaderTestCase(TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as f:
+            f.write('10,a,4,100\n11,b,5,101\n10,b,3,102\n12,c,1,103\n11,a,2,104\n')
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_columnar(self):
+        data = csv_loader(self.path, columnar=True, chunksize=2)
+
+        self.assertEqual((data.n_user, data.n_item, data.n_sample), (3, 3, 5))
+        self.assertEqual(data.user_ids, {'10': 0, '11': 1, '12': 2})
+        self.assertEqual(data.item_ids, {'a': 0, 'b': 1, 'c': 2})
+
+        samples = data.samples
+        assert_array_equal(samples.users, [0, 1, 0, 2, 1])
+        assert_array_equal(samples.items, [0, 1, 1, 2, 0])
+        assert_array_equal(samples.ratings, [4., 5., 3., 1., 2.])
+        assert_array_equal(samples.timestamps, [100, 101, 102, 103, 104])
+
+    def test_same_events(self):
+        events = csv_loader(self.path).samples
+        columns = csv_loader(self.path, columnar=True).samples
+
+        self.assertEqual([(e.user.index, e.item.index, e.rating) for e in events],
+                         [(e.user.index, e.item.index, e.rating) for e in columns])
+
+    def test_columnar_fields(self):
+        with open(self.path, 'w') as f:
+            f.write('1, 10, 5, 100\n\n2 ,20 , 4,101\n')
+        data = csv_loader(self.path, columnar=True)
+        self.assertEqual(data.user_ids, {'1': 0, '2': 1})
+        self.assertEqual(data.item_ids, {'10': 0, '20': 1})
+        assert_array_equal(data.samples.ratings, [5., 4.])
+
+        # the total number of fields is a multiple of 4, but not the fields of each line
+        with open(self.path, 'w') as f:
+            f.write('10,a,4\n11,b,5,101,30\n')
+        with self.assertRaises(ValueError):
+            csv_loader(self.path, columnar=True)
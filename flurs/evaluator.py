@@ -1,9 +1,10 @@
 from .base import FeatureRecommenderMixin
-from numba import jit
+from .candidate_sampler import BufferSampler
+from .data.columns import EventColumns
+from .utils.trace import Tracer
 import time
 import numpy as np
 
-from collections import deque
 import logging
 
 
@@ -12,13 +13,15 @@ class Evaluator(object):
     """Base class for experimentation of the incremental models with positive-only feedback.
     """
 
-    def __init__(self, recommender, repeat=False, maxlen=None):
+    def __init__(self, recommender, repeat=False, maxlen=None, sampler=None):
         """Set/initialize parameters.
 
         Args:
             recommender (Recommender): Instance of a recommender which has been initialized.
             repeat (boolean): Choose whether the same item can be repeatedly interacted by the same user.
             maxlen (int): Size of an item buffer which stores most recently observed items.
+            sampler (BufferSampler): Negative candidate sampler, e.g. `PoolSampler` for a sublinear
+                per-event cost. `BufferSampler(maxlen)` is used by default.
 
         """
         self.rec = recommender
@@ -26,13 +29,23 @@ class Evaluator(object):
 
         self.repeat = repeat
 
-        # create a ring buffer
+        if sampler is None:
+            sampler = BufferSampler(maxlen)
+        self.sampler = sampler
+
         # save items which are observed in most recent `maxlen` events
-        self.item_buffer = deque(maxlen=maxlen)
+        self.item_buffer = self.sampler.item_buffer
+
+        # ties of the target are broken by a stream of their own, so that evaluating does not
+        # shift the global draws of the candidate sampler and the models
+        self.tie_random = np.random.RandomState(0)
 
         # create log configuration
         self.logger = logging.getLogger("experimenter.evaluator")
 
+        # per-event records; `self.trace.sample(n, logging.INFO)` traces 1 in n events
+        self.trace = Tracer(self.logger)
+
     def fit(self, train_events, test_events, max_n_epoch=20):
         """Train a model using the first 30% positive events to avoid cold-start.
 
@@ -40,8 +53,8 @@ class Evaluator(object):
         After the batch SGD training, the models are incrementally updated by using the 20% test events.
 
         Args:
-            train_events (list of Event): Positive training events (0-30%).
-            test_events (list of Event): Test events (30-50%).
+            train_events (list of Event or EventColumns): Positive training events (0-30%).
+            test_events (list of Event or EventColumns): Test events (30-50%).
             max_n_epoch (int): Maximum number of epochs for the batch training.
 
         """
@@ -64,8 +77,7 @@ class Evaluator(object):
         # the model is incrementally updated based on them before the incremental evaluation step
 
         self.logger.debug("Updating model with test instances..")
-        for e in test_events:
-            self.rec.update(e)
+        self.rec.update_events(test_events)
 
     def get_candidates(self, e):
         """Get a list of 1000 unknown items to the user.
@@ -77,22 +89,8 @@ class Evaluator(object):
             list of candidates: Integer
 
         """
-        # select all known items in the model
-        unobserved = list(set(self.item_buffer))
-        every_item = np.arange(self.rec.B.shape[0])
-
-        # create a boolean vector
-        index = np.ones(self.rec.B.shape[0], dtype=bool)
-
-        # set user known items to false
-        index[e.user.known_items] = False
-
-        # intersect between users unknown items and all items in the model
-        unobserved = np.intersect1d(unobserved, every_item[index])
-
-        # shuffle and select 1000
-        np.random.shuffle(unobserved)
-        unobserved = unobserved[:1000]
+        # 1000 recently observed items unknown to the user
+        unobserved = self.sampler.sample(e)
         candidates = np.append(unobserved, e.item.index)
         return candidates
 
@@ -100,7 +98,7 @@ class Evaluator(object):
         """Iterate recommend/update procedure and compute incremental recall.
 
         Args:
-            test_events (list of Event): Positive test events.
+            test_events (list of Event or EventColumns): Positive test events.
 
         Returns:
             list of tuples: (score recall@1, rank, recommend time, update time)
@@ -138,25 +136,29 @@ class Evaluator(object):
     def recommend_event(self, e):
 
         candidates = self.get_candidates(e)
-        # make top-{at} recommendation for the 1001 items
+        # rank the target item (i.e., the last candidate) among the 1001 items
         start = time.process_time()
-        recos, scores = self.__recommend(e, candidates)
+        scores = self.__score(e, candidates)
+        rank = self.rec.scores2rank(scores, -1, self.tie_random)
         recommend_time = (time.process_time() - start)
-        rank = np.where(recos == e.item.index)[0][0]
-        return scores[rank], rank, recommend_time
+        return scores[-1], rank, recommend_time
 
 
-    def __recommend(self, e, candidates):
+    def __score(self, e, candidates):
         if self.feature_rec:
-            return self.rec.recommend(e.user, candidates, e.context)
+            return self.rec.score(e.user, candidates, e.context)
         else:
-            return self.rec.recommend(e.user, candidates)
+            return self.rec.score(e.user, candidates)
 
     def __validate(self, e):
-        self.logger.debug("Validating Event(U: {}, I: {}, R: {}). [A={},B={}]".format(e.user.index, e.item.index, e.rating, self.rec.A.shape, self.rec.B.shape))
+        trace = self.trace
+        trace.count('event')
+        if trace.enabled and trace.emit():
+            trace.log("Validating Event(U: %s, I: %s, R: %s). [A=%s,B=%s]",
+                      e.user.index, e.item.index, e.rating, self.rec.A.shape, self.rec.B.shape)
 
         e.user.known_item(e.item.index)
-        self.item_buffer.append(e.item.index)
+        self.sampler.observe(e)
         self.rec.register_user(e.user)
         self.rec.register_item(e.item)
 
@@ -173,16 +175,21 @@ class Evaluator(object):
         curr_err = 100
         n_epoch = 1
         n_chunks = 20
-        np.random.shuffle(train_events)
-        train_chunks = np.array_split(train_events, n_chunks)
+        if isinstance(train_events, EventColumns):
+            train_events = train_events[np.random.permutation(len(train_events))]
+        else:
+            np.random.shuffle(train_events)
+
+        # contiguous chunks; columns are sliced without creating event objects
+        bounds = np.cumsum([0] + [len(c) for c in np.array_split(np.arange(len(train_events)), n_chunks)])
+        train_chunks = [train_events[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
         convergence = np.inf
         converged = False
         convergence_criteria = .00001
         while not converged and n_epoch <= max_n_epoch:
             np.random.shuffle(train_chunks)
             for chunk in train_chunks:
-                for e in chunk:
-                    self.rec.update(e)
+                self.rec.update_events(chunk)
                 prev_err = curr_err
                 curr_err = self.__batch_evaluate(test_events)
                 convergence = curr_err/prev_err - 1
@@ -191,7 +198,9 @@ class Evaluator(object):
                 if converged:
                     break
             n_epoch += 1
-        self.rec.forgetting.mean()
+        forgetting = getattr(self.rec, 'forgetting', None)
+        if forgetting is not None:
+            forgetting.mean()
         self.logger.info('Epochs:{} Convergence:{}'.format(n_epoch, convergence))
 
 
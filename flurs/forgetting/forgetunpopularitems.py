@@ -1,6 +1,5 @@
 import numpy as np
 from ..baseforgetting import BaseForgetting
-from numba import jit
 
 class ForgetUnpopularItems(BaseForgetting):
     def __init__(self, alpha = 1.01):
@@ -30,6 +29,14 @@ class ForgetUnpopularItems(BaseForgetting):
         next_i_vec = item_vec * coef
         return next_i_vec
 
+    def update_batch(self, users, items, ratings):
+        np.add.at(self.item_ratings, items, 1)
+
+    def item_forgetting_batch(self, item_mat, items, last_item_mat):
+        # item_ratings is (n_item, 1), so coefficients broadcast over the rows
+        coef = -(self.alpha ** -self.item_ratings[items]) + 1
+        return item_mat * coef
+
 
     def parameters(self):
         return [self.alpha]
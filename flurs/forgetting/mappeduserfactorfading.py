@@ -1,6 +1,5 @@
 import numpy as np
 from ..baseforgetting import BaseForgetting
-from numba import jit
 
 class MappedUserFactorFading(BaseForgetting):
     def __init__(self, alpha = 1.001):
@@ -13,6 +12,14 @@ class MappedUserFactorFading(BaseForgetting):
         mappedStability = np.ones(user_vec.shape[0]) - (stability * squared_diff)
         return user_vec * mappedStability
 
+    def user_forgetting_batch(self, user_mat, users, last_user_mat):
+        diff = (user_mat - last_user_mat)
+        stability = self.alpha ** (- np.sqrt(np.std(diff, axis=1, keepdims=True)))
+        squared_diff = diff ** 2
+        squared_diff = squared_diff / np.max(squared_diff, axis=1, keepdims=True)
+        mappedStability = 1. - (stability * squared_diff)
+        return user_mat * mappedStability
+
 
     def parameters(self):
         return [self.alpha]
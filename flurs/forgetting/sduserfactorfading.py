@@ -1,6 +1,5 @@
 import numpy as np
 from ..baseforgetting import BaseForgetting
-from numba import jit
 
 class SDUserFactorFading(BaseForgetting):
     def __init__(self, alpha = 1.001):
@@ -11,5 +10,10 @@ class SDUserFactorFading(BaseForgetting):
         stability = self.alpha ** (- np.sqrt(np.std(diff)))
         return user_vec * stability
 
+    def user_forgetting_batch(self, user_mat, users, last_user_mat):
+        diff = user_mat - last_user_mat
+        stability = self.alpha ** (- np.sqrt(np.std(diff, axis=1, keepdims=True)))
+        return user_mat * stability
+
     def parameters(self):
         return [self.alpha]
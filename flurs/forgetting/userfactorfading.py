@@ -1,6 +1,5 @@
 import numpy as np
 from ..baseforgetting import BaseForgetting
-from numba import jit
 
 class UserFactorFading(BaseForgetting):
     def __init__(self, alpha = 0.999999):
@@ -8,5 +7,8 @@ class UserFactorFading(BaseForgetting):
     def user_forgetting(self, user_vec, user, last_user_vec):
         return user_vec * self.alpha
 
+    def user_forgetting_batch(self, user_mat, users, last_user_mat):
+        return user_mat * self.alpha
+
     def parameters(self):
         return [self.alpha]
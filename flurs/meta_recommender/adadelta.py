@@ -2,6 +2,9 @@ from .meta_recommender import MetaRecommender
 from ..utils.float_metric import FloatSTD, FloatMean
 import logging
 class AdaDelta(MetaRecommender):
+
+    indexed = True
+
     def __init__(self, decay, learn_rate=1.0, epsilon = 1e-6):
         self.base_learn_rate = learn_rate
         self.mean = FloatMean(decay)
@@ -16,3 +19,16 @@ class AdaDelta(MetaRecommender):
 
     def register(self, id):
         return
+
+    # a single global learning rate, shared by users and items
+    def user_difference(self, ua, ia, rating, u_grad):
+        self.profile_difference(ia, ua, u_grad)
+
+    def item_difference(self, ia, ua, rating, i_grad):
+        self.profile_difference(ua, ia, i_grad)
+
+    def user_learn_rate(self, ua):
+        return self.variation
+
+    def item_learn_rate(self, ia):
+        return self.variation
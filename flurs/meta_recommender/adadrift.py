@@ -1,45 +1,84 @@
 from .meta_recommender import MetaRecommender
-from ..utils.float_metric import FloatSTD, FloatMean
+from ..utils.float_metric import FloatMeanBank, FloatSTDBank
+from ..utils.growable import ensure_index
+import numpy as np
 import logging
+
+
+class DriftStatistics(object):
+    """Short-term mean, long-term mean, deviation and learning rate of every user (or item) in flat arrays.
+    """
+
+    def __init__(self, l_decay, s_decay, learn_rate):
+        self.base_learn_rate = learn_rate
+
+        self.short_term = FloatMeanBank(s_decay)
+        self.long_term = FloatMeanBank(l_decay)
+        self.deviation = FloatSTDBank(self.long_term)
+        self.learn_vector = np.zeros(0)
+
+    def register(self, index):
+        self.short_term.register(index)
+        self.long_term.register(index)
+        self.deviation.register(index)
+        self.learn_vector = ensure_index(self.learn_vector, index, self.base_learn_rate)
+
+    def update(self, index, value, alpha):
+        """Update the statistics of distinct `index` (int or numpy array) with gradient deviations `value`.
+        """
+        self.short_term.update(index, value)
+        self.long_term.update(index, value)
+        # the deviation reads the updated long-term mean
+        self.deviation.update(index, value)
+
+        deviation = self.deviation.get(index)
+        diff = self.short_term.get(index) - self.long_term.get(index)
+        if np.ndim(index) == 0:
+            if deviation == 0.0:
+                return
+            change = diff / deviation
+        else:
+            change = np.divide(diff, deviation, out=np.zeros_like(diff), where=deviation != 0.0)
+        self.learn_vector[index] *= alpha ** change
+
+
 class AdaDrift(MetaRecommender):
+
+    indexed = True
+
     def __init__(self, l_decay, s_decay, alpha):
         self.l_decay = l_decay
         self.s_decay = s_decay
         self.alpha = alpha
-        self.short_term = {}
-        self.long_term = {}
-        self.deviation = {}
-        self.learn_vector = {}
 
         # create log configuration
         self.logger = logging.getLogger("experimenter.metarecommender")
 
-    def register(self, id):
-        if not id in self.short_term:
-            self.short_term[id] = FloatMean(self.s_decay)
-            self.long_term[id] = FloatMean(self.l_decay)
-            self.deviation[id] = FloatSTD(self.long_term[id])
-            self.learn_vector[id] = self.recommender.learn_rate
-
-    def profile_difference(self, _, id, grad):
-        self.update_metric(id, grad.std())
-        if self.deviation[id].get() == 0.0:
-            return
-        diff = self.short_term[id].get() - self.long_term[id].get()
-        change = (diff/self.deviation[id].get())
-        change_coef = self.alpha**change
-        self.learn_vector[id] *= change_coef
-
-    def update_metric(self, id, value):
-        self.short_term[id].next(value)
-        self.long_term[id].next(value)
-        self.deviation[id].next(value)
+    def initialize(self, recommender):
+        super(AdaDrift, self).initialize(recommender)
+        self.users = DriftStatistics(self.l_decay, self.s_decay, self._learn_rate)
+        self.items = DriftStatistics(self.l_decay, self.s_decay, self._learn_rate)
+
+    def register_user(self, ua):
+        self.users.register(ua)
+
+    def register_item(self, ia):
+        self.items.register(ia)
+
+    def user_difference(self, ua, ia, rating, u_grad):
+        self.users.update(ua, u_grad.std(), self.alpha)
+
+    def item_difference(self, ia, ua, rating, i_grad):
+        self.items.update(ia, i_grad.std(), self.alpha)
+
+    def user_learn_rate(self, ua):
+        return self.users.learn_vector[ua]
+
+    def item_learn_rate(self, ia):
+        return self.items.learn_vector[ia]
 
     def parameters_formater(self):
         return "Long Mean:{} Short Mean:{} Alpha:{}"
 
     def parameters(self):
-        return [self.lambda_l, self.lambda_s, self.alpha]
-
-    def learn_rate(self, id):
-        return self.learn_vector[id]
+        return [self.l_decay, self.s_decay, self.alpha]
@@ -1,4 +1,11 @@
 class MetaRecommender:
+
+    # Observers which set `indexed` are notified through the integer-indexed
+    # `register_user`/`user_difference`/`user_learn_rate` (and item) methods
+    # instead of the `register`/`profile_difference`/`learn_rate` methods
+    # keyed by 'u{}'/'i{}' strings.
+    indexed = False
+
     def initialize(self, recommender):
         self.recommender = recommender
         self.recommender.register_observer(self)
@@ -21,3 +28,47 @@ class MetaRecommender:
         return self._learn_rate
     def activate(self):
         self.activated = True
+
+    def register_user(self, ua):
+        """Start tracking a user.
+
+        Args:
+            ua (int): User index.
+        """
+        return
+
+    def register_item(self, ia):
+        """Start tracking an item.
+
+        Args:
+            ia (int): Item index.
+        """
+        return
+
+    def user_difference(self, ua, ia, rating, u_grad):
+        """Observe the gradient of a user vector.
+
+        Args:
+            ua (int): User index.
+            ia (int): Index of the item the user interacted with.
+            rating (float): Observed rating.
+            u_grad (numpy array): Gradient of the user vector.
+        """
+        return
+
+    def item_difference(self, ia, ua, rating, i_grad):
+        """Observe the gradient of an item vector.
+
+        Args:
+            ia (int): Item index.
+            ua (int): Index of the user who interacted with the item.
+            rating (float): Observed rating.
+            i_grad (numpy array): Gradient of the item vector.
+        """
+        return
+
+    def user_learn_rate(self, ua):
+        return self._learn_rate
+
+    def item_learn_rate(self, ia):
+        return self._learn_rate
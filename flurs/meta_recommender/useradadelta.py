@@ -1,21 +1,36 @@
 from .meta_recommender import MetaRecommender
-from ..utils.float_metric import FloatSTD, FloatMean
+from ..utils.float_metric import FloatMeanBank
 import logging
 class UserAdaDelta(MetaRecommender):
+
+    indexed = True
+
     def __init__(self, decay, learn_rate=1.0, epsilon=0.0000001):
         self.decay = decay
         self.base_learn_rate = learn_rate
-        self.user_mean = {}
         self.epsilon = epsilon
+
+        # decayed mean of the gradient deviation of each user/item
+        self.user_mean = FloatMeanBank(decay)
+        self.item_mean = FloatMeanBank(decay)
+
         # create log configuration
         self.logger = logging.getLogger("experimenter.metarecommender")
 
-    def register(self, id):
-        if not id in self.user_mean:
-            self.user_mean[id] = FloatMean(self.decay)
+    def register_user(self, ua):
+        self.user_mean.register(ua)
+
+    def register_item(self, ia):
+        self.item_mean.register(ia)
+
+    def user_difference(self, ua, ia, rating, u_grad):
+        self.user_mean.update(ua, u_grad.std())
+
+    def item_difference(self, ia, ua, rating, i_grad):
+        self.item_mean.update(ia, i_grad.std())
 
-    def profile_difference(self, _, id, grad):
-        self.user_mean[id].update(grad.std())
+    def user_learn_rate(self, ua):
+        return self.base_learn_rate / (self.user_mean.get(ua) + self.epsilon)
 
-    def learn_rate(self, id):
-        return self.base_learn_rate / (self.learn_vector[id].get() + self.epsilon)
+    def item_learn_rate(self, ia):
+        return self.base_learn_rate / (self.item_mean.get(ia) + self.epsilon)
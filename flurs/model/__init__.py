@@ -1,9 +1,9 @@
 from .bprmf import BPRMF
 from .factorization_machine import FactorizationMachine
 from .matrix_factorization import MatrixFactorization
-from .online_sketch import OnlineSketch
+from .online_sketch import OnlineSketch, OnlineRandomSketch, OnlineSparseSketch
 from .user_knn import UserKNN
 from .brismf import BRISMF
 from .normalized_mf import NormalizedMF
 
-__all__ = ['BPRMF', 'BRISMF', 'FactorizationMachine', 'MatrixFactorization', 'NormalizedMF', 'OnlineSketch', 'UserKNN']
+__all__ = ['BPRMF', 'BRISMF', 'FactorizationMachine', 'MatrixFactorization', 'NormalizedMF', 'OnlineRandomSketch', 'OnlineSketch', 'OnlineSparseSketch', 'UserKNN']
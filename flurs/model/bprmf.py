@@ -2,8 +2,13 @@ from sklearn.base import BaseEstimator
 
 import numpy as np
 
+from ..negative_sampler import UniformNegativeSampler
+from ..utils.factor_store import FactorStore
+from ..utils.item_index import ItemIndexMixin
+from ..utils.batch import conflict_free_rounds
 
-class BPRMF(BaseEstimator):
+
+class BPRMF(BaseEstimator, ItemIndexMixin):
 
     """Incremental Matrix Factorization with BPR optimization
 
@@ -13,41 +18,103 @@ class BPRMF(BaseEstimator):
 
     """
 
-    def __init__(self, k=40, l2_reg=.01, learn_rate=.003):
+    factor_names = ('P', 'Q')
+
+    def __init__(self, k=40, l2_reg=.01, learn_rate=.003, sampler=None, n_negative=1):
         self.k = k
         self.l2_reg_u = l2_reg
         self.l2_reg_i = l2_reg  # positive items: i
         self.l2_reg_j = l2_reg  # negative items: j
         self.learn_rate = learn_rate
 
-        self.Q = np.array([])
+        # negative items are drawn by a sampler, `n_negative` of them per positive item
+        self.sampler = UniformNegativeSampler() if sampler is None else sampler
+        self.n_negative = n_negative
 
-    def update_model(self, ua, ia):
+        # factors are kept in growable buffers; P and Q are views of their active rows
+        self.user_factors = FactorStore(k, std=0.1)
+        self.item_factors = FactorStore(k, std=0.1)
+        self.P = self.user_factors.matrix
+        self.Q = self.item_factors.matrix
 
-        u_vec = self.users[ua]['vec']
-        i_vec = self.Q[ia]
-        x_ui = np.inner(u_vec, i_vec)
+    def update_model(self, ua, ia, known_items=()):
+        """Update the factors with negative items drawn for a positive one.
+
+        Each of the (ua, ia, j) triples contributes 1/n_negative of a step, all of
+        them computed from the current factors.
 
-        unobserved = list(set(range(self.n_item)) - self.users[ua]['known_items'])
+        Args:
+            ua (int): User index.
+            ia (int): Positive item index.
+            known_items (set): Items known to the user, which are not drawn as negatives.
 
-        # choose one negative (i.e., unobserved) sample
-        j = np.random.choice(unobserved)
+        """
+        self.sampler.observe(ia)
 
-        j_vec = self.Q[j]
+        # choose negative (i.e., unobserved) samples
+        js = self.sampler.sample(known_items, self.n_negative)
+        if js.size == 0:
+            return
 
-        x_uj = np.inner(u_vec, j_vec)
-        x_uij = x_ui - x_uj
+        u_vec = self.P[ua]
+        i_vec = self.Q[ia]
+        J = self.Q[js]
+
+        x_uij = np.dot(i_vec - J, u_vec)
         sigmoid = np.e ** (-x_uij) / (1 + np.e ** (-x_uij))
+        weights = sigmoid / js.size
 
-        grad = i_vec - j_vec
-        next_u_vec = u_vec + self.learn_rate * (sigmoid * grad + self.l2_reg_u * u_vec)
+        grad = np.dot(weights, i_vec - J)
+        next_u_vec = u_vec + self.learn_rate * (grad - self.l2_reg_u * u_vec)
 
-        grad = u_vec
-        next_i_vec = i_vec + self.learn_rate * (sigmoid * grad + self.l2_reg_i * i_vec)
+        grad = np.sum(weights) * u_vec
+        next_i_vec = i_vec + self.learn_rate * (grad - self.l2_reg_i * i_vec)
 
-        grad = -u_vec
-        next_j_vec = j_vec + self.learn_rate * (sigmoid * grad + self.l2_reg_j * j_vec)
+        grad = -np.outer(weights, u_vec)
+        delta_J = self.learn_rate * (grad - self.l2_reg_j * J)
 
-        self.users[ua]['vec'] = next_u_vec
+        self.P[ua] = next_u_vec
         self.Q[ia] = next_i_vec
-        self.Q[j] = next_j_vec
+        np.add.at(self.Q, js, delta_J)
+        self.update_item_index(np.unique(np.append(js, ia)))
+
+    def update_batch(self, users, items, negatives):
+        """Update the model with a block of (u, i, j) triples by using vectorized SGD steps.
+
+        The block is split into rounds in which each user and each (positive or negative) item
+        appears in at most one event, keeping the original order of events sharing a row.
+        Since a round touches disjoint rows of P and Q, the result is the same as taking
+        the steps of `update_model` event by event with the same negatives.
+
+        Args:
+            users (numpy array; (n_event,)): User indices.
+            items (numpy array; (n_event,)): Positive item indices.
+            negatives (numpy array; (n_event, n_negative)): Negative item indices of each event.
+
+        """
+        users = np.asarray(users, dtype=int)
+        items = np.asarray(items, dtype=int)
+        negatives = np.asarray(negatives, dtype=int).reshape((users.size, -1))
+        n_negative = negatives.shape[1]
+
+        for idx in conflict_free_rounds(users, np.column_stack((items, negatives))):
+            ua, ia, js = users[idx], items[idx], negatives[idx]
+
+            U = self.P[ua]
+            I = self.Q[ia]
+            J = self.Q[js]
+
+            D = I[:, np.newaxis, :] - J
+            x_uij = np.einsum('ik,ijk->ij', U, D)
+            sigmoid = np.e ** (-x_uij) / (1 + np.e ** (-x_uij))
+            weights = sigmoid / n_negative
+
+            next_U = U + self.learn_rate * (np.einsum('ij,ijk->ik', weights, D) - self.l2_reg_u * U)
+            next_I = I + self.learn_rate * (np.sum(weights, axis=1)[:, np.newaxis] * U - self.l2_reg_i * I)
+            delta_J = self.learn_rate * (-weights[:, :, np.newaxis] * U[:, np.newaxis, :] - self.l2_reg_j * J)
+
+            self.P[ua] = next_U
+            self.Q[ia] = next_I
+            np.add.at(self.Q, js.ravel(), delta_J.reshape((-1, self.k)))
+
+        self.update_item_index(np.unique(np.column_stack((items, negatives))))
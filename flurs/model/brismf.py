@@ -1,8 +1,11 @@
 from sklearn.base import BaseEstimator
 import numpy as np
-from numba import jit
 
-class BRISMF(BaseEstimator):
+from ..utils.factor_store import FactorStore
+from ..utils.item_index import ItemIndexMixin
+from . import mf_kernels
+
+class BRISMF(BaseEstimator, ItemIndexMixin):
 
     """Biased Regularized Incremental Simultaneous Matrix Factorization
 
@@ -14,18 +17,22 @@ class BRISMF(BaseEstimator):
 
     """
 
-    def __init__(self, k, l2_reg, learn_rate, forgetting, rnd_seed=None):
+    def __init__(self, k, l2_reg, learn_rate, forgetting, rnd_seed=None, use_jit=True):
         self.k = k
         self.l2_reg_u = l2_reg
         self.l2_reg_i = l2_reg
         self.learn_rate = learn_rate
         self.forgetting = forgetting
+        self.use_jit = use_jit
         np.random.seed(rnd_seed)
 
         self.forgetting.reset_forgetting()
 
-        self.A = np.array([])
-        self.B = np.array([])
+        # factors are kept in growable buffers; A and B are views of their active rows
+        self.user_factors = FactorStore(k)
+        self.item_factors = FactorStore(k)
+        self.A = self.user_factors.matrix
+        self.B = self.item_factors.matrix
         self.observer = None
 
     def register_item(self, item):
@@ -46,11 +53,25 @@ class BRISMF(BaseEstimator):
             rating (integer): Rating.
         """
 
-        if self.observer:
-            self.observer.register('u{}'.format(ua))
-            self.observer.register('i{}'.format(ia))
-        else:
-            lrate = self.learn_rate
+        # compiled fast path; observers need the per-event Python hooks
+        kernel = self.use_jit and not self.observer and mf_kernels.kernel_args(self.forgetting)
+        if kernel:
+            mf_kernels.sgd_step(self.A, self.B, ua, ia, rating,
+                                self.learn_rate, self.l2_reg_u, self.l2_reg_i, True, *kernel)
+            self.update_item_index(ia)
+            return
+
+        observer = self.observer
+        indexed = observer is not None and getattr(observer, 'indexed', False)
+
+        if indexed:
+            observer.register_user(ua)
+            observer.register_item(ia)
+        elif observer:
+            u_id = 'u{}'.format(ua)
+            i_id = 'i{}'.format(ia)
+            observer.register(u_id)
+            observer.register(i_id)
 
         u_vec = self.A[ua]
         i_vec = self.B[ia]
@@ -59,14 +80,26 @@ class BRISMF(BaseEstimator):
         err = rating - pred
 
         u_grad = (err * i_vec - self.l2_reg_u * u_vec)
-        if self.observer:
-            self.observer.profile_difference(ia, 'u{}'.format(ua), u_grad)
-        next_u_vec = u_vec + (self.observer.learn_rate('u{}'.format(ua)) if self.observer else self.learn_rate) * u_grad
+        if indexed:
+            observer.user_difference(ua, ia, rating, u_grad)
+            u_lrate = observer.user_learn_rate(ua)
+        elif observer:
+            observer.profile_difference(ia, u_id, u_grad)
+            u_lrate = observer.learn_rate(u_id)
+        else:
+            u_lrate = self.learn_rate
+        next_u_vec = u_vec + u_lrate * u_grad
 
         i_grad = (err * u_vec - self.l2_reg_i * i_vec)
-        if self.observer:
-            self.observer.profile_difference(ua, 'i{}'.format(ia), i_grad)
-        next_i_vec = i_vec + (self.observer.learn_rate('i{}'.format(ia)) if self.observer else self.learn_rate) * i_grad
+        if indexed:
+            observer.item_difference(ia, ua, rating, i_grad)
+            i_lrate = observer.item_learn_rate(ia)
+        elif observer:
+            observer.profile_difference(ua, i_id, i_grad)
+            i_lrate = observer.learn_rate(i_id)
+        else:
+            i_lrate = self.learn_rate
+        next_i_vec = i_vec + i_lrate * i_grad
 
         next_u_vec[0] = 1.
         next_i_vec[1] = 1.
@@ -78,3 +111,4 @@ class BRISMF(BaseEstimator):
 
         self.A[ua] = next_u_vec
         self.B[ia] = next_i_vec
+        self.update_item_index(ia)
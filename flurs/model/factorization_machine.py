@@ -1,7 +1,6 @@
 from sklearn.base import BaseEstimator
 
 import numpy as np
-import scipy.sparse as sp
 
 from .. import logger
 
@@ -35,64 +34,118 @@ class FactorizationMachine(BaseEstimator):
         self.l2_reg_V = np.ones(k) * l2_reg_V
         self.learn_rate = learn_rate
 
-        self.i_mat = sp.csr_matrix([])
-
         # initial parameters
         self.w0 = 0.
         self.w = np.zeros(self.p)
         self.V = np.random.normal(0., 0.1, (self.p, self.k))
 
-        # to keep the last parameters for adaptive regularization
+        # to keep the last parameters for adaptive regularization;
+        # w and V are only logged at the (sorted) rows touched by the last update, since the others are unchanged
         self.prev_w0 = self.w0
-        self.prev_w = self.w.copy()
-        self.prev_V = self.V.copy()
+        self.prev_rows = np.zeros(0, dtype=int)
+        self.prev_w_rows = np.zeros(0)
+        self.prev_V_rows = np.zeros((0, self.k))
+
+    @property
+    def prev_w(self):
+        """numpy array; (p,): w before the last update.
+        """
+        prev_w = self.w.copy()
+        prev_w[self.prev_rows] = self.prev_w_rows
+        return prev_w
+
+    @property
+    def prev_V(self):
+        """numpy array; (p, k): V before the last update.
+        """
+        prev_V = self.V.copy()
+        prev_V[self.prev_rows] = self.prev_V_rows
+        return prev_V
+
+    def previous_params(self, indices):
+        """Get w and V before the last update at some rows.
+
+        Args:
+            indices (numpy array; (n,)): Row indices.
+
+        Returns:
+            (numpy array, numpy array): (w; (n,), V; (n, k)) before the last update.
+
+        """
+        w = self.w[indices]
+        V = self.V[indices]
+        if self.prev_rows.size:
+            position = np.minimum(np.searchsorted(self.prev_rows, indices), self.prev_rows.size - 1)
+            logged = self.prev_rows[position] == indices
+            w[logged] = self.prev_w_rows[position[logged]]
+            V[logged] = self.prev_V_rows[position[logged]]
+        return w, V
 
     def update_reg(self, x, err):
-        x_vec = np.array([x]).T  # p x 1
+        nonzero = np.flatnonzero(x)
+        self.update_reg_sparse(nonzero, x[nonzero], err)
+
+    def update_reg_sparse(self, indices, values, err):
+        """Update the regularization parameters for an input given by its nonzero entries.
 
+        Args:
+            indices (numpy array; (nnz,)): Indices of the nonzero entries of the input vector.
+            values (numpy array; (nnz,)): Values of the nonzero entries.
+            err (float): Prediction error of the input.
+
+        """
         # update regularization parameters
         coeff = 4. * self.learn_rate * err * self.learn_rate
 
         self.l2_reg_w0 = max(0., self.l2_reg_w0 + coeff * self.prev_w0)
-        self.l2_reg_w = max(0., self.l2_reg_w + coeff * np.inner(x, self.prev_w))
+        prev_w, prev_V = self.previous_params(indices)
+        self.l2_reg_w = max(0., self.l2_reg_w + coeff * np.inner(values, prev_w))
 
         if self.l2_reg_w0 == 0. or self.l2_reg_w == 0.:
             logger.warn('reg_w0 and/or reg_w are fallen in 0.0')
 
-        dot_v = np.dot(x_vec.T, self.V).reshape((self.k,))  # (k, )
-        dot_prev_v = np.dot(x_vec.T, self.prev_V).reshape((self.k,))  # (k, )
-        s_duplicated = np.dot((x_vec.T ** 2), self.V * self.prev_V).reshape((self.k,))  # (k, )
+        V = self.V[indices]
+        dot_v = np.dot(values, V)  # (k, )
+        dot_prev_v = np.dot(values, prev_V)  # (k, )
+        s_duplicated = np.dot(values ** 2, V * prev_V)  # (k, )
         self.l2_rev_V = np.maximum(np.zeros(self.k), self.l2_reg_V + coeff * (dot_v * dot_prev_v - s_duplicated))
 
     def update_model(self, x, value):
-        x_vec = np.array([x]).T  # p x 1
-        interaction = np.sum(np.dot(self.V.T, x_vec) ** 2 - np.dot(self.V.T ** 2, x_vec ** 2)) / 2.
-        pred = self.w0 + np.inner(self.w, x) + interaction
+        nonzero = np.flatnonzero(x)
+        self.update_model_sparse(nonzero, x[nonzero], value)
+
+    def update_model_sparse(self, indices, values, value):
+        """Update the model for an input given by its nonzero entries, in O(nnz * k).
+
+        Args:
+            indices (numpy array; (nnz,)): Distinct indices of the nonzero entries of the input vector.
+            values (numpy array; (nnz,)): Values of the nonzero entries.
+            value (float): Target value.
+
+        """
+        V = self.V[indices]
+        dot_v = np.dot(values, V)
+        interaction = np.sum(dot_v ** 2 - np.dot(values ** 2, V ** 2)) / 2.
+        pred = self.w0 + np.inner(self.w[indices], values) + interaction
 
         # compute current error
         err = value - pred
 
-        self.update_reg(x, err)
+        self.update_reg_sparse(indices, values, err)
 
         # update w0 with keeping the previous value
         self.prev_w0 = self.w0
         self.w0 = self.w0 + 2. * self.learn_rate * (err * 1. - self.l2_reg_w0 * self.w0)
 
-        # keep the previous w for auto-parameter optimization
-        self.prev_w = np.empty_like(self.w)
-        self.prev_w[:] = self.w
-
-        # keep the previous V
-        self.prev_V = np.empty_like(self.V)
-        self.prev_V[:] = self.V
-
-        # update w and V
-        prod = np.dot(np.array([x]), self.prev_V)  # (1, p) and (p, k) => (1, k)
-        for pi in range(self.p):
-            if x[pi] == 0.:
-                continue
+        # keep the previous w and V of the touched rows for auto-parameter optimization
+        self.prev_rows = np.sort(indices)
+        self.prev_w_rows = self.w[self.prev_rows]
+        self.prev_V_rows = self.V[self.prev_rows]
 
-            self.w[pi] = self.prev_w[pi] + 2. * self.learn_rate * (err * x[pi] - self.l2_reg_w * self.prev_w[pi])
+        # update w and V only at the nonzero coordinates; x . prev_V == dot_v at this point
+        prev_w = self.w[indices]
+        self.w[indices] = prev_w + 2. * self.learn_rate * (err * values - self.l2_reg_w * prev_w)
 
-            g = err * x[pi] * (prod - x[pi] * self.prev_V[pi])
-            self.V[pi] = self.prev_V[pi] + 2. * self.learn_rate * (g - self.l2_reg_V * self.prev_V[pi])
+        x = values[:, np.newaxis]
+        g = err * x * (dot_v - x * V)
+        self.V[indices] = V + 2. * self.learn_rate * (g - self.l2_reg_V * V)
@@ -1,8 +1,12 @@
 from sklearn.base import BaseEstimator
 import numpy as np
-from numba import jit
 
-class MatrixFactorization(BaseEstimator):
+from ..utils.factor_store import FactorStore
+from ..utils.item_index import ItemIndexMixin
+from ..utils.batch import conflict_free_rounds
+from . import mf_kernels
+
+class MatrixFactorization(BaseEstimator, ItemIndexMixin):
 
     """Incremental Matrix Factorization
 
@@ -12,17 +16,21 @@ class MatrixFactorization(BaseEstimator):
 
     """
 
-    def __init__(self, k, l2_reg, learn_rate, forgetting, rnd_seed=None):
+    def __init__(self, k, l2_reg, learn_rate, forgetting, rnd_seed=None, use_jit=True):
         self.k = k
         self.l2_reg_u = l2_reg
         self.l2_reg_i = l2_reg
         self.learn_rate = learn_rate
         self.forgetting = forgetting
+        self.use_jit = use_jit
         np.random.seed(rnd_seed)
         self.forgetting.reset_forgetting()
 
-        self.A = np.array([])
-        self.B = np.array([])
+        # factors are kept in growable buffers; A and B are views of their active rows
+        self.user_factors = FactorStore(k)
+        self.item_factors = FactorStore(k)
+        self.A = self.user_factors.matrix
+        self.B = self.item_factors.matrix
         self.observer = None
 
     def register_item(self, item):
@@ -43,11 +51,25 @@ class MatrixFactorization(BaseEstimator):
             rating (integer): Rating.
         """
 
-        if self.observer:
-            self.observer.register('u{}'.format(ua))
-            self.observer.register('i{}'.format(ia))
-        else:
-            lrate = self.learn_rate
+        # compiled fast path; observers need the per-event Python hooks
+        kernel = self.use_jit and not self.observer and mf_kernels.kernel_args(self.forgetting)
+        if kernel:
+            mf_kernels.sgd_step(self.A, self.B, ua, ia, rating,
+                                self.learn_rate, self.l2_reg_u, self.l2_reg_i, False, *kernel)
+            self.update_item_index(ia)
+            return
+
+        observer = self.observer
+        indexed = observer is not None and getattr(observer, 'indexed', False)
+
+        if indexed:
+            observer.register_user(ua)
+            observer.register_item(ia)
+        elif observer:
+            u_id = 'u{}'.format(ua)
+            i_id = 'i{}'.format(ia)
+            observer.register(u_id)
+            observer.register(i_id)
 
         u_vec = self.A[ua]
         i_vec = self.B[ia]
@@ -56,14 +78,26 @@ class MatrixFactorization(BaseEstimator):
         err = rating - pred
 
         u_grad = (err * i_vec - self.l2_reg_u * u_vec)
-        if self.observer:
-            self.observer.profile_difference(ia, 'u{}'.format(ua), u_grad)
-        next_u_vec = u_vec + (self.observer.learn_rate('u{}'.format(ua)) if self.observer else self.learn_rate) * u_grad
+        if indexed:
+            observer.user_difference(ua, ia, rating, u_grad)
+            u_lrate = observer.user_learn_rate(ua)
+        elif observer:
+            observer.profile_difference(ia, u_id, u_grad)
+            u_lrate = observer.learn_rate(u_id)
+        else:
+            u_lrate = self.learn_rate
+        next_u_vec = u_vec + u_lrate * u_grad
 
         i_grad = (err * u_vec - self.l2_reg_i * i_vec)
-        if self.observer:
-            self.observer.profile_difference(ua, 'i{}'.format(ia), i_grad)
-        next_i_vec = i_vec + (self.observer.learn_rate('i{}'.format(ia)) if self.observer else self.learn_rate) * i_grad
+        if indexed:
+            observer.item_difference(ia, ua, rating, i_grad)
+            i_lrate = observer.item_learn_rate(ia)
+        elif observer:
+            observer.profile_difference(ua, i_id, i_grad)
+            i_lrate = observer.learn_rate(i_id)
+        else:
+            i_lrate = self.learn_rate
+        next_i_vec = i_vec + i_lrate * i_grad
 
         self.forgetting.update(ua, ia, rating)
         next_i_vec = self.forgetting.item_forgetting(next_i_vec, ia, i_vec)
@@ -72,3 +106,55 @@ class MatrixFactorization(BaseEstimator):
 
         self.A[ua] = next_u_vec
         self.B[ia] = next_i_vec
+        self.update_item_index(ia)
+
+    def update_batch(self, users, items, ratings):
+        """Update the model with a block of events by using vectorized SGD steps.
+
+        With the compiled kernels, events are simply processed in order. Otherwise, the block is
+        split into rounds in which each user and each item appears at most once, keeping the original
+        order of events sharing a user or an item. Since a round touches disjoint rows of A and B,
+        the result is the same as calling `update_model` event by event either way.
+
+        Args:
+            users (numpy array; (n_event,)): User IDs.
+            items (numpy array; (n_event,)): Item IDs.
+            ratings (numpy array; (n_event,)): Ratings.
+        """
+        users = np.asarray(users, dtype=int)
+        items = np.asarray(items, dtype=int)
+        ratings = np.asarray(ratings, dtype=float)
+
+        # observers keep per-event state, so they are fed one event at a time
+        if self.observer:
+            for ua, ia, rating in zip(users, items, ratings):
+                self.update_model(ua, ia, rating)
+            return
+
+        kernel = self.use_jit and mf_kernels.kernel_args(self.forgetting)
+        if kernel:
+            mf_kernels.sgd_batch(self.A, self.B, users, items, ratings,
+                                 self.learn_rate, self.l2_reg_u, self.l2_reg_i, False, *kernel)
+            self.update_item_index(np.unique(items))
+            return
+
+        for idx in conflict_free_rounds(users, items):
+            ua, ia, rating = users[idx], items[idx], ratings[idx]
+
+            U = self.A[ua]
+            I = self.B[ia]
+
+            pred = np.einsum('ij,ij->i', U, I)
+            err = (rating - pred)[:, np.newaxis]
+
+            next_U = U + self.learn_rate * (err * I - self.l2_reg_u * U)
+            next_I = I + self.learn_rate * (err * U - self.l2_reg_i * I)
+
+            self.forgetting.update_batch(ua, ia, rating)
+            next_I = self.forgetting.item_forgetting_batch(next_I, ia, I)
+            next_U = self.forgetting.user_forgetting_batch(next_U, ua, U)
+
+            self.A[ua] = next_U
+            self.B[ia] = next_I
+
+        self.update_item_index(np.unique(items))
@@ -0,0 +1,141 @@
+"""Compiled kernels for the SGD step of MatrixFactorization and BRISMF.
+
+A kernel fuses prediction, gradient step and forgetting, and updates A, B (and
+the item counters of ForgetUnpopularItems) in place. Numba is optional: when it
+is not installed, `kernel_args` returns None and the models keep using their
+pure-Python path.
+
+"""
+import numpy as np
+
+from ..forgetting import NoForgetting, UserFactorFading, SDUserFactorFading, MappedUserFactorFading, ForgetUnpopularItems
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+NO_FORGETTING = 0
+USER_FACTOR_FADING = 1
+SD_USER_FACTOR_FADING = 2
+MAPPED_USER_FACTOR_FADING = 3
+FORGET_UNPOPULAR_ITEMS = 4
+
+# only exact types are mapped; subclasses may override the forgetting hooks
+MODES = {NoForgetting: NO_FORGETTING,
+         UserFactorFading: USER_FACTOR_FADING,
+         SDUserFactorFading: SD_USER_FACTOR_FADING,
+         MappedUserFactorFading: MAPPED_USER_FACTOR_FADING,
+         ForgetUnpopularItems: FORGET_UNPOPULAR_ITEMS}
+
+NO_ITEM_RATINGS = np.zeros((0, 1))
+
+
+def kernel_args(forgetting):
+    """Get the forgetting-related arguments of the kernels.
+
+    Args:
+        forgetting (BaseForgetting): Forgetting technique of a model.
+
+    Returns:
+        (int, float, numpy array) or None: (mode, alpha, item rating counters),
+        or None if no kernel can handle the forgetting technique.
+
+    """
+    if njit is None:
+        return None
+
+    mode = MODES.get(type(forgetting))
+    if mode is None:
+        return None
+
+    alpha = 0. if mode == NO_FORGETTING else float(forgetting.alpha)
+    item_ratings = forgetting.item_ratings if mode == FORGET_UNPOPULAR_ITEMS else NO_ITEM_RATINGS
+
+    return mode, alpha, item_ratings
+
+
+def _sgd_step(A, B, ua, ia, rating, learn_rate, l2_reg_u, l2_reg_i, biased, mode, alpha, item_ratings):
+    k = A.shape[1]
+
+    pred = 0.
+    for f in range(k):
+        pred += A[ua, f] * B[ia, f]
+    err = rating - pred
+
+    next_u_vec = np.empty(k)
+    next_i_vec = np.empty(k)
+    for f in range(k):
+        u = A[ua, f]
+        i = B[ia, f]
+        next_u_vec[f] = u + learn_rate * (err * i - l2_reg_u * u)
+        next_i_vec[f] = i + learn_rate * (err * u - l2_reg_i * i)
+
+    if biased:
+        next_u_vec[0] = 1.
+        next_i_vec[1] = 1.
+
+    if mode == FORGET_UNPOPULAR_ITEMS:
+        item_ratings[ia, 0] += 1.
+        next_i_vec *= 1. - alpha ** -item_ratings[ia, 0]
+    elif mode == USER_FACTOR_FADING:
+        next_u_vec *= alpha
+    elif mode == SD_USER_FACTOR_FADING or mode == MAPPED_USER_FACTOR_FADING:
+        diff = next_u_vec - A[ua]
+        stability = alpha ** (- np.sqrt(np.std(diff)))
+        if mode == SD_USER_FACTOR_FADING:
+            next_u_vec *= stability
+        else:
+            squared_diff = diff ** 2
+            squared_diff /= np.max(squared_diff)
+            next_u_vec *= 1. - stability * squared_diff
+
+    A[ua] = next_u_vec
+    B[ia] = next_i_vec
+
+
+def _sgd_batch(A, B, users, items, ratings, learn_rate, l2_reg_u, l2_reg_i, biased, mode, alpha, item_ratings):
+    for t in range(users.shape[0]):
+        _sgd_step(A, B, users[t], items[t], ratings[t],
+                  learn_rate, l2_reg_u, l2_reg_i, biased, mode, alpha, item_ratings)
+
+
+if njit is not None:
+    _sgd_step = njit(cache=True)(_sgd_step)
+    _sgd_batch = njit(cache=True)(_sgd_batch)
+
+
+def sgd_step(A, B, ua, ia, rating, learn_rate, l2_reg_u, l2_reg_i, biased, mode, alpha, item_ratings):
+    """Apply one SGD step (with forgetting) for a user-item pair in place.
+
+    Args:
+        A (numpy array; (n_user, k)): User factors.
+        B (numpy array; (n_item, k)): Item factors.
+        ua (int): User index.
+        ia (int): Item index.
+        rating (float): Rating.
+        learn_rate (float): Learning rate.
+        l2_reg_u (float): L2 regularization for user factors.
+        l2_reg_i (float): L2 regularization for item factors.
+        biased (bool): Fix the bias columns as BRISMF does (A[:, 0] = B[:, 1] = 1).
+        mode, alpha, item_ratings: Output of `kernel_args`.
+
+    """
+    _sgd_step(A, B, int(ua), int(ia), float(rating), float(learn_rate), float(l2_reg_u), float(l2_reg_i),
+              biased, mode, alpha, item_ratings)
+
+
+def sgd_batch(A, B, users, items, ratings, learn_rate, l2_reg_u, l2_reg_i, biased, mode, alpha, item_ratings):
+    """Apply SGD steps for a block of events in their order, in place.
+
+    Args:
+        users (numpy array; (n_event,)): User indices.
+        items (numpy array; (n_event,)): Item indices.
+        ratings (numpy array; (n_event,)): Ratings.
+        Other arguments are the same as `sgd_step`.
+
+    """
+    _sgd_batch(A, B, np.asarray(users, dtype=np.int64), np.asarray(items, dtype=np.int64),
+               np.asarray(ratings, dtype=np.float64), float(learn_rate), float(l2_reg_u), float(l2_reg_i),
+               biased, mode, alpha, item_ratings)
@@ -1,7 +1,10 @@
 from sklearn.base import BaseEstimator
 import numpy as np
 
-class NormalizedMF(BaseEstimator):
+from ..utils.factor_store import FactorStore
+from ..utils.item_index import ItemIndexMixin
+
+class NormalizedMF(BaseEstimator, ItemIndexMixin):
 
     """Incremental Matrix Factorization
 
@@ -19,8 +22,11 @@ class NormalizedMF(BaseEstimator):
         self.l2_reg = l2_reg
         self.forgetting.reset_forgetting()
 
-        self.A = np.array([])
-        self.B = np.array([])
+        # factors are kept in growable buffers; A and B are views of their active rows
+        self.user_factors = FactorStore(k)
+        self.item_factors = FactorStore(k)
+        self.A = self.user_factors.matrix
+        self.B = self.item_factors.matrix
         self.observer = None
 
     def register_item(self, item):
@@ -73,4 +79,5 @@ class NormalizedMF(BaseEstimator):
 	
         self.A[ua] = self.A[ua] * np.sqrt(self.norm_value / np.dot(self.A[ua], self.A[ua].T))
         self.B[ia] = self.B[ia] * np.sqrt(self.norm_value / np.dot(self.B[ia], self.B[ia].T))
+        self.update_item_index(ia)
 	
@@ -5,7 +5,7 @@ from ..utils.projection import Raw, RandomProjection, RandomMaclaurinProjection,
 import numpy as np
 import numpy.linalg as ln
 import scipy.sparse as sp
-from sklearn import preprocessing
+from scipy.sparse.linalg import svds
 
 
 class OnlineSketch(BaseEstimator):
@@ -16,10 +16,15 @@ class OnlineSketch(BaseEstimator):
     "Sketching Dynamic User-Item Interactions for Online Item Recommendation"
     In Proceedings of CHIIR 2017, March 2017.
 
+    With `mode='exact'`, the sketch is shrunk by an SVD on every insertion. With `mode='buffered'`,
+    it is a 2 ell column buffer which is only shrunk once it fills up, amortizing the SVD over ell
+    insertions; `U_r` is then recomputed from the buffer when it is read after new insertions.
+
     """
 
-    def __init__(self, p=None, k=40, ell=-1, r=-1, proj='Raw'):
+    def __init__(self, p=None, k=40, ell=-1, r=-1, proj='Raw', mode='exact'):
         assert p is not None
+        assert mode in ('exact', 'buffered')
 
         # number of dimensions of input vectors
         self.p = p
@@ -35,7 +40,14 @@ class OnlineSketch(BaseEstimator):
         # number of tracked orthogonal bases
         # * upper bound of r is ell (r <= ell) because U_r is obtained from SVD(B) (or SVD(E)), and
         #   B and E always have ell columns
-        self.r = int(np.ceil(self.ell / 2)) if r < 1 else np.min(r, self.ell)
+        self.r = int(np.ceil(self.ell / 2)) if r < 1 else min(r, self.ell)
+
+        self.mode = mode
+
+        # tracked orthonormal bases, whether they lag behind the sketch, and how many times they changed
+        self._U_r = np.zeros((self.k, self.r))
+        self.stale = False
+        self.n_basis = 0
 
         # initialize projection instance which is specified by `proj` argument
         if proj == 'Raw':
@@ -47,18 +59,100 @@ class OnlineSketch(BaseEstimator):
         elif proj == 'TensorSketchProjection':
             self.proj = TensorSketchProjection(self.k, self.p)
 
-        self.i_mat = sp.csr_matrix([])
+    @property
+    def U_r(self):
+        """numpy array; (k, r): Tracked orthonormal bases, recomputed if the sketch has changed since.
+        """
+        if self.stale:
+            self.refresh_bases()
+        return self._U_r
+
+    @U_r.setter
+    def U_r(self, U_r):
+        self._U_r = U_r
+        self.stale = False
+        self.n_basis += 1
+
+    def refresh_bases(self):
+        """Recompute `U_r` from the filled columns of the buffered sketch.
+        """
+        U, s = self.svd(self.B[:, :self.n_filled])
+        U_r = np.zeros((self.k, self.r))
+        U_r[:, :min(self.r, U.shape[1])] = U[:, :self.r]
+        self.U_r = U_r
+
+    def svd(self, M):
+        """Compute the left singular vectors and the singular values of a matrix.
+
+        Args:
+            M (numpy array; (k, n)): Matrix.
+
+        Returns:
+            (numpy array, numpy array): (Left singular vectors, Singular values in descending order).
+
+        """
+        U, s, V = ln.svd(M, full_matrices=False)
+        return U, s
+
+    def reduce(self, y):
+        """Project an input vector.
+
+        Args:
+            y (numpy array; (p,) or scipy sparse matrix; (p, 1)): Input vector; a sparse column
+                is projected at a cost depending on its nonzero entries for sparse projections.
+
+        Returns:
+            numpy array; (k, 1): Projected vector.
+
+        """
+        if not sp.issparse(y):
+            y = np.array([y]).T
+        y = self.proj.reduce(y)
+        return y.toarray() if sp.issparse(y) else y
+
+    def normalize(self, Y):
+        """l2-normalize columns (as `preprocessing.normalize`, which costs far more for a few columns).
+        """
+        norms = np.sqrt(np.einsum('ij,ij->j', Y, Y))
+        norms[norms == 0.] = 1.
+        return Y / norms
 
     def update_model(self, y):
-        y = self.proj.reduce(np.array([y]).T)
-        y = np.ravel(preprocessing.normalize(y, norm='l2', axis=0))
+        self.insert(self.normalize(self.reduce(y)))
+
+    def update_batch(self, Y):
+        """Update the sketch with a block of input vectors at once.
+
+        Args:
+            Y (numpy array or scipy sparse matrix; (p, n)): Input vectors as columns.
+
+        """
+        Y = self.proj.reduce(Y)
+        Y = Y.toarray() if sp.issparse(Y) else np.asarray(Y, dtype=float)
+        self.insert(self.normalize(Y))
+
+    def insert(self, Y):
+        """Insert projected and normalized vectors into the sketch.
+
+        Args:
+            Y (numpy array; (k, n)): Vectors as columns.
+
+        """
+        if self.mode == 'buffered':
+            # zero vectors would only take columns of the buffer
+            self.insert_buffer(Y[:, np.any(Y != 0., axis=0)])
+            return
+
+        for y in Y.T:
+            self.insert_exact(y)
 
+    def insert_exact(self, y):
         if not hasattr(self, 'B'):
             self.B = np.zeros((self.k, self.ell))
+            self.n_filled = 0
 
         # combine current sketched matrix with input at time t
-        zero_cols = np.nonzero([np.isclose(s_col, 0.0) for s_col in np.sum(self.B, axis=0)])[0]
-        j = zero_cols[0] if zero_cols.size != 0 else self.ell - 1  # left-most all-zero column in B
+        j = min(self.n_filled, self.ell - 1)  # left-most all-zero column in B
         self.B[:, j] = y
 
         U, s, V = ln.svd(self.B, full_matrices=False)
@@ -71,155 +165,280 @@ class OnlineSketch(BaseEstimator):
         s_ell = s[:self.ell]
 
         # shrink step in the Frequent Directions algorithm
-        # (shrink singular values based on the squared smallest singular value)
+        # (shrink singular values based on the squared smallest singular value;
+        # the vectorized square may round it slightly below `delta`)
         delta = s_ell[-1] ** 2
-        s_ell = np.sqrt(s_ell ** 2 - delta)
+        s_ell = np.sqrt(np.maximum(s_ell ** 2 - delta, 0.))
 
         self.B = np.dot(U_ell, np.diag(s_ell))
 
+        # columns of the zero singular values are all-zero
+        self.n_filled = np.count_nonzero(~np.isclose(s_ell, 0.))
 
-class OnlineRandomSketch(OnlineSketch):
+    def insert_buffer(self, Y):
+        """Fill the 2 ell column buffer with vectors, and shrink the buffer whenever it is full.
 
-    """Inspired by: Streaming Anomaly Detection using Randomized Matrix Sketching
-    [WIP] many matrix multiplications are computational heavy
-    """
+        Args:
+            Y (numpy array; (k, n)): Vectors as columns.
 
-    def update_model(self, y):
-        y = self.proj.reduce(np.array([y]).T)
-        y = np.ravel(preprocessing.normalize(y, norm='l2', axis=0))
+        """
+        if not hasattr(self, 'B'):
+            self.B = np.zeros((self.k, 2 * self.ell))
+            self.n_filled = 0
 
-        if not hasattr(self, 'E'):
-            self.E = np.zeros((self.k, self.ell))
+        head = 0
+        while head < Y.shape[1]:
+            n = min(Y.shape[1] - head, 2 * self.ell - self.n_filled)
+            self.B[:, self.n_filled:self.n_filled + n] = Y[:, head:head + n]
+            self.n_filled += n
+            head += n
 
-        # combine current sketched matrix with input at time t
-        zero_cols = np.nonzero([np.isclose(s_col, 0.0) for s_col in np.sum(self.E, axis=0)])[0]
-        j = zero_cols[0] if zero_cols.size != 0 else self.ell - 1  # left-most all-zero column in B
-        self.E[:, j] = y
+            if self.n_filled == 2 * self.ell:
+                self.shrink_buffer()
+            else:
+                self.stale = True
 
-        Gaussian = np.random.normal(0., 0.1, (self.k, 100 * self.ell))
-        MM = np.dot(self.E, self.E.T)
-        Q, R = ln.qr(np.dot(MM, Gaussian))
+    def shrink_buffer(self):
+        U, s = self.svd(self.B)
 
-        # eig() returns eigen values/vectors with unsorted order
-        s, A = ln.eig(np.dot(np.dot(Q.T, MM), Q))
-        order = np.argsort(s)[::-1]
-        s = s[order]
-        A = A[:, order]
+        # the buffer includes the latest input
+        self.U_r = U[:, :self.r]
 
-        U = np.dot(Q, A)
+        # shrink step in the Frequent Directions algorithm, based on the ell-th squared singular value;
+        # at most ell - 1 non-zero columns remain
+        n = min(self.ell, s.size)
+        delta = s[self.ell - 1] ** 2 if s.size >= self.ell else 0.
+        s_ell = np.sqrt(np.maximum(s[:n] ** 2 - delta, 0.))
 
-        # update the tracked orthonormal bases
-        self.U_r = U[:, :self.r]
+        self.B[:] = 0.
+        self.B[:, :n] = U[:, :n] * s_ell
+        self.n_filled = np.count_nonzero(~np.isclose(s_ell, 0.))
 
-        # update ell orthogonal bases
-        U_ell = U[:, :self.ell]
-        s_ell = s[:self.ell]
 
-        # shrink step in the Frequent Directions algorithm
-        delta = s_ell[-1]
-        s_ell = np.sqrt(s_ell - delta)
+class OnlineRandomSketch(OnlineSketch):
 
-        self.E = np.dot(U_ell, np.diag(s_ell))
+    """Buffered sketch shrunk by a randomized SVD
 
+    Inspired by: H. Huang and S. P. Kasiviswanathan.
+    "Streaming Anomaly Detection Using Randomized Matrix Sketching"
+    In Proceedings of the VLDB Endowment, 9(3), pages 192-203, 2015.
 
-class OnlineSparseSketch(OnlineSketch):
+    The 2 ell column buffer of the `buffered` mode is shrunk by the randomized range finder of
+    Halko et al.: its range is sampled by a Gaussian test matrix with `n_oversample` extra columns,
+    which is drawn once and reused, and refined by `n_iter` power iterations; the SVD is then
+    taken on the (ell + n_oversample) dimensional range instead of the buffer.
 
-    """Inspired by: Efficient Frequent Directions Algorithm for Sparse Matrices
     """
 
-    def update_model(self, y):
-        y = self.proj.reduce(np.array([y]).T)
-        y = preprocessing.normalize(y, norm='l2', axis=0)  # (k, 1)
+    def __init__(self, p=None, k=40, ell=-1, r=-1, proj='Raw', n_oversample=10, n_iter=1):
+        super(OnlineRandomSketch, self).__init__(p, k, ell, r, proj, mode='buffered')
 
-        if not hasattr(self, 'B'):
-            self.p_failure = 0.1
-            self.B = np.zeros((self.k, self.ell))
-            self.A = np.array([])
+        self.n_oversample = n_oversample
+        self.n_iter = n_iter
 
-        U, s, V = ln.svd(self.B, full_matrices=False)
+        # random test matrix for the range finder
+        self.Omega = np.random.normal(0., 1., (2 * self.ell, min(self.ell + n_oversample, 2 * self.ell)))
 
-        # update the tracked orthonormal bases
-        self.U_r = U[:, :self.r]
+    def svd(self, M):
+        n = M.shape[1]
 
-        if self.A.size == 0:
-            self.A = np.empty_like(y)
-            self.A[:] = y[:]
-        else:
-            self.A = np.concatenate((self.A, y), axis=1)
+        # orthonormal bases of the sampled range of M
+        Q, R = ln.qr(np.dot(M, self.Omega[:n]))
+        for _ in range(self.n_iter):
+            Q, R = ln.qr(np.dot(M.T, Q))
+            Q, R = ln.qr(np.dot(M, Q))
 
-        if np.count_nonzero(self.A) >= (self.ell * self.k) or self.A.shape[1] == self.k:
-            B = self.__boosted_sparse_shrink(self.A, self.ell, self.p_failure)
-            self.B = self.__dense_shrink(np.concatenate((self.B, B), axis=1), self.ell)
-            self.A = np.array([])
+        U, s, V = ln.svd(np.dot(Q.T, M), full_matrices=False)
+        return np.dot(Q, U), s
 
-    def __simultaneous_iteration(self, A, k, eps):
-        n, d = A.shape
 
-        q = int(np.log((n / eps) / eps))
-        G = np.random.normal(0., 1., (d, k))
+class OnlineSparseSketch(OnlineSketch):
 
-        # Gram-Schmidt
-        Y = np.dot(np.dot(ln.matrix_power(np.dot(A, A.T), q), A), G)  # (n, k)
-        Q, R = ln.qr(Y, mode='complete')
+    """Sketch of sparse input vectors
 
-        return Q
+    Inspired by: M. Ghashami, E. Liberty, and J. M. Phillips.
+    "Efficient Frequent Directions Algorithm for Sparse Matrices"
+    In Proceedings of KDD 2016, pages 845-854, 2016.
 
-    def __sparse_shrink(self, A, ell):
-        m, d = A.shape
+    Projected inputs are kept as sparse columns until they have ell k nonzero entries or `buffer_size`
+    columns, so that the buffer takes as much memory as the (k, ell) dense sketch at most. The buffer is
+    then shrunk to ell columns by a randomized SVD whose error is verified by a randomized spectral test;
+    after `max_retry` failed tests, it is shrunk by a truncated sparse SVD instead. The result is merged
+    into the sketch by a dense shrink. `U_r` is updated at each merge, and `flush` forces one.
 
-        Z = self.__simultaneous_iteration(A, ell, 1 / 4)
-        P = sp.csr_matrix(np.dot(Z.T, A))
+    Without projection, k equals the input dimensions, and the default budget of k columns would leave
+    the sketch (and `U_r`) behind the stream for as long as 2^20 events for hashed features; a merge
+    costs O(k ell^2) though, so `buffer_size` trades the lag of `U_r` for the cost per event.
 
-        # 1 <= ell < min(P.shape)
-        H_ell, s_ell, V_ell = sp.linalg.svds(P, ell)
+    """
 
-        # shrink step in the Frequent Directions algorithm
-        # (shrink singular values based on the squared smallest singular value)
-        lambda_ell = s_ell[-1] ** 2
-        s_ell = np.sqrt(s_ell ** 2 - lambda_ell)
+    def __init__(self, p=None, k=40, ell=-1, r=-1, proj='Raw', p_failure=0.1, max_retry=5, buffer_size=None):
+        super(OnlineSparseSketch, self).__init__(p, k, ell, r, proj)
 
-        return np.dot(H_ell, np.diag(s_ell))
+        self.p_failure = p_failure
+        self.max_retry = max_retry
 
-    def __boosted_sparse_shrink(self, A, ell, p_failure):
-        al = (6 / 41) * ell
-        sq_norm_A = ln.norm(A, ord='fro') ** 2
-        AA = np.dot(A, A.T)
+        # largest number of buffered columns
+        self.buffer_size = self.k if buffer_size is None else min(buffer_size, self.k)
 
-        while True:
-            B = self.__sparse_shrink(A, ell)
-            delta = (sq_norm_A - (ln.norm(B, ord='fro') ** 2)) / al
+        self.B = np.zeros((self.k, self.ell))
+        self.n_filled = 0
 
-            C = (AA - np.dot(B, B.T)) / (delta / 2)
-            if self.__verify_spectral(C, p_failure):
-                return B
+        # buffered sparse columns as chunks of their (indices, values) and of their numbers of nonzero entries,
+        # and the number of spectral tests run so far
+        self.pending = []
+        self.n_pending = 0
+        self.nnz_pending = 0
+        self.n_verify = 0
 
-    def __dense_shrink(self, A, ell):
-        H, s, V = ln.svd(A, full_matrices=False)
+    def update_model(self, y):
+        if not sp.issparse(y):
+            y = np.array([y]).T
+        self.update_batch(y)
+
+    def update_batch(self, Y):
+        """Buffer a block of input vectors, and shrink the buffer whenever it is full.
+
+        Args:
+            Y (numpy array or scipy sparse matrix; (p, n)): Input vectors as columns.
+
+        """
+        Y = sp.csc_matrix(self.proj.reduce(Y), dtype=float)
+        Y.sum_duplicates()
+
+        # l2-normalize columns, and drop the zero ones
+        lengths = np.diff(Y.indptr)
+        norms = np.sqrt(np.bincount(np.repeat(np.arange(Y.shape[1]), lengths), weights=Y.data ** 2,
+                                    minlength=Y.shape[1]))
+        nonzero = norms > 0.
+        entries = np.repeat(nonzero, lengths)
+        indices = Y.indices[entries]
+        values = Y.data[entries] / np.repeat(norms[nonzero], lengths[nonzero])
+        lengths = lengths[nonzero]
+
+        ends = np.cumsum(lengths)
+        head = 0
+        while head < lengths.size:
+            offset = ends[head - 1] if head > 0 else 0
+
+            # columns until the buffer reaches ell k nonzero entries or its size
+            n_col = np.searchsorted(ends[head:] - offset, self.ell * self.k - self.nnz_pending) + 1
+            n_col = min(n_col, self.buffer_size - self.n_pending, lengths.size - head)
+
+            nnz = ends[head + n_col - 1] - offset
+            self.pending.append((indices[offset:offset + nnz], values[offset:offset + nnz],
+                                 lengths[head:head + n_col]))
+            self.n_pending += n_col
+            self.nnz_pending += nnz
+            head += n_col
+
+            if self.nnz_pending >= self.ell * self.k or self.n_pending >= self.buffer_size:
+                self.flush()
+
+    def flush(self):
+        """Shrink the buffered sparse columns and merge them into the sketch.
+        """
+        if self.n_pending == 0:
+            return
+
+        indices, values, lengths = [np.concatenate(chunks) for chunks in zip(*self.pending)]
+        A = sp.csc_matrix((values, indices, np.concatenate(([0], np.cumsum(lengths)))),
+                          shape=(self.k, self.n_pending))
+        self.pending = []
+        self.n_pending = 0
+        self.nnz_pending = 0
+
+        # a few columns take less memory than their shrunk sketch
+        C = A.toarray() if A.shape[1] <= self.ell else self.boosted_sparse_shrink(A)
+
+        U, s, V = ln.svd(np.concatenate((self.B[:, :self.n_filled], C), axis=1), full_matrices=False)
+        U_r = np.zeros((self.k, self.r))
+        U_r[:, :min(self.r, U.shape[1])] = U[:, :self.r]
+        self.U_r = U_r
+
+        # dense shrink in the Frequent Directions algorithm, based on the ell-th squared singular value
+        n = min(self.ell, s.size)
+        delta = s[self.ell - 1] ** 2 if s.size >= self.ell else 0.
+        s_ell = np.sqrt(np.maximum(s[:n] ** 2 - delta, 0.))
+
+        self.B[:] = 0.
+        self.B[:, :n] = U[:, :n] * s_ell
+        self.n_filled = np.count_nonzero(~np.isclose(s_ell, 0.))
+
+    def sparse_shrink(self, A):
+        """Shrink a sparse matrix to ell columns by a randomized SVD.
+
+        The range of A is found by the simultaneous iteration, which only multiplies A and A^T with
+        dense (., ell) matrices at a cost of O(nnz(A) ell) each. The iterates are orthonormalized on
+        the side of the m buffered columns, and the (k, ell) range only once.
+
+        Args:
+            A (scipy sparse matrix; (k, m)): Buffered columns.
+
+        Returns:
+            numpy array; (k, ell): Shrunk sketch of A.
+
+        """
+        eps = 1. / 4.
+        n_iter = int(np.log((A.shape[0] / eps) / eps))
+
+        # range of (A A^T)^q A G = A (A^T A)^q G
+        Z = np.random.normal(0., 1., (A.shape[1], self.ell))
+        for _ in range(n_iter):
+            Z, R = ln.qr(A.T.dot(A.dot(Z)))
+        Q, R = ln.qr(A.dot(Z))
+
+        # SVD of Q^T A; (ell, m)
+        H, s, V = ln.svd(A.T.dot(Q).T, full_matrices=False)
+        return self.shrink(np.dot(Q, H), s)
+
+    def boosted_sparse_shrink(self, A):
+        """Repeat `sparse_shrink` until its result passes the spectral test, at most `max_retry` times.
+
+        Args:
+            A (scipy sparse matrix; (k, m)): Buffered columns.
+
+        Returns:
+            numpy array; (k, ell): Shrunk sketch of A.
+
+        """
+        alpha = (6. / 41.) * self.ell
+        sq_norm_A = A.multiply(A).sum()
+
+        for _ in range(self.max_retry):
+            C = self.sparse_shrink(A)
+            delta = (sq_norm_A - np.sum(C ** 2)) / alpha
+            if self.verify_spectral(A, C, delta / 2.):
+                return C
+
+        # truncated sparse SVD; 1 <= ell < min(A.shape)
+        H, s, V = svds(A, self.ell)
+        order = np.argsort(s)[::-1]
+        return self.shrink(H[:, order], s[order])
 
-        H_ell = H[:, :ell]
-        s_ell = s[:ell]
+    def shrink(self, U, s):
+        """Shrink singular values by the squared smallest one, as the Frequent Directions algorithm.
+        """
+        return U * np.sqrt(np.maximum(s ** 2 - s[-1] ** 2, 0.))
 
-        # shrink step in the Frequent Directions algorithm
-        # (shrink singular values based on the squared smallest singular value)
-        lambda_ell = s_ell[-1] ** 2
-        s_ell = np.sqrt(s_ell ** 2 - lambda_ell)
+    def verify_spectral(self, A, C, bound):
+        """Test ||A A^T - C C^T||_2 <= bound by the power method from a random unit vector.
 
-        return np.dot(H_ell, np.diag(s_ell))
+        The failure probability of the i-th test is p_failure / (2 i^2), so that all the tests hold
+        with probability 1 - p_failure. A A^T - C C^T is only applied to vectors.
 
-    def __verify_spectral(self, C, p_failure):
-        d = C.shape[0]
-        c = 1  # some constant
+        """
+        if bound <= 0.:
+            return False
 
-        if not hasattr(self, 'i_verify'):
-            self.i_verify = 0
+        self.n_verify += 1
+        p_failure_i = self.p_failure / (2. * self.n_verify ** 2)
 
-        self.i_verify += 1
-        p_failure_i = p_failure / (2 * (self.i_verify ** 2))
+        # a point uniformly at random on the unit sphere
+        x = np.random.normal(size=A.shape[0])
+        x /= ln.norm(x)
 
-        # pick a point uniformly at ranom from the d-dimensional unit sphere
-        # http://stackoverflow.com/questions/15880367/python-uniform-distribution-of-points-on-4-dimensional-sphere
-        normal_deviates = np.random.normal(size=(d, 1))
-        radius = np.sqrt((normal_deviates ** 2).sum(axis=0))
-        x = normal_deviates / radius
+        for _ in range(int(np.ceil(np.log(A.shape[0] / p_failure_i)))):
+            x = (A.dot(A.T.dot(x)) - np.dot(C, np.dot(C.T, x))) / bound
 
-        return ln.norm(np.dot(ln.matrix_power(C, int(c * np.log(d / p_failure_i))), x)) <= 1
+        return ln.norm(x) <= 1.
@@ -2,6 +2,103 @@ from sklearn.base import BaseEstimator
 
 import numpy as np
 
+from ..utils.growable import ensure_index
+
+
+class RatingRow(object):
+
+    """Ratings of a user, kept as item/rating arrays to be gathered without per-item lookups.
+    """
+
+    def __init__(self):
+        self.slots = {}
+        self.n = 0
+
+        self.items = np.zeros(0, dtype=int)
+        self.ratings = np.zeros(0)
+
+    def set(self, item, rating):
+        """Set a rating, and return the previous one (0 if the item had not been rated).
+        """
+        slot = self.slots.get(item)
+        if slot is None:
+            slot = self.slots[item] = self.n
+            self.items = ensure_index(self.items, slot)
+            self.ratings = ensure_index(self.ratings, slot)
+            self.items[slot] = item
+            self.n += 1
+        prev = self.ratings[slot]
+        self.ratings[slot] = rating
+        return prev
+
+
+class SimilarityRow(object):
+
+    """Similarity accumulators of a user against the users who share items with them.
+
+    This is a sparse row of the user-user matrices S, B, C and D (S = B / (sqrt(C) * sqrt(D)));
+    users who have never co-rated an item with the user have no entry.
+
+    """
+
+    def __init__(self):
+        self.slots = {}
+        self.n = 0
+
+        self.users = np.zeros(0, dtype=int)
+        self.B = np.zeros(0)
+        self.C = np.zeros(0)
+        self.D = np.zeros(0)
+        self.S = np.zeros(0)
+
+    def find(self, users):
+        """Get the slots of users, adding entries for the new ones.
+
+        Args:
+            users (numpy array; (n,)): User indices.
+
+        Returns:
+            numpy array; (n,): Slots of the users in the accumulator arrays.
+
+        """
+        slots = np.fromiter((self.slots.setdefault(u, len(self.slots)) for u in users.tolist()),
+                            dtype=int, count=users.size)
+
+        n = len(self.slots)
+        if n > self.n:
+            for name in ['users', 'B', 'C', 'D', 'S']:
+                setattr(self, name, ensure_index(getattr(self, name), n - 1))
+            self.users[slots] = users
+            self.n = n
+
+        return slots
+
+    def update(self, slots, e, f, g):
+        """Add to the accumulators, and recompute the similarities which are defined.
+        """
+        self.B[slots] += e
+        self.C[slots] += f
+        self.D[slots] += g
+
+        # avoid zero division
+        B, C, D = self.B[slots], self.C[slots], self.D[slots]
+        defined = (C > 0.) & (D > 0.)
+        self.S[slots[defined]] = B[defined] / (np.sqrt(C[defined]) * np.sqrt(D[defined]))
+
+    def top(self, k):
+        """Select the k most similar users having a positive similarity.
+
+        Returns:
+            (numpy array, numpy array): (Users, Similarities) in descending order of the similarity.
+
+        """
+        S = self.S[:self.n]
+        positive = np.flatnonzero(S > 0.)
+        if positive.size > k:
+            positive = positive[np.argpartition(S[positive], positive.size - k)[positive.size - k:]]
+        order = positive[np.argsort(S[positive])[::-1]]
+        return self.users[order], S[order]
+
 
 class UserKNN(BaseEstimator):
 
@@ -11,70 +108,133 @@ class UserKNN(BaseEstimator):
     "Incremental Collaborative Filtering for Highly-Scalable Recommendation Algorithms"
     In Foundations of Intelligent Systems, pages 553-561. Springer Berlin Heidelberg, 2005.
 
+    Ratings are stored sparsely by user and by item, and the similarity accumulators of a user
+    are only kept for the users who share items with them, so that an update costs
+    O(co-raters x overlap) rather than O(n_user x n_item). The k nearest neighbors of
+    the updated user are re-selected from their accumulators.
+
     """
 
     def __init__(self, k=5):
         # number of nearest neighbors
         self.k = k
 
-        # user-item matrix
-        self.R = np.array([])
+        # ratings by user ({user: RatingRow}) and by item ({item: {user: rating}})
+        self.user_ratings = {}
+        self.item_ratings = {}
 
-        # user-user similarity matrix
-        self.S = np.array([])
+        # rating count and mean of each user
+        self.counts = np.zeros(0, dtype=int)
+        self.means = np.zeros(0)
 
-        # user-user similarity: S = B / (sqrt(C) * sqrt(D))
-        self.B = np.array([])
-        self.C = np.array([])
-        self.D = np.array([])
-
-    def update_model(self, ua, ia, value):
-        prev_r = self.R[ua, ia]
-        new_submit = (prev_r == 0)
-        self.R[ua, ia] = value
+        # sparse rows of the user-user similarity: S = B / (sqrt(C) * sqrt(D))
+        self.similarities = {}
 
-        prev_mean = self.users[ua]['mean']
+        # k nearest neighbors of each user: (users, similarities)
+        self.neighbors = {}
 
-        if new_submit:
-            self.users[ua]['count'] += 1
-            self.users[ua]['mean'] = self.R[ua, ia] / self.users[ua]['count'] + (
-                self.users[ua]['count'] - 1) / self.users[ua]['count'] * prev_mean
-        else:
-            self.users[ua]['mean'] = (self.R[ua, ia] - prev_r) / (self.users[ua]['count'] - 1) + prev_mean
+    def add_user(self, ua):
+        if ua in self.user_ratings:
+            return
 
-        d = self.users[ua]['mean'] - prev_mean
+        self.user_ratings[ua] = RatingRow()
+        self.similarities[ua] = SimilarityRow()
+        self.neighbors[ua] = (np.zeros(0, dtype=int), np.zeros(0))
 
-        for uy in range(self.n_user):
-            # skip myself
-            if uy == ua:
-                continue
+        # keep track how many times each user interacted with items
+        # to compute user's mean
+        self.counts = ensure_index(self.counts, ua)
+        self.means = ensure_index(self.means, ua)
 
-            e = f = g = 0.
+    def update_model(self, ua, ia, value):
+        self.add_user(ua)
 
-            had_uy_rated_ia = (self.R[uy, ia] != 0)
-            if had_uy_rated_ia:
-                ua_normalized = self.R[ua, ia] - self.users[ua]['mean']
-                uy_normalized = self.R[uy, ia] - self.users[uy]['mean']
+        prev_r = self.user_ratings[ua].set(ia, value)
+        new_submit = (prev_r == 0)
+        self.item_ratings.setdefault(ia, {})[ua] = value
 
-                if new_submit:
-                    e = ua_normalized * uy_normalized
-                    f = ua_normalized ** 2
-                    g = uy_normalized ** 2
-                else:
-                    e = (self.R[ua, ia] - prev_r) * uy_normalized
-                    f = (self.R[ua, ia] - prev_r) ** 2 + 2 * (self.R[ua, ia] - prev_r) * ua_normalized
-                    g = 0.
+        prev_mean = self.means[ua]
 
-            for ih in range(self.n_item):
-                # only for co-rated items
-                if self.R[ua, ih] != 0 and self.R[uy, ih] != 0:
-                    e = e - d * (self.R[uy, ih] - self.users[uy]['mean'])
-                    f = f + d ** 2 - 2 * d * (self.R[ua, ih] - prev_mean)
+        if new_submit:
+            self.counts[ua] += 1
+            count = self.counts[ua]
+            self.means[ua] = value / count + (count - 1) / count * prev_mean
+        else:
+            self.means[ua] = (value - prev_r) / self.counts[ua] + prev_mean
 
-            self.B[ua, uy] += e
-            self.C[ua, uy] += f
-            self.D[ua, uy] += g
+        mean = self.means[ua]
+        d = mean - prev_mean
 
-        # avoid zero division
-        idx = (self.C[ua, :] != 0) & (self.C[ua, :] != 0)
-        self.S[ua, idx] = self.B[ua, idx] / (np.sqrt(self.C[ua, idx]) * np.sqrt(self.D[ua, idx]))
+        # users who have rated `ia`: replace the terms of `ia` with the ones of the new rating
+        raters = self.item_ratings[ia]
+        uys = np.fromiter((uy for uy in raters if uy != ua), dtype=int, count=len(raters) - 1)
+        uy_ratings = np.fromiter((raters[uy] for uy in uys.tolist()), dtype=float, count=uys.size)
+        uy_normalized = uy_ratings - self.means[uys]
+        ua_normalized = value - mean
+        if new_submit:
+            e = ua_normalized * uy_normalized
+            f = np.full(uys.size, ua_normalized ** 2)
+            g = uy_normalized ** 2
+        else:
+            prev_normalized = prev_r - prev_mean
+            e = (ua_normalized - prev_normalized) * uy_normalized
+            f = np.full(uys.size, ua_normalized ** 2 - prev_normalized ** 2)
+            g = np.zeros(uys.size)
+
+        if d != 0.:
+            # the shift of the mean affects the other co-rated items of all co-raters
+            co_uys, n_overlap, sum_uy, sum_ua = self.co_ratings(ua)
+            uy_means = self.means[co_uys]
+
+            # `uys` are co-raters as well; align the terms of `ia` with them
+            position = np.searchsorted(co_uys, uys)
+            n_overlap[position] -= 1
+            sum_uy[position] -= uy_ratings
+            sum_ua[position] -= value
+
+            co_e = np.zeros(co_uys.size)
+            co_f = np.zeros(co_uys.size)
+            co_g = np.zeros(co_uys.size)
+            co_e[position] = e
+            co_f[position] = f
+            co_g[position] = g
+
+            uys = co_uys
+            e = co_e - d * (sum_uy - n_overlap * uy_means)
+            f = co_f + n_overlap * d ** 2 - 2 * d * (sum_ua - n_overlap * prev_mean)
+            g = co_g
+
+        row = self.similarities[ua]
+        row.update(row.find(uys), e, f, g)
+        self.neighbors[ua] = row.top(self.k)
+
+    def co_ratings(self, ua):
+        """Aggregate the items co-rated by a user and each of the other users.
+
+        Args:
+            ua (int): User index.
+
+        Returns:
+            (numpy array, numpy array, numpy array, numpy array): (Sorted co-raters, number of co-rated
+            items, sum of the co-raters' ratings, sum of the user's ratings on the co-rated items).
+
+        """
+        uys, uy_ratings, ua_ratings = [], [], []
+        row = self.user_ratings[ua]
+        for ih, r in zip(row.items[:row.n].tolist(), row.ratings[:row.n].tolist()):
+            raters = self.item_ratings[ih]
+            uys.append(np.fromiter(raters.keys(), dtype=int, count=len(raters)))
+            uy_ratings.append(np.fromiter(raters.values(), dtype=float, count=len(raters)))
+            ua_ratings.append(np.full(len(raters), r))
+
+        uys = np.concatenate(uys)
+        uy_ratings = np.concatenate(uy_ratings)
+        ua_ratings = np.concatenate(ua_ratings)
+
+        others = uys != ua
+        co_uys, inverse = np.unique(uys[others], return_inverse=True)
+        n_overlap = np.bincount(inverse, minlength=co_uys.size)
+        sum_uy = np.bincount(inverse, weights=uy_ratings[others], minlength=co_uys.size).astype(float, copy=False)
+        sum_ua = np.bincount(inverse, weights=ua_ratings[others], minlength=co_uys.size).astype(float, copy=False)
+
+        return co_uys, n_overlap, sum_uy, sum_ua
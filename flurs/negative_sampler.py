@@ -0,0 +1,195 @@
+import numpy as np
+
+from .utils.growable import ensure_index
+
+
+def alias_table(weights):
+    """Build a Walker alias table for drawing indices proportionally to weights.
+
+    Vose's method is vectorized by round: in each round, every underfull cell is
+    filled by the overfull cell whose cumulative excess covers the end of its
+    cumulative deficit. Overfull cells which drop below one become the underfull cells of the next round.
+
+    Args:
+        weights (numpy array; (n,)): Nonnegative weights with a positive sum.
+
+    Returns:
+        (numpy array, numpy array): (Acceptance probability of each cell; (n,), Alias of each cell; (n,)).
+
+    """
+    n = weights.shape[0]
+    prob = weights * (n / np.sum(weights))
+    alias = np.arange(n)
+
+    small = np.flatnonzero(prob < 1.)
+    large = np.flatnonzero(prob >= 1.)
+    while small.size > 0 and large.size > 0:
+        deficit = 1. - prob[small]
+
+        # the total deficit equals the total excess; cells past its end are only due to rounding errors
+        donor = np.minimum(np.searchsorted(np.cumsum(prob[large] - 1.), np.cumsum(deficit)), large.size - 1)
+
+        alias[small] = large[donor]
+        prob[large] -= np.bincount(donor, weights=deficit, minlength=large.size)
+
+        underfull = prob[large] < 1.
+        small = large[underfull]
+        large = large[~underfull]
+
+    # leftovers of the rounding errors
+    prob[small] = 1.
+    prob[large] = 1.
+
+    return prob, alias
+
+
+class UniformNegativeSampler(object):
+
+    """Draw negative items uniformly among the items unknown to a user.
+
+    Candidates are drawn from all the items and rejected when the user knows them, so that
+    a draw costs O(1) expected time as long as users know a minor part of the catalog.
+    After `max_trial` rounds, the remaining negatives are drawn among the enumerated unknown items.
+
+    """
+
+    def __init__(self, max_trial=10):
+        """Set/initialize parameters.
+
+        Args:
+            max_trial (int): Number of rejection rounds before enumerating the unknown items.
+
+        """
+        self.max_trial = max_trial
+        self.n_item = 0
+
+    def add_item(self, item):
+        """Make an item index eligible for negative sampling.
+        """
+        if item >= self.n_item:
+            self.n_item = item + 1
+
+    def observe(self, item):
+        """Record a positive item.
+        """
+        pass
+
+    def draw(self, size):
+        return np.random.randint(0, self.n_item, size)
+
+    def sample(self, known, size=1):
+        """Draw negative items for a user.
+
+        Args:
+            known (set): Items known to the user (e.g. `User.known_items.items`).
+            size (int): Number of negatives.
+
+        Returns:
+            numpy array; (size,): Negative items, drawn independently (empty if the user knows all items).
+
+        """
+        negatives = self.sample_batch([known], size)[0]
+        if size > 0 and negatives[0] < 0:
+            return np.zeros(0, dtype=int)
+        return negatives
+
+    def sample_batch(self, knowns, size=1):
+        """Draw negative items for many users at once.
+
+        Args:
+            knowns (list of set): Items known to each user.
+            size (int): Number of negatives per user.
+
+        Returns:
+            numpy array; (n_user, size): Negative items of each user; -1 for the users knowing all items.
+
+        """
+        n = len(knowns)
+        if self.n_item == 0:
+            return np.full((n, size), -1, dtype=int)
+
+        negatives = self.draw(n * size)
+        owners = [known for known in knowns for _ in range(size)]
+        rejected = np.fromiter((i in known for i, known in zip(negatives.tolist(), owners)), dtype=bool,
+                               count=n * size)
+
+        for _ in range(self.max_trial - 1):
+            if not rejected.any():
+                return negatives.reshape((n, size))
+            idx = np.flatnonzero(rejected)
+            redraws = self.draw(idx.size)
+            negatives[idx] = redraws
+            rejected[idx] = np.fromiter((i in owners[r] for i, r in zip(redraws.tolist(), idx.tolist())),
+                                        dtype=bool, count=idx.size)
+
+        negatives = negatives.reshape((n, size))
+        rejected = rejected.reshape((n, size))
+        for u in np.flatnonzero(rejected.any(axis=1)).tolist():
+            known = knowns[u]
+            unknown = np.setdiff1d(np.arange(self.n_item), np.fromiter(known, dtype=int, count=len(known)))
+            if unknown.size == 0:
+                negatives[u] = -1
+            else:
+                negatives[u, rejected[u]] = np.random.choice(unknown, np.count_nonzero(rejected[u]))
+
+        return negatives
+
+
+class PopularityNegativeSampler(UniformNegativeSampler):
+
+    """Draw negative items proportionally to their popularity among the items unknown to a user.
+
+    The popularity of an item is the number of times it has been observed as a positive.
+    Draws come from an alias table of the counts at the last rebuild, mixed with uniform
+    draws from the positives observed since then, which is exactly proportional to the
+    current counts. The table is rebuilt once the recent positives outnumber the ones
+    it covers, so that maintaining it costs amortized O(n_item / n_positive) per positive.
+
+    """
+
+    def __init__(self, max_trial=10):
+        super(PopularityNegativeSampler, self).__init__(max_trial)
+
+        self.counts = np.zeros(0)
+        self.prob = np.zeros(0)
+        self.alias = np.zeros(0, dtype=int)
+        self.n_table = 0
+
+        # positives observed since the last rebuild of the table
+        self.recent = np.zeros(0, dtype=int)
+        self.n_recent = 0
+
+    def observe(self, item):
+        self.recent = ensure_index(self.recent, self.n_recent)
+        self.recent[self.n_recent] = item
+        self.n_recent += 1
+
+        if self.n_recent > self.n_table:
+            self.rebuild()
+
+    def rebuild(self):
+        """Fold the recent positives into the counts and rebuild the alias table.
+        """
+        recent = self.recent[:self.n_recent]
+        n = max(self.counts.shape[0], np.max(recent) + 1)
+        self.counts = np.concatenate((self.counts, np.zeros(n - self.counts.shape[0])))
+        self.counts += np.bincount(recent, minlength=n)
+
+        self.prob, self.alias = alias_table(self.counts)
+        self.n_table += self.n_recent
+        self.n_recent = 0
+
+    def draw(self, size):
+        if self.n_table + self.n_recent == 0:
+            return super(PopularityNegativeSampler, self).draw(size)
+
+        negatives = np.empty(size, dtype=int)
+
+        from_table = np.random.randint(0, self.n_table + self.n_recent, size) < self.n_table
+        n = np.count_nonzero(from_table)
+        cells = np.random.randint(0, self.prob.shape[0], n)
+        negatives[from_table] = np.where(np.random.random_sample(n) < self.prob[cells], cells, self.alias[cells])
+
+        negatives[~from_table] = self.recent[np.random.randint(0, self.n_recent, size - n)]
+
+        return negatives
@@ -1,5 +1,6 @@
 from ..base import RecommenderMixin
 from ..model import BPRMF
+from ..data.columns import EventColumns
 
 import numpy as np
 
@@ -21,24 +22,59 @@ class BPRMFRecommender(BPRMF, RecommenderMixin):
 
     def register_user(self, user):
         super(BPRMFRecommender, self).register_user(user)
-        self.users[user.index]['vec'] = np.random.normal(0., 0.1, self.k)
+        if len(self.P) > user.index:
+            return
+        self.P = self.user_factors.grow(user.index + 1)
 
     def register_item(self, item):
         super(BPRMFRecommender, self).register_item(item)
-        i_vec = np.random.normal(0., 0.1, (1, self.k))
-        if self.Q.size == 0:
-            self.Q = i_vec
-        else:
-            self.Q = np.concatenate((self.Q, i_vec))
+        self.sampler.add_item(item.index)
+        sizeQ = len(self.Q)
+        if sizeQ > item.index:
+            return
+        self.Q = self.item_factors.grow(item.index + 1)
+        self.update_item_index(np.arange(sizeQ, len(self.Q)))
 
     def update(self, e, batch_train=False):
-        self.update_model(e.user.index, e.item.index)
+        self.update_model(e.user.index, e.item.index, e.user.known_items.items)
+
+    def update_events(self, events):
+        """Update the model with a block of events at once.
+
+        Negatives are drawn for all the events before the block is applied by `update_batch`.
+
+        Args:
+            events (list of Event or EventColumns): New events.
+
+        """
+        if isinstance(events, EventColumns):
+            users, items = events.users.astype(int), events.items.astype(int)
+            user = events.registry.user
+            knowns = [user(u).known_items.items for u in users.tolist()]
+        else:
+            users = np.array([e.user.index for e in events], dtype=int)
+            items = np.array([e.item.index for e in events], dtype=int)
+            knowns = [e.user.known_items.items for e in events]
+
+        for ia in items.tolist():
+            self.sampler.observe(ia)
+
+        negatives = self.sampler.sample_batch(knowns, self.n_negative)
+
+        # users who know all items have no negatives
+        valid = negatives[:, 0] >= 0
+        self.update_batch(users[valid], items[valid], negatives[valid])
 
     def score(self, user, candidates):
-        pred = np.dot(self.users[user.index]['vec'],
+        pred = np.dot(self.P[user.index],
                       self.Q[candidates, :].T)
         return pred.flatten()
 
-    def recommend(self, user, candidates):
+    def reg_term(self, user_id, item_id):
+        """Get the regularization term of a user and an item, as `MFRecommender.reg_term`.
+        """
+        return self.l2_reg_u * (np.linalg.norm(self.P[user_id], 1)**2 + np.linalg.norm(self.Q[item_id], 1)**2)
+
+    def recommend(self, user, candidates, top_n=None):
         scores = self.score(user, candidates)
-        return self.scores2recos(scores, candidates, rev=True)
+        return self.scores2recos(scores, candidates, rev=True, top_n=top_n)
@@ -1,10 +1,11 @@
 from ..base import FeatureRecommenderMixin
 from ..model import FactorizationMachine
+from ..utils.feature_store import FeatureStore
+from ..utils.growable import ensure_index
 from .. import logger
 
 import numpy as np
 import scipy.sparse as sp
-from sklearn.utils.extmath import safe_sparse_dot
 
 
 class FMRecommender(FactorizationMachine, FeatureRecommenderMixin):
@@ -24,127 +25,228 @@ class FMRecommender(FactorizationMachine, FeatureRecommenderMixin):
         self.static = static
         self.use_index = use_index
 
+        # parameters are laid out as [features | user index block | item index block];
+        # the index blocks reserve spare rows, and are only reallocated when one fills up
+        self.n_feature = self.p
+        self.user_capacity = 0
+        self.item_capacity = 0
+
+        self.item_features = None
+
+        # item side of the input vectors (item feature and item index) projected by the parameters:
+        # item_proj = x_i . V and item_term = x_i . w - sum_r x_r^2 ||V_r||^2 / 2 + ||item_proj||^2 / 2.
+        # An item is recomputed when scored after one of its rows has been updated
+        self.item_proj = np.zeros((0, self.k))
+        self.item_term = np.zeros(0)
+        self.item_step = np.zeros(0, dtype=int)  # update step at which each item was computed; -2 if outdated
+        self.row_step = None  # last update step which changed each item feature row
+        self.n_step = 0
+
+        # layout of the encoded events; recomputed when the blocks/feature dimensions change
+        self.offsets_key = None
+        self.offsets = None
+
     def register_user(self, user):
         super(FMRecommender, self).register_user(user)
 
         if self.use_index:
-            n_user = self.n_user - 1
+            self.reserve(user.index + 1, self.item_capacity)
+
+    def register_item(self, item):
+        super(FMRecommender, self).register_item(item)
 
-            # insert new user's row for the parameters
-            self.w = np.concatenate((self.w[:n_user],
-                                     np.array([0.]),
-                                     self.w[n_user:]))
+        if self.item_features is None:
+            self.item_features = FeatureStore(len(item.feature))
+            self.feature_offset = self.n_feature - len(item.feature)
+            self.row_step = np.zeros(len(item.feature), dtype=int)
 
-            self.prev_w = np.concatenate((self.prev_w[:n_user],
-                                          np.array([0.]),
-                                          self.prev_w[n_user:]))
+        if self.use_index:
+            self.reserve(self.user_capacity, item.index + 1)
 
-            rand_row = np.random.normal(0., 0.1, (1, self.k))
+        if item.index not in self.item_features:
+            self.item_features.set(item.index, item.feature)
+            self.item_proj = ensure_index(self.item_proj, item.index)
+            self.item_term = ensure_index(self.item_term, item.index)
+            self.item_step = ensure_index(self.item_step, item.index)
+            items = np.array([item.index])
+            self.project_items(items, *self.item_features.gather(items))
 
-            self.V = np.concatenate((self.V[:n_user],
-                                     rand_row,
-                                     self.V[n_user:]))
+    def reserve(self, n_user, n_item):
+        """Make sure that the index blocks have rows for `n_user` users and `n_item` items.
 
-            self.prev_V = np.concatenate((self.prev_V[:n_user],
-                                          rand_row,
-                                          self.prev_V[n_user:]))
+        A full block grows to (at least) twice its capacity, so that registering a new user
+        or item costs amortized O(k). New rows get w = 0 and V drawn from N(0, 0.1^2).
 
-            self.p += 1
+        Args:
+            n_user (int): Required number of rows of the user index block.
+            n_item (int): Required number of rows of the item index block.
 
-    def register_item(self, item):
-        super(FMRecommender, self).register_item(item)
+        """
+        if n_user <= self.user_capacity and n_item <= self.item_capacity:
+            return
 
-        n_item = self.n_item - 1
-
-        # update the item matrix for all items
-        i_vec = item.encode(dim=(n_item + 1),
-                            index=self.use_index,
-                            feature=True,
-                            vertical=True)
-        sp_i_vec = sp.csr_matrix(i_vec)
-
-        if self.i_mat.size == 0:
-            self.i_mat = sp_i_vec
-        elif self.use_index:
-            self.i_mat = sp.vstack((self.i_mat[:n_item],
-                                    np.zeros((1, n_item)),
-                                    self.i_mat[n_item:]))
-            self.i_mat = sp.csr_matrix(sp.hstack((self.i_mat, sp_i_vec)))
+        user_capacity, item_capacity = self.user_capacity, self.item_capacity
+        if n_user > user_capacity:
+            user_capacity = max(n_user, 2 * user_capacity, 16)
+        if n_item > item_capacity:
+            item_capacity = max(n_item, 2 * item_capacity, 16)
+
+        p = self.n_feature + user_capacity + item_capacity
+        V = np.random.normal(0., 0.1, (p, self.k))
+        w = np.zeros(p)
+
+        # (source, destination) of the feature, user index and item index blocks
+        item_offset = self.n_feature + self.user_capacity
+        blocks = [(slice(0, item_offset), slice(0, item_offset)),
+                  (slice(item_offset, self.p),
+                   slice(self.n_feature + user_capacity, self.n_feature + user_capacity + self.item_capacity))]
+        for grown, current in [(w, self.w), (V, self.V)]:
+            for src, dst in blocks:
+                grown[dst] = current[src]
+        self.w, self.V = w, V
+
+        # the logged rows of the item index block move as well
+        self.prev_rows = np.where(self.prev_rows >= item_offset,
+                                  self.prev_rows + user_capacity - self.user_capacity, self.prev_rows)
+
+        self.p = p
+        self.user_capacity = user_capacity
+        self.item_capacity = item_capacity
+
+    def update_model_sparse(self, indices, values, value):
+        super(FMRecommender, self).update_model_sparse(indices, values, value)
+
+        self.n_step += 1
+        if self.item_features is not None:
+            rows = indices[(indices >= self.feature_offset) & (indices < self.n_feature)]
+            self.row_step[rows - self.feature_offset] = self.n_step
+        if self.use_index:
+            item_offset = self.n_feature + self.user_capacity
+            self.item_step[indices[indices >= item_offset] - item_offset] = -2
+
+    def project_items(self, items, indptr, indices, data):
+        """(Re)compute the item side of the input vectors of items with the current parameters.
+
+        Args:
+            items (numpy array; (n,)): Distinct item indices.
+            indptr, indices, data (numpy array): Their features as `FeatureStore.gather` returns.
+
+        """
+        if indices.size == 0:
+            proj = np.zeros((items.size, self.k))
+            term = np.zeros(items.size)
         else:
-            self.i_mat = sp.csr_matrix(sp.hstack((self.i_mat, sp_i_vec)))
+            proj, term = self.project_features(items.size, indptr, indices, data)
 
         if self.use_index:
+            rows = self.n_feature + self.user_capacity + items
+            V = self.V[rows]
+            proj += V
+            term += self.w[rows] - np.sum(V ** 2, axis=1) / 2.
+
+        self.item_proj[items] = proj
+        self.item_term[items] = term + np.sum(proj ** 2, axis=1) / 2.
+        self.item_step[items] = self.n_step
+
+    def project_features(self, n, indptr, indices, data):
+        n_item_feature = self.n_feature - self.feature_offset
+        if n_item_feature <= indices.size:
+            rows = slice(self.feature_offset, self.n_feature)
+            columns = indices
+        else:
+            # only read the feature rows used by the items, e.g. for hashed features
+            used, columns = np.unique(indices, return_inverse=True)
+            rows = self.feature_offset + used
+            n_item_feature = used.size
+        V = self.V[rows]
+
+        i_mat = sp.csr_matrix((data, columns, indptr), shape=(n, n_item_feature))
+        sq_i_mat = sp.csr_matrix((data ** 2, columns, indptr), shape=(n, n_item_feature))
 
-            # insert new item's row for the parameters
-            h = self.n_user + n_item
+        return i_mat.dot(V), i_mat.dot(self.w[rows]) - sq_i_mat.dot(np.sum(V ** 2, axis=1)) / 2.
 
-            self.w = np.concatenate((self.w[:h],
-                                     np.array([0.]),
-                                     self.w[h:]))
+    def refresh_items(self, items):
+        """Recompute the item side of the items whose rows have been updated since it was computed.
 
-            self.prev_w = np.concatenate((self.prev_w[:h],
-                                          np.array([0.]),
-                                          self.prev_w[h:]))
+        Args:
+            items (numpy array; (n,)): Distinct item indices.
 
-            rand_row = np.random.normal(0., 0.1, (1, self.k))
+        """
+        indptr, indices, data = self.item_features.gather(items)
 
-            self.V = np.concatenate((self.V[:h],
-                                     rand_row,
-                                     self.V[h:]))
+        # last update of the feature rows of each item
+        nonempty = np.diff(indptr) > 0
+        latest = np.full(items.size, -1)
+        if indices.size:
+            latest[nonempty] = np.maximum.reduceat(self.row_step[indices], indptr[:-1][nonempty])
 
-            self.prev_V = np.concatenate((self.prev_V[:h],
-                                          rand_row,
-                                          self.prev_V[h:]))
-            self.p += 1
+        stale = latest > self.item_step[items]
+        if not stale.any():
+            return
+
+        # entries of the stale items only
+        lengths = np.diff(indptr)[stale]
+        stale_indptr = np.zeros(lengths.size + 1, dtype=int)
+        np.cumsum(lengths, out=stale_indptr[1:])
+        entries = np.repeat(stale, np.diff(indptr))
+        self.project_items(items[stale], stale_indptr, indices[entries], data[entries])
 
     def update(self, e, batch_train=False):
         # static baseline; w/o updating the model
         if not batch_train and self.static:
             return
 
-        x = e.encode(index=self.use_index,
-                     n_user=self.n_user, n_item=self.n_item)
-
-        if e.value != 1.:
+        if e.rating != 1.:
             logger.info('Incremental factorization machines assumes implicit feedback recommendation, so the event value is automatically converted into 1.0')
-            e.value = 1.
+            e.rating = 1.
 
-        self.update_model(x, e.value)
+        indices, values = e.encode_sparse(self.event_offsets(e))
+        self.update_model_sparse(indices, values, e.rating)
 
-    def score(self, user, candidates, context):
-        # i_mat is (n_item_context, n_item) for all possible items
-        # extract only target items
-        i_mat = self.i_mat[:, candidates]
+    def event_offsets(self, e):
+        """Get the offsets of the blocks of an event in the parameter layout.
 
-        n_target = len(candidates)
+        Args:
+            e (Event): Event.
 
-        u_vec = user.encode(dim=self.n_user,
-                            index=self.use_index,
-                            feature=True,
-                            vertical=True)
-        u_vec = np.concatenate((u_vec, np.array([context]).T))
-        u_mat = sp.csr_matrix(np.repeat(u_vec, n_target, axis=1))
+        Returns:
+            tuple of int or None: Offsets of the (user index, user feature, context, item index, item feature) blocks
+            as `Event.encode_sparse` expects.
 
-        mat = sp.vstack((u_mat, i_mat))
+        """
+        key = (len(e.user.feature), len(e.context), self.user_capacity)
+        if key != self.offsets_key:
+            n_user_feature, n_context, user_capacity = key
+            self.offsets_key = key
+            if self.use_index:
+                self.offsets = (self.n_feature, 0, n_user_feature, self.n_feature + user_capacity, n_user_feature + n_context)
+            else:
+                self.offsets = (None, 0, n_user_feature, None, n_user_feature + n_context)
+        return self.offsets
 
-        # Matrix A and B should be dense (numpy array; rather than scipy CSR matrix) because V is dense.
-        V = sp.csr_matrix(self.V)
-        A = safe_sparse_dot(V.T, mat)
-        A.data[:] = A.data ** 2
+    def score(self, user, candidates, context):
+        candidates = np.asarray(candidates)
+        self.refresh_items(candidates)
 
-        sq_mat = mat.copy()
-        sq_mat.data[:] = sq_mat.data ** 2
-        sq_V = V.copy()
-        sq_V.data[:] = sq_V.data ** 2
-        B = safe_sparse_dot(sq_V.T, sq_mat)
+        # user side of the input vectors (user feature, context and user index), shared by all candidates
+        u_vec = np.concatenate((user.feature, context))
+        u_indices = np.flatnonzero(u_vec)
+        u_values = u_vec[u_indices]
+        if self.use_index:
+            u_indices = np.append(u_indices, self.n_feature + user.index)
+            u_values = np.append(u_values, 1.)
 
-        interaction = (A - B).sum(axis=0)
-        interaction /= 2.  # (1, n_item); numpy matrix form
+        u_V = self.V[u_indices]
+        u_proj = np.dot(u_values, u_V)  # (k, )
+        u_term = np.inner(self.w[u_indices], u_values) - np.inner(u_values ** 2, np.sum(u_V ** 2, axis=1)) / 2.
 
-        pred = self.w0 + safe_sparse_dot(self.w, mat, dense_output=True) + interaction
+        # ||u_proj + item_proj||^2 / 2 of the pairwise interactions (including the squares) is
+        # expanded so that the item side is a single matrix-vector product
+        pred = self.w0 + u_term + np.inner(u_proj, u_proj) / 2. + \
+            np.dot(self.item_proj[candidates], u_proj) + self.item_term[candidates]
 
-        return np.abs(1. - np.ravel(pred))
+        return np.abs(1. - pred)
 
-    def recommend(self, user, candidates, context):
+    def recommend(self, user, candidates, context, top_n=None):
         scores = self.score(user, candidates, context)
-        return self.scores2recos(scores, candidates)
+        return self.scores2recos(scores, candidates, top_n=top_n)
@@ -1,7 +1,6 @@
 from ..base import RecommenderMixin
 from ..model import NormalizedMF
 from ..forgetting import NoForgetting
-from numba import jit
 import numpy as np
 
 
@@ -33,13 +32,11 @@ class NMFRecommender(NormalizedMF, RecommenderMixin):
         sizeA = len(self.A)
         if sizeA > user.index:
             return
-        elif sizeA == 0:
-            self.A = np.random.normal(0., 0.2, (user.index + 1, self.k))
-        else:
-            diff = user.index - (sizeA - 1)
-            newMatrix = np.random.normal(0.,0.2,(diff, self.k))
-            self.A = np.concatenate((self.A, newMatrix))
-            self.logger.debug("Added {} lines to A. {}".format(diff+1, self.A.shape))
+
+        self.A = self.user_factors.grow(user.index + 1)
+        self.trace.count('grow_A')
+        if self.trace.enabled and self.trace.emit():
+            self.trace.log("Added %s lines to A. %s", user.index + 1 - sizeA, self.A.shape)
 
     def register_item(self, item):
         """Add matrix space to handle the new item if needed.
@@ -52,13 +49,12 @@ class NMFRecommender(NormalizedMF, RecommenderMixin):
         sizeB = len(self.B)
         if sizeB > item.index:
             return
-        elif sizeB == 0:
-            self.B = np.random.normal(0., 0.2, (item.index + 1, self.k))
-        else:
-            diff = item.index - (sizeB - 1)
-            newMatrix = np.random.normal(0.,0.2,(diff + 1, self.k))
-            self.B = np.concatenate((self.B, newMatrix))
-            self.logger.debug("Added {} lines to B. {}".format(diff+1, self.B.shape))
+
+        self.B = self.item_factors.grow(item.index + 1)
+        self.update_item_index(np.arange(sizeB, len(self.B)))
+        self.trace.count('grow_B')
+        if self.trace.enabled and self.trace.emit():
+            self.trace.log("Added %s lines to B. %s", item.index + 1 - sizeB, self.B.shape)
 
     def update(self, e):
         """Update in the model with the new event.
@@ -84,18 +80,19 @@ class NMFRecommender(NormalizedMF, RecommenderMixin):
                       self.B[candidates].T)
         return pred.flatten()
 
-    def recommend(self, user, candidates):
+    def recommend(self, user, candidates, top_n=None):
         """Get the score for each item and return the ordered vector and the score.
 
         Args:
             user (integer): User ID.
             cadidates (numpy.Array): Integer vector with all candidates.
+            top_n (int): Only return the best `top_n` items, if given.
         Returns:
             (numpy array, numpy array) : (Sorted list of items, Sorted scores).
 
         """
         scores = self.score(user, candidates)
-        return self.scores2recos(scores, candidates)
+        return self.scores2recos(scores, candidates, top_n=top_n)
 
 
     def reg_term(self, user_id, item_id):
@@ -1,5 +1,9 @@
 from ..base import FeatureRecommenderMixin
 from ..model import OnlineSketch
+from ..data.entity import block_offsets
+from ..utils.feature_store import FeatureStore
+from ..utils.growable import ensure_index
+from ..utils.projection import Raw, RandomProjection
 
 import numpy as np
 import numpy.linalg as ln
@@ -23,27 +27,119 @@ class SketchRecommender(OnlineSketch, FeatureRecommenderMixin):
     def initialize(self):
         super(SketchRecommender, self).initialize()
 
+        # for linear projections, the projected vector of an event is the sum of its user/context part and its
+        # item part; the latter is cached as rows of `item_proj`, along with its squared norm and its coordinates
+        # on the bases `U_r` as of the `item_basis`-th bases (-1 if never computed)
+        self.linear = isinstance(self.proj, (Raw, RandomProjection))
+        self.item_features = None
+        self.item_proj = np.zeros((0, self.k))
+        self.item_sqnorm = np.zeros(0)
+        self.item_coef = np.zeros((0, self.r))
+        self.item_basis = np.zeros(0, dtype=int)
+
     def register_user(self, user):
         super(SketchRecommender, self).register_user(user)
 
     def register_item(self, item):
         super(SketchRecommender, self).register_item(item)
 
-        i_vec = item.encode(index=False, feature=True, vertical=True)
-        i_vec = sp.csr_matrix(i_vec)
-        if self.i_mat.size == 0:
-            self.i_mat = i_vec
-        else:
-            self.i_mat = sp.csr_matrix(sp.hstack((self.i_mat, i_vec)))
+        if self.item_features is None:
+            self.item_features = FeatureStore(len(item.feature))
+        if item.index in self.item_features:
+            return
+        self.item_features.set(item.index, item.feature)
+
+        if not self.linear:
+            return
+
+        # item features are the last rows of an input vector
+        nonzero = np.flatnonzero(item.feature)
+        z = self.proj.reduce_sparse(self.p - len(item.feature) + nonzero, item.feature[nonzero])
+
+        self.item_proj = ensure_index(self.item_proj, item.index)
+        self.item_sqnorm = ensure_index(self.item_sqnorm, item.index)
+        self.item_coef = ensure_index(self.item_coef, item.index)
+        self.item_basis = ensure_index(self.item_basis, item.index, -1)
+        self.item_proj[item.index] = z
+        self.item_sqnorm[item.index] = np.inner(z, z)
+        self.item_basis[item.index] = -1
 
     def update(self, e, batch_train=False):
-        y = e.encode(index=False, feature=True, context=True)
+        offsets = block_offsets(0, len(e.user.feature), len(e.context), 0, index=False)
+        indices, values = e.encode_sparse(offsets)
+        y = sp.csc_matrix((values, (indices, np.zeros_like(indices))), shape=(self.p, 1))
         self.update_model(y)
 
+    def update_events(self, events):
+        """Insert a block of events into the sketch at once by `update_batch`.
+
+        Args:
+            events (list of Event or EventColumns): New events.
+
+        """
+        indptr, indices, values = [0], [], []
+        for e in events:
+            offsets = block_offsets(0, len(e.user.feature), len(e.context), 0, index=False)
+            idx, val = e.encode_sparse(offsets)
+            indices.append(idx)
+            values.append(val)
+            indptr.append(indptr[-1] + idx.size)
+
+        if len(indptr) == 1:
+            return
+
+        Y = sp.csc_matrix((np.concatenate(values), np.concatenate(indices), indptr), shape=(self.p, len(indptr) - 1))
+        self.update_batch(Y)
+
+    def refresh_items(self, items):
+        """Recompute the coordinates of item parts on the current bases, if they are outdated.
+
+        Args:
+            items (numpy array; (n,)): Item indices.
+
+        """
+        U_r = self.U_r
+        stale = items[self.item_basis[items] != self.n_basis]
+        if stale.size == 0:
+            return
+        self.item_coef[stale] = np.dot(self.item_proj[stale], U_r)
+        self.item_basis[stale] = self.n_basis
+
     def score(self, user, candidates, context):
-        # i_mat is (n_item_context, n_item) for all possible items
-        # extract only target items
-        i_mat = self.i_mat[:, candidates]
+        """Compute the norm of the normalized projected vectors of (user, context, item) on the complement of U_r.
+
+        For a unit vector y, ||(I - U_r U_r^T) y||^2 = 1 - ||U_r^T y||^2. With a linear projection, y is the
+        normalized sum of the user/context part z_u, which is projected once per request, and the cached item
+        part z_i, so that only inner products with z_u and U_r^T z_u are computed for each candidate.
+
+        """
+        if not self.linear:
+            return self.score_stacked(user, candidates, context)
+
+        # user/context features are the first rows of an input vector
+        u_vec = np.concatenate((user.feature, context))
+        nonzero = np.flatnonzero(u_vec)
+        z_u = self.proj.reduce_sparse(nonzero, u_vec[nonzero])
+        coef_u = np.dot(z_u, self.U_r)
+
+        self.refresh_items(candidates)
+
+        # squared norms of z_u + z_i and of its coordinates on the bases
+        sqnorm = np.inner(z_u, z_u) + 2. * np.dot(self.item_proj[candidates], z_u) + self.item_sqnorm[candidates]
+        coef = self.item_coef[candidates] + coef_u
+        proj_sqnorm = np.einsum('ij,ij->i', coef, coef)
+
+        # a zero vector stays zero after the normalization
+        residual = np.zeros(len(candidates))
+        nonzero = sqnorm > 0.
+        residual[nonzero] = 1. - proj_sqnorm[nonzero] / sqnorm[nonzero]
+
+        return np.sqrt(np.maximum(residual, 0.))
+
+    def score_stacked(self, user, candidates, context):
+        """Score by projecting the stacked (user, context, item) vectors, for nonlinear projections.
+        """
+        i_mat = self.item_features.select(candidates)
 
         n_target = len(candidates)
 
@@ -56,13 +152,15 @@ class SketchRecommender(OnlineSketch, FeatureRecommenderMixin):
         # stack them into (p, n_item) matrix
         Y = sp.vstack((u_mat, i_mat))
         Y = self.proj.reduce(Y)
-        Y = sp.csr_matrix(preprocessing.normalize(Y, norm='l2', axis=0))
+        Y = preprocessing.normalize(Y, norm='l2', axis=0)
 
-        X = np.identity(self.k) - np.dot(self.U_r, self.U_r.T)
-        A = safe_sparse_dot(X, Y, dense_output=True)
+        # residual of the projection on the bases, without forming the k-by-k projector
+        U_r = self.U_r
+        A = Y - np.dot(U_r, safe_sparse_dot(U_r.T, Y, dense_output=True))
+        A = A.toarray() if sp.issparse(A) else A
 
         return ln.norm(A, axis=0, ord=2)
 
-    def recommend(self, user, candidates, context):
+    def recommend(self, user, candidates, context, top_n=None):
         scores = self.score(user, candidates, context)
-        return self.scores2recos(scores, candidates)
+        return self.scores2recos(scores, candidates, top_n=top_n)
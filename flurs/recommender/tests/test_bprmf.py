@@ -1,8 +1,10 @@
 from unittest import TestCase
 import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
 
 from flurs.data.entity import User, Item, Event
 from flurs.recommender import BPRMFRecommender
+from flurs.utils.item_index import IVFIndex
 
 
 class BPRMFRecommenderTestCase(TestCase):
@@ -34,3 +36,74 @@ class BPRMFRecommenderTestCase(TestCase):
         self.recommender.update(Event(User(0), Item(0), 1))
         score = self.recommender.score(User(0), np.array([0]))
         self.assertTrue(score >= -1. and score <= 1.)
+
+    def test_register_idempotent(self):
+        self.recommender.register(User(2))
+        self.recommender.register(User(2))
+        self.recommender.register(Item(3))
+        self.assertEqual(self.recommender.P.shape, (3, self.k))
+        self.assertEqual(self.recommender.Q.shape, (4, self.k))
+        self.assertEqual(self.recommender.sampler.n_item, 4)
+
+
+class BPRMFBatchTestCase(TestCase):
+
+    def create(self):
+        np.random.seed(0)
+        recommender = BPRMFRecommender(k=8, learn_rate=.1, n_negative=3)
+        recommender.initialize()
+        recommender.register(User(9))
+        recommender.register(Item(29))
+        return recommender
+
+    def test_update_batch(self):
+        rng = np.random.RandomState(1)
+        users = rng.randint(0, 10, 200)
+        items = rng.randint(0, 30, 200)
+        negatives = rng.randint(0, 30, (200, 3))
+
+        sequential = self.create()
+        for t in range(200):
+            sequential.update_batch(users[t:t + 1], items[t:t + 1], negatives[t:t + 1])
+
+        batch = self.create()
+        batch.update_batch(users, items, negatives)
+
+        assert_allclose(batch.P, sequential.P)
+        assert_allclose(batch.Q, sequential.Q)
+
+    def test_update_events(self):
+        recommender = self.create()
+        users = [User(u) for u in range(10)]
+        events = [Event(users[u], Item(i)) for u, i in zip(range(10), range(10))]
+        for e in events:
+            e.user.known_item(e.item.index)
+
+        Q = recommender.Q.copy()
+        recommender.update_events(events)
+
+        # positives are pulled towards their users
+        self.assertTrue(np.all(np.abs(recommender.Q[:10] - Q[:10]).sum(axis=1) > 0.))
+
+    def assert_in_sync(self, recommender, index):
+        Q = recommender.Q
+        assert_array_equal(index.assignment[:len(Q)], np.argmax(np.dot(Q, index.centroids.T), axis=1))
+        for u in range(10):
+            recos, _ = recommender.recommend_top(User(u), 5)
+            recos_, _ = recommender.recommend(User(u), np.arange(len(Q)), top_n=5)
+            assert_array_equal(recos, recos_)
+
+    def test_item_index_sync(self):
+        recommender = self.create()
+        index = IVFIndex(n_list=5, n_probe=5, rnd_seed=0)
+        recommender.register_item_index(index)
+
+        rng = np.random.RandomState(0)
+        for i in range(30, 40):
+            recommender.register(Item(i))
+        for _ in range(500):
+            recommender.update(Event(User(rng.randint(10)), Item(rng.randint(40))))
+        self.assert_in_sync(recommender, index)
+
+        recommender.update_batch(rng.randint(0, 10, 50), rng.randint(0, 40, 50), rng.randint(0, 40, (50, 3)))
+        self.assert_in_sync(recommender, index)
@@ -1,8 +1,11 @@
-from unittest import TestCase
+from unittest import TestCase, skipIf
 import numpy as np
+from numpy.testing import assert_array_almost_equal
 
 from flurs.data.entity import User, Item, Event
 from flurs.recommender import BRISMFRecommender
+from flurs.forgetting import NoForgetting, UserFactorFading, SDUserFactorFading, MappedUserFactorFading, ForgetUnpopularItems
+from flurs.model import mf_kernels
 
 
 class BRISMFRecommenderTestCase(TestCase):
@@ -34,3 +37,29 @@ class BRISMFRecommenderTestCase(TestCase):
         self.recommender.update(Event(User(0), Item(0), 5))
         score = self.recommender.score(User(0), np.array([0]))
         self.assertTrue(score >= 0)
+
+
+class BRISMFRecommenderJitTestCase(TestCase):
+
+    def create(self, forgetting, use_jit):
+        recommender = BRISMFRecommender(8, .01, .02, forgetting, rnd_seed=0, use_jit=use_jit)
+        recommender.initialize()
+        recommender.register(User(9))
+        recommender.register(Item(19))
+        return recommender
+
+    @skipIf(mf_kernels.njit is None, 'numba is not installed')
+    def test_jit(self):
+        rng = np.random.RandomState(0)
+        users = rng.randint(10, size=200)
+        items = rng.randint(20, size=200)
+
+        for Forgetting in [NoForgetting, UserFactorFading, SDUserFactorFading, MappedUserFactorFading, ForgetUnpopularItems]:
+            python = self.create(Forgetting(), use_jit=False)
+            jit = self.create(Forgetting(), use_jit=True)
+            for ua, ia in zip(users, items):
+                python.update_model(ua, ia, 1.)
+                jit.update_model(ua, ia, 1.)
+
+            assert_array_almost_equal(jit.A, python.A)
+            assert_array_almost_equal(jit.B, python.B)
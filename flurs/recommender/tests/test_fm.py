@@ -1,7 +1,9 @@
 from unittest import TestCase
 import numpy as np
+from numpy.testing import assert_array_equal, assert_array_almost_equal
 
 from flurs.data.entity import User, Item, Event
+from flurs.model import FactorizationMachine
 from flurs.recommender import FMRecommender
 
 
@@ -33,3 +35,114 @@ class FMRecommenderTestCase(TestCase):
         self.recommender.update(Event(User(0), Item(0), 1))
         score = self.recommender.score(User(0), np.array([0]), np.array([0]))
         self.assertTrue(score >= 0.)
+
+
+class FactorizationMachineSparseTestCase(TestCase):
+
+    def test_update_model_sparse(self):
+        p, k = 10, 4
+        fm = FactorizationMachine(p=p, k=k)
+        x = np.zeros(p)
+        x[[1, 4, 7]] = [1., .5, 2.]
+
+        # dense reference of the update of w and V
+        w, V = fm.w.copy(), fm.V.copy()
+        pred = fm.w0 + np.dot(w, x) + (np.sum(np.dot(x, V) ** 2) - np.sum(np.dot(x ** 2, V ** 2))) / 2.
+        err = 1. - pred
+        prod = np.dot(x, V)
+
+        fm.update_model_sparse(np.array([1, 4, 7]), x[[1, 4, 7]], 1.)
+
+        for pi in range(p):
+            expected_w = w[pi] + 2. * fm.learn_rate * (err * x[pi] - fm.l2_reg_w * w[pi]) if x[pi] else w[pi]
+            self.assertAlmostEqual(fm.w[pi], expected_w)
+            if x[pi]:
+                g = err * x[pi] * (prod - x[pi] * V[pi])
+                assert_array_almost_equal(fm.V[pi], V[pi] + 2. * fm.learn_rate * (g - fm.l2_reg_V * V[pi]))
+            else:
+                assert_array_equal(fm.V[pi], V[pi])
+
+        # the previous parameters are kept for the adaptive regularization
+        assert_array_equal(fm.prev_w, w)
+        assert_array_equal(fm.prev_V, V)
+
+    def test_previous_params(self):
+        fm = FactorizationMachine(p=10, k=4)
+        fm.update_model_sparse(np.array([1, 4]), np.array([1., 1.]), 1.)
+        w, V = fm.w.copy(), fm.V.copy()
+
+        # only the rows touched by the last update are logged; the others are unchanged since then
+        fm.update_model_sparse(np.array([7, 4]), np.array([1., .5]), 1.)
+        assert_array_equal(fm.prev_rows, [4, 7])
+        assert_array_equal(fm.prev_w, w)
+        assert_array_equal(fm.prev_V, V)
+
+        prev_w, prev_V = fm.previous_params(np.array([4, 1, 7]))
+        assert_array_equal(prev_w, w[[4, 1, 7]])
+        assert_array_equal(prev_V, V[[4, 1, 7]])
+
+
+class FMRecommenderLayoutTestCase(TestCase):
+
+    def predict(self, recommender, e):
+        indices, values = e.encode_sparse(recommender.event_offsets(e))
+        x = np.zeros(recommender.p)
+        x[indices] = values
+        V = recommender.V
+        return recommender.w0 + np.dot(recommender.w, x) + \
+            (np.sum(np.dot(x, V) ** 2) - np.sum(np.dot(x ** 2, V ** 2))) / 2.
+
+    def test_reserve(self):
+        recommender = FMRecommender(p=3, k=4)
+        recommender.initialize(use_index=True)
+        recommender.register(User(0))
+        recommender.register(Item(0))
+        recommender.w[:] = np.arange(recommender.p)
+        user_row = recommender.V[3].copy()
+        item_row = recommender.V[3 + recommender.user_capacity].copy()
+
+        # growing the user block moves the item block, but keeps every parameter
+        recommender.register(User(20))
+        self.assertGreaterEqual(recommender.user_capacity, 21)
+        item_offset = 3 + recommender.user_capacity
+        self.assertEqual(recommender.w[3], 3)
+        assert_array_equal(recommender.V[3], user_row)
+        assert_array_equal(recommender.V[item_offset], item_row)
+        assert_array_equal(recommender.prev_V[item_offset], item_row)
+        self.assertEqual(recommender.p, item_offset + recommender.item_capacity)
+
+    def test_score(self):
+        for use_index in [False, True]:
+            recommender = FMRecommender(p=4, k=4)
+            recommender.initialize(use_index=use_index)
+            users = [User(u, np.array([1., u])) for u in range(3)]
+            items = [Item(i, np.array([i % 2])) for i in range(20)]
+            for entity in users + items:
+                recommender.register(entity)
+
+            context = np.array([.5])
+            for i in range(20):
+                recommender.update(Event(users[i % 3], items[i], 1., context))
+
+            candidates = np.array([4, 0, 19])
+            scores = recommender.score(users[1], candidates, context)
+            expected = [abs(1. - self.predict(recommender, Event(users[1], items[i], 1., context))) for i in candidates]
+            assert_array_almost_equal(scores, expected)
+
+    def test_score_after_update(self):
+        for use_index in [False, True]:
+            recommender = FMRecommender(p=4, k=4)
+            recommender.initialize(use_index=use_index)
+            users = [User(u, np.array([1., u])) for u in range(3)]
+            items = [Item(i, np.array([i % 3 == 0])) for i in range(10)]
+            for entity in users + items:
+                recommender.register(entity)
+
+            # cached item sides are refreshed once their rows have been updated
+            context = np.array([.5])
+            candidates = np.arange(10)
+            for i in range(10):
+                scores = recommender.score(users[i % 3], candidates, context)
+                expected = [abs(1. - self.predict(recommender, Event(users[i % 3], item, 1., context))) for item in items]
+                assert_array_almost_equal(scores, expected)
+                recommender.update(Event(users[i % 3], items[i], 1., context))
@@ -1,8 +1,17 @@
-from unittest import TestCase
+from unittest import TestCase, skipIf
 import numpy as np
+from numpy.testing import assert_array_equal, assert_array_almost_equal
+import scipy.sparse as sp
 
 from flurs.data.entity import User, Item, Event
 from flurs.recommender import MFRecommender
+from flurs.forgetting import NoForgetting, UserFactorFading, SDUserFactorFading, MappedUserFactorFading, ForgetUnpopularItems
+from flurs.model import mf_kernels
+from flurs.meta_recommender import AdaDrift
+from flurs.utils.item_index import IVFIndex
+
+
+FORGETTINGS = [NoForgetting, UserFactorFading, SDUserFactorFading, MappedUserFactorFading, ForgetUnpopularItems]
 
 
 class MFRecommenderTestCase(TestCase):
@@ -34,3 +43,156 @@ class MFRecommenderTestCase(TestCase):
         self.recommender.update(Event(User(0), Item(0), 1))
         score = self.recommender.score(User(0), np.array([0]))
         self.assertTrue(score >= 0)
+
+
+class MFRecommenderBatchTestCase(TestCase):
+
+    def setUp(self):
+        self.k = 8
+        self.n_user, self.n_item = 10, 20
+
+        rng = np.random.RandomState(0)
+        self.users = rng.randint(self.n_user, size=200)
+        self.items = rng.randint(self.n_item, size=200)
+        self.ratings = np.ones(200)
+
+    def create(self, forgetting, use_jit=True):
+        recommender = MFRecommender(self.k, .01, .02, forgetting, rnd_seed=0, use_jit=use_jit)
+        recommender.initialize()
+        for u in range(self.n_user):
+            recommender.register(User(u))
+        for i in range(self.n_item):
+            recommender.register(Item(i))
+        return recommender
+
+    def test_update_batch(self):
+        for Forgetting in FORGETTINGS:
+            sequential = self.create(Forgetting(), use_jit=False)
+            for ua, ia, rating in zip(self.users, self.items, self.ratings):
+                sequential.update_model(ua, ia, rating)
+
+            for use_jit in [False, True]:
+                batch = self.create(Forgetting(), use_jit=use_jit)
+                batch.update_batch(self.users, self.items, self.ratings)
+
+                assert_array_almost_equal(batch.A, sequential.A)
+                assert_array_almost_equal(batch.B, sequential.B)
+
+    @skipIf(mf_kernels.njit is None, 'numba is not installed')
+    def test_jit(self):
+        for Forgetting in FORGETTINGS:
+            python = self.create(Forgetting(), use_jit=False)
+            jit = self.create(Forgetting(), use_jit=True)
+            for ua, ia, rating in zip(self.users, self.items, self.ratings):
+                python.update_model(ua, ia, rating)
+                jit.update_model(ua, ia, rating)
+
+            assert_array_almost_equal(jit.A, python.A)
+            assert_array_almost_equal(jit.B, python.B)
+
+    def test_update_events(self):
+        recommender = self.create(NoForgetting())
+        events = [Event(User(u), Item(i), r) for u, i, r in zip(self.users, self.items, self.ratings)]
+        recommender.update_events(events)
+        self.assertEqual(recommender.A.shape, (self.n_user, self.k))
+
+
+class MFRecommenderObserverTestCase(TestCase):
+
+    def test_indexed_observer(self):
+        recommender = MFRecommender(8, .01, .02, NoForgetting(), rnd_seed=0)
+        recommender.initialize()
+        recommender.register(User(2))
+        recommender.register(Item(3))
+
+        meta = AdaDrift(.99, .9, 1.01)
+        meta.initialize(recommender)
+
+        for ua, ia in [(0, 1), (2, 3), (0, 3), (0, 1), (1, 2)]:
+            recommender.update_model(ua, ia, 1.)
+
+        # learning rates are tracked per user/item index
+        self.assertTrue(len(meta.users.learn_vector) >= 3)
+        self.assertTrue(len(meta.items.learn_vector) >= 4)
+        self.assertNotEqual(meta.user_learn_rate(0), .02)
+
+        # new users start from the base learning rate
+        meta.register_user(10)
+        self.assertEqual(meta.user_learn_rate(10), .02)
+
+
+class MFRecommenderScoreBatchTestCase(TestCase):
+
+    def setUp(self):
+        self.recommender = MFRecommender(8, .01, .02, NoForgetting(), rnd_seed=0)
+        self.recommender.initialize()
+        for u in range(5):
+            self.recommender.register(User(u))
+        for i in range(30):
+            self.recommender.register(Item(i))
+
+        self.users = [User(u) for u in [3, 0, 4]]
+
+    def test_score_batch(self):
+        candidates = np.array([5, 1, 29, 7])
+        scores = self.recommender.score_batch(self.users, candidates)
+        self.assertEqual(scores.shape, (3, 4))
+        for user, s in zip(self.users, scores):
+            assert_array_almost_equal(s, self.recommender.score(user, candidates))
+
+    def test_recommend_batch(self):
+        candidates = np.arange(30)
+        recos, scores = self.recommender.recommend_batch(self.users, candidates, top_n=5)
+        self.assertEqual(recos.shape, (3, 5))
+        for user, r, s in zip(self.users, recos, scores):
+            recos_, scores_ = self.recommender.recommend(user, candidates)
+            assert_array_equal(r, recos_[:5])
+            assert_array_almost_equal(s, scores_[:5])
+
+    def test_recommend_batch_csr(self):
+        candidates = sp.csr_matrix((np.ones(5), [2, 9, 4, 0, 1], [0, 2, 2, 5]), shape=(3, 30))
+        results = self.recommender.recommend_batch(self.users, candidates)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(len(results[1][0]), 0)
+        for user, (r, s), items in zip(self.users, results, [[2, 9], [], [4, 0, 1]]):
+            recos_, scores_ = self.recommender.recommend(user, np.array(items, dtype=int))
+            assert_array_equal(r, recos_)
+            assert_array_almost_equal(s, scores_)
+
+
+class MFRecommenderItemIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.recommender = MFRecommender(8, .01, .02, UserFactorFading(), rnd_seed=0)
+        self.recommender.initialize()
+        for u in range(10):
+            self.recommender.register(User(u))
+        for i in range(100):
+            self.recommender.register(Item(i))
+
+        self.index = IVFIndex(n_list=10, n_probe=10, rnd_seed=0)
+        self.recommender.register_item_index(self.index)
+
+    def assert_in_sync(self):
+        B = self.recommender.B
+        assert_array_equal(self.index.assignment[:len(B)], np.argmax(np.dot(B, self.index.centroids.T), axis=1))
+
+        for u in range(10):
+            recos, _ = self.recommender.recommend_top(User(u), 5)
+            recos_, _ = self.recommender.recommend(User(u), np.arange(len(B)), top_n=5)
+            assert_array_equal(recos, recos_)
+
+    def test_sync(self):
+        rng = np.random.RandomState(0)
+        for i in range(100, 120):
+            self.recommender.register(Item(i))
+
+        for use_jit in [True, False]:
+            self.recommender.use_jit = use_jit
+            for _ in range(50):
+                self.recommender.update(Event(User(rng.randint(10)), Item(rng.randint(120)), 1.))
+
+        events = [Event(User(rng.randint(10)), Item(rng.randint(120)), 1.) for _ in range(100)]
+        self.recommender.update_events(events)
+
+        self.assert_in_sync()
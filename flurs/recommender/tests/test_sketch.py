@@ -1,7 +1,10 @@
 from unittest import TestCase
 import numpy as np
+import scipy.sparse as sp
+from numpy.testing import assert_allclose
 
 from flurs.data.entity import User, Item, Event
+from flurs.model import OnlineSketch, OnlineRandomSketch, OnlineSparseSketch
 from flurs.recommender import SketchRecommender
 
 
@@ -32,3 +35,219 @@ class SketchRecommenderTestCase(TestCase):
         self.recommender.update(Event(User(0), Item(0), 1))
         score = self.recommender.score(User(0), np.array([0]), np.array([0]))
         self.assertTrue(score >= 0. and score <= 1.0)
+
+
+class BufferedSketchTestCase(TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.Y = rng.normal(size=(300, 20)) * (np.arange(20) < 5) + .1 * rng.normal(size=(300, 20))
+        self.recommender = SketchRecommender(p=20, ell=4, mode='buffered')
+        self.recommender.initialize()
+
+    def test_error_bound(self):
+        # ell exceeds the 5 dominant directions of the inputs
+        recommender = SketchRecommender(p=20, ell=8, mode='buffered')
+        recommender.initialize()
+        for y in self.Y:
+            recommender.update_model(y)
+
+        # Frequent Directions guarantee: ||A A^T - B B^T||_2 <= ||A - A_k||_F^2 / (ell - k); for k = 5,
+        # it is far below ||A A^T||_2, the error of an empty sketch
+        A = (self.Y / np.linalg.norm(self.Y, axis=1)[:, np.newaxis]).T
+        B = recommender.B[:, :recommender.n_filled]
+        s = np.linalg.svd(A, compute_uv=False)
+        bound = np.sum(s[5:] ** 2) / (8 - 5)
+        self.assertTrue(bound < .1 * s[0] ** 2)
+        self.assertTrue(np.linalg.norm(A.dot(A.T) - B.dot(B.T), 2) <= bound)
+
+    def test_lazy_bases(self):
+        for y in self.Y[:10]:
+            self.recommender.update_model(y)
+        self.assertTrue(self.recommender.stale)
+
+        U_r = self.recommender.U_r
+        self.assertFalse(self.recommender.stale)
+        assert_allclose(U_r.T.dot(U_r), np.identity(self.recommender.r), atol=1e-12)
+
+        U, s, V = np.linalg.svd(self.recommender.B, full_matrices=False)
+        assert_allclose(np.abs(U_r), np.abs(U[:, :self.recommender.r]), atol=1e-12)
+
+    def test_score(self):
+        self.recommender.register(User(0, feature=np.zeros(10)))
+        for i in range(3):
+            self.recommender.register(Item(i, feature=np.eye(10)[i]))
+        for y in self.Y[:10]:
+            self.recommender.update_model(y)
+
+        score = self.recommender.score(User(0, feature=np.zeros(10)), np.arange(3), np.zeros(0))
+        self.assertEqual(score.shape, (3,))
+        self.assertTrue(np.all((score >= 0.) & (score <= 1. + 1e-12)))
+
+
+class SketchScoreTestCase(TestCase):
+
+    def test_cached_items(self):
+        rng = np.random.RandomState(0)
+        for proj in ['Raw', 'RandomProjection', 'TensorSketchProjection']:
+            recommender = SketchRecommender(p=12, k=8, ell=3, proj=proj)
+            recommender.initialize()
+
+            users = [User(u, feature=rng.binomial(1, .5, 4).astype(float)) for u in range(3)]
+            items = [Item(i, feature=rng.binomial(1, .5, 6).astype(float)) for i in range(10)]
+            for item in items:
+                recommender.register(item)
+            for u, i in zip(rng.randint(0, 3, 20), rng.randint(0, 10, 20)):
+                recommender.update(Event(users[u], items[i], 1, context=rng.binomial(1, .5, 2).astype(float)))
+
+            context = np.array([1., 0.])
+            candidates = np.array([7, 2, 5])
+            expected = recommender.score_stacked(users[0], candidates, context)
+            assert_allclose(recommender.score(users[0], candidates, context), expected, atol=1e-12)
+
+
+class RandomSketchTestCase(TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.Y = rng.normal(size=(300, 20)) * (np.arange(20) < 5) + .1 * rng.normal(size=(300, 20))
+        self.A = (self.Y / np.linalg.norm(self.Y, axis=1)[:, np.newaxis]).T
+
+    def test_error_bound(self):
+        np.random.seed(0)
+        sketch = OnlineRandomSketch(p=20, ell=8)
+        for head in range(0, 300, 70):
+            sketch.update_batch(self.Y[head:head + 70].T)
+
+        # Frequent Directions guarantee: ||A A^T - B B^T||_2 <= ||A - A_k||_F^2 / (ell - k) for the 5 dominant
+        # directions, and as close to the exact shrink as the buffered mode
+        B = sketch.B[:, :sketch.n_filled]
+        error = np.linalg.norm(self.A.dot(self.A.T) - B.dot(B.T), 2)
+        s = np.linalg.svd(self.A, compute_uv=False)
+        self.assertTrue(error <= np.sum(s[5:] ** 2) / (8 - 5))
+
+        buffered = OnlineSketch(p=20, ell=8, mode='buffered')
+        buffered.update_batch(self.Y.T)
+        B = buffered.B[:, :buffered.n_filled]
+        self.assertAlmostEqual(error, np.linalg.norm(self.A.dot(self.A.T) - B.dot(B.T), 2), delta=.05 * error)
+
+        U_r = sketch.U_r
+        assert_allclose(U_r.T.dot(U_r), np.identity(sketch.r), atol=1e-12)
+
+    def test_update_batch(self):
+        # a block is inserted as its columns one by one
+        for create in [lambda: OnlineSketch(p=20, ell=4, mode='buffered'), lambda: OnlineRandomSketch(p=20, ell=4)]:
+            np.random.seed(0)
+            sequential = create()
+            for y in self.Y:
+                sequential.update_model(y)
+
+            np.random.seed(0)
+            batch = create()
+            batch.update_batch(self.Y[:150].T)
+            batch.update_batch(sp.csc_matrix(self.Y[150:].T))
+
+            self.assertEqual(batch.n_filled, sequential.n_filled)
+            assert_allclose(batch.B, sequential.B, atol=1e-10)
+            assert_allclose(np.abs(batch.U_r), np.abs(sequential.U_r), atol=1e-8)
+
+    def test_update_events(self):
+        rng = np.random.RandomState(0)
+        users = [User(u, feature=rng.binomial(1, .5, 4).astype(float)) for u in range(3)]
+        items = [Item(i, feature=rng.binomial(1, .5, 6).astype(float)) for i in range(10)]
+        events = [Event(users[u], items[i], 1, context=rng.binomial(1, .5, 2).astype(float))
+                  for u, i in zip(rng.randint(0, 3, 30), rng.randint(0, 10, 30))]
+
+        sequential = SketchRecommender(p=12, k=8, ell=3, mode='buffered')
+        sequential.initialize()
+        for e in events:
+            sequential.update(e)
+
+        batch = SketchRecommender(p=12, k=8, ell=3, mode='buffered')
+        batch.initialize()
+        batch.update_events(events)
+
+        assert_allclose(batch.B, sequential.B, atol=1e-10)
+
+
+class SparseSketchTestCase(TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+
+        # every input scales one of 3 sparse prototypes, with sparse noise
+        prototypes = sp.random(500, 3, density=.03, random_state=rng, format='csc')
+        self.Y = sp.csc_matrix(prototypes[:, rng.randint(0, 3, 400)].dot(sp.diags(rng.uniform(.5, 1.5, 400))) +
+                               .1 * sp.random(500, 400, density=.005, random_state=rng, format='csc'))
+
+        nonzero = np.ravel(abs(self.Y).sum(axis=0)) > 0.
+        A = self.Y.toarray()[:, nonzero]
+        self.A = A / np.linalg.norm(A, axis=0)
+
+    def assert_error_bound(self, sketch):
+        # Frequent Directions guarantee: ||A A^T - B B^T||_2 <= ||A - A_k||_F^2 / (ell - k); for the k = 3
+        # prototypes, it is far below ||A A^T||_2, the error of an empty sketch
+        s = np.linalg.svd(self.A, compute_uv=False)
+        bound = np.sum(s[3:] ** 2) / (sketch.ell - 3)
+        self.assertTrue(bound < .01 * s[0] ** 2)
+
+        B = sketch.B[:, :sketch.n_filled]
+        self.assertTrue(np.linalg.norm(self.A.dot(self.A.T) - B.dot(B.T), 2) <= bound)
+
+    def test_error_bound(self):
+        np.random.seed(0)
+        sketch = OnlineSparseSketch(p=500, ell=5)
+        for j in range(400):
+            sketch.update_model(self.Y[:, j])
+
+            # the buffer takes as much memory as the sketch at most
+            self.assertTrue(sketch.nnz_pending < 5 * 500)
+        self.assertTrue(sketch.n_verify > 0)
+
+        sketch.flush()
+        self.assertEqual(sketch.n_pending, 0)
+        self.assert_error_bound(sketch)
+
+        U_r = sketch.U_r
+        assert_allclose(U_r.T.dot(U_r), np.identity(sketch.r), atol=1e-12)
+
+    def test_buffer_size(self):
+        np.random.seed(0)
+        sketch = OnlineSparseSketch(p=500, ell=5, buffer_size=50)
+        for j in range(400):
+            sketch.update_model(self.Y[:, j])
+            self.assertTrue(sketch.n_pending < 50)
+
+            # the bases follow the stream with a lag of the buffer size at most
+            if j == 49:
+                self.assertEqual(sketch.n_basis, 1)
+                self.assertTrue(np.any(sketch.U_r != 0.))
+        self.assertEqual(sketch.n_basis, 8)
+        self.assert_error_bound(sketch)
+
+    def test_update_batch(self):
+        np.random.seed(0)
+        sequential = OnlineSparseSketch(p=500, ell=5)
+        for j in range(400):
+            sequential.update_model(self.Y[:, j])
+        sequential.flush()
+
+        np.random.seed(0)
+        batch = OnlineSparseSketch(p=500, ell=5)
+        batch.update_batch(self.Y[:, :150])
+        batch.update_batch(self.Y[:, 150:].toarray())
+        batch.flush()
+
+        assert_allclose(batch.B, sequential.B, atol=1e-10)
+
+    def test_bounded_retry(self):
+        sketch = OnlineSparseSketch(p=500, ell=5, max_retry=3)
+
+        # every spectral test fails; the buffer is shrunk by a truncated SVD after 3 trials
+        n_test = []
+        sketch.verify_spectral = lambda A, C, bound: n_test.append(bound) and False
+        sketch.update_batch(self.Y)
+        sketch.flush()
+
+        self.assertEqual(len(n_test), 3 * sketch.n_basis)
+        self.assert_error_bound(sketch)
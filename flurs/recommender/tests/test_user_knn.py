@@ -33,3 +33,39 @@ class UserKNNRecommenderTestCase(TestCase):
         score = self.recommender.score(User(0), np.array([0]))
         print(score)
         self.assertTrue(score >= -1. and score <= 1.)
+
+
+class UserKNNSparseTestCase(TestCase):
+
+    def setUp(self):
+        self.recommender = UserKNNRecommender(k=2)
+        self.recommender.initialize()
+        for u in range(4):
+            self.recommender.register(User(u))
+        for i in range(3):
+            self.recommender.register(Item(i))
+
+    def test_mean(self):
+        self.recommender.update(Event(User(0), Item(0), 4))
+        self.recommender.update(Event(User(0), Item(1), 2))
+        self.recommender.update(Event(User(0), Item(0), 5))
+        self.assertEqual(self.recommender.counts[0], 2)
+        self.assertAlmostEqual(self.recommender.means[0], 3.5)
+
+    def test_neighbors(self):
+        # user 3 shares no items with user 0
+        for u, i, r in [(1, 0, 5), (1, 1, 1), (2, 0, 1), (2, 1, 5), (3, 2, 3),
+                        (0, 0, 4), (0, 1, 2)]:
+            self.recommender.update(Event(User(u), Item(i), r))
+
+        row = self.recommender.similarities[0]
+        self.assertEqual(set(row.users[:row.n].tolist()), {1, 2})
+
+        # only positively similar users are neighbors
+        top_uys, top_S = self.recommender.neighbors[0]
+        self.assertEqual(top_uys.tolist(), [1])
+        self.assertTrue(top_S[0] > 0.)
+
+        score = self.recommender.score(User(0), np.array([0, 1, 2]))
+        self.assertTrue(score[0] > score[1])
+        self.assertAlmostEqual(score[2], self.recommender.means[0])
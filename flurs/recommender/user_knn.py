@@ -1,5 +1,6 @@
 from ..base import RecommenderMixin
 from ..model import UserKNN
+from ..utils.growable import ensure_index
 
 import numpy as np
 
@@ -19,70 +20,47 @@ class UserKNNRecommender(UserKNN, RecommenderMixin):
     def initialize(self):
         super(UserKNNRecommender, self).initialize()
 
-    def insert_row(self, mat, n_col):
-        row = np.zeros((1, n_col))
-        if mat.size == 0:
-            mat = row
-        else:
-            mat = np.concatenate((mat, row))
-        return mat
-
-    def insert_col(self, mat, n_row):
-        col = np.zeros((n_row, 1))
-        if mat.size == 0:
-            mat = col
-        else:
-            mat = np.concatenate((mat, col), axis=1)
-        return mat
+        # position of each item in the candidates being scored (-1 for the others)
+        self.positions = np.zeros(0, dtype=int)
 
     def register_user(self, user):
         super(UserKNNRecommender, self).register_user(user)
-
-        self.R = self.insert_row(self.R, self.n_item)
-
-        self.S = self.insert_row(self.S, self.n_user - 1)
-        self.S = self.insert_col(self.S, self.n_user)
-
-        self.B = self.insert_row(self.B, self.n_user - 1)
-        self.B = self.insert_col(self.B, self.n_user)
-
-        self.C = self.insert_row(self.C, self.n_user - 1)
-        self.C = self.insert_col(self.C, self.n_user)
-
-        self.D = self.insert_row(self.D, self.n_user - 1)
-        self.D = self.insert_col(self.D, self.n_user)
-
-        # keep track how many times each user interacted with items
-        # to compute user's mean
-        self.users[user.index]['count'] = 0
-
-        # current average rating of the user
-        self.users[user.index]['mean'] = 0.
+        self.add_user(user.index)
 
     def register_item(self, item):
         super(UserKNNRecommender, self).register_item(item)
-        self.R = self.insert_col(self.R, self.n_user)
 
     def update(self, e, batch_train=False):
-        self.update_model(e.user.index, e.item.index, e.value)
+        self.update_model(e.user.index, e.item.index, e.rating)
 
     def score(self, user, candidates):
         ua = user.index
 
-        # find k nearest neightbors
-        top_uys = np.argsort(self.S[ua, :])[::-1][:self.k]
+        top_uys, top_S = self.neighbors[ua]
+        denom = np.sum(top_S)
+
+        pred = np.full(len(candidates), self.means[ua])
+        if denom == 0. or len(candidates) == 0:
+            return np.abs(pred)
+
+        # ratings of the neighbors, normalized by their means and weighted by the similarities
+        rows = [self.user_ratings[uy] for uy in top_uys.tolist()]
+        n_rating = np.array([row.n for row in rows])
+        items = np.concatenate([row.items[:row.n] for row in rows])
+        weights = (np.concatenate([row.ratings[:row.n] for row in rows]) -
+                   np.repeat(self.means[top_uys], n_rating)) * np.repeat(top_S, n_rating)
+
+        # match the rated items with the candidates; unrated ones contribute zero
+        self.positions = ensure_index(self.positions, max(np.max(candidates), np.max(items)), -1)
+        self.positions[candidates] = np.arange(len(candidates))
+        pos = self.positions[items]
+        self.positions[candidates] = -1
+        hit = pos >= 0
 
-        pred = np.ones(len(candidates)) * self.users[ua]['mean']
-        for pi, ii in enumerate(candidates):
-            denom = numer = 0.
-            for uy in top_uys:
-                numer += ((self.R[uy, ii] - self.users[uy]['mean']) * self.S[ua, uy])
-                denom += self.S[ua, uy]
-            if denom != 0.:
-                pred[pi] += (numer / denom)
+        pred += np.bincount(pos[hit], weights=weights[hit], minlength=len(candidates)) / denom
 
         return np.abs(pred)
 
-    def recommend(self, user, candidates):
+    def recommend(self, user, candidates, top_n=None):
         scores = self.score(user, candidates)
-        return self.scores2recos(scores, candidates, rev=True)
+        return self.scores2recos(scores, candidates, rev=True, top_n=top_n)
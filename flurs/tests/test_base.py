@@ -46,3 +46,44 @@ class RecommenderMixinTestCase(TestCase):
         candidates_, scores_ = self.recommender.scores2recos(scores, candidates, rev=True)
         assert_array_equal(scores_, np.array([5., 3., 1.]))
         assert_array_equal(candidates_, np.array([100, 1000, 10]))
+
+
+class RecommenderMixinRankingTestCase(TestCase):
+
+    def setUp(self):
+        self.recommender = RecommenderMixin()
+
+        rng = np.random.RandomState(0)
+        self.scores = rng.normal(size=1001)
+        self.candidates = rng.permutation(5000)[:1001]
+
+    def test_scores2recos_top_n(self):
+        candidates, scores = self.recommender.scores2recos(self.scores, self.candidates)
+
+        for top_n in [1, 10, 1001, 2000]:
+            candidates_, scores_ = self.recommender.scores2recos(self.scores, self.candidates, top_n=top_n)
+            assert_array_equal(candidates_, candidates[:top_n])
+            assert_array_equal(scores_, scores[:top_n])
+
+    def test_scores2rank(self):
+        candidates, _ = self.recommender.scores2recos(self.scores, self.candidates)
+
+        for target in [0, 500, 1000, -1]:
+            rank = self.recommender.scores2rank(self.scores, target)
+            self.assertEqual(rank, np.where(candidates == self.candidates[target])[0][0])
+
+    def test_scores2rank_ties(self):
+        scores = np.array([3., 1., 1., 1., 0.])
+
+        ranks = set(self.recommender.scores2rank(scores, 1) for _ in range(100))
+        self.assertEqual(ranks, {1, 2, 3})
+        self.assertEqual(self.recommender.scores2rank(scores, 0), 0)
+        self.assertEqual(self.recommender.scores2rank(scores, 4), 4)
+
+        # a dedicated stream leaves the global one untouched
+        np.random.seed(0)
+        expected = np.random.random_sample()
+        np.random.seed(0)
+        ranks = set(self.recommender.scores2rank(scores, 1, np.random.RandomState(i)) for i in range(100))
+        self.assertEqual(ranks, {1, 2, 3})
+        self.assertEqual(np.random.random_sample(), expected)
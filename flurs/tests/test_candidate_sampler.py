@@ -0,0 +1,64 @@
+from unittest import TestCase
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from flurs.data.entity import User, Item, Event
+from flurs.candidate_sampler import BufferSampler, PoolSampler
+
+
+class CandidateSamplerTestCase(TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.users = [User(u) for u in range(5)]
+        self.events = [Event(self.users[u], Item(i)) for u, i in zip(rng.randint(0, 5, 500), rng.randint(0, 300, 500))]
+
+    def observe(self, sampler):
+        for e in self.events:
+            e.user.known_item(e.item.index)
+            sampler.observe(e)
+
+    def test_pool(self):
+        sampler = PoolSampler(maxlen=100)
+        self.observe(sampler)
+
+        self.assertEqual(len(sampler.item_buffer), 100)
+        assert_array_equal(np.sort(sampler.pool[:sampler.n_pool]), np.unique(list(sampler.item_buffer)))
+
+    def test_sample(self):
+        e = self.events[-1]
+
+        buffer_sampler = BufferSampler(n_candidate=50)
+        self.observe(buffer_sampler)
+        expected = set(buffer_sampler.item_buffer) - set(e.user.known_items)
+
+        pool_sampler = PoolSampler(n_candidate=50)
+        for s in self.events:
+            pool_sampler.observe(s)
+
+        for sampler in [buffer_sampler, pool_sampler]:
+            candidates = sampler.sample(e)
+            self.assertEqual(len(candidates), 50)
+            self.assertEqual(len(set(candidates)), 50)
+            self.assertTrue(set(candidates) <= expected)
+
+        # few unknown items; all of them are returned
+        pool_sampler.n_candidate = 1000
+        self.assertEqual(set(pool_sampler.sample(e)), expected)
+
+    def test_uniform(self):
+        sampler = PoolSampler(n_candidate=10)
+        self.observe(sampler)
+
+        e = self.events[-1]
+        unknown = sorted(set(sampler.item_buffer) - set(e.user.known_items))
+
+        np.random.seed(0)
+        freq = np.zeros(300)
+        n_trial = 2000
+        for _ in range(n_trial):
+            freq[sampler.sample(e)] += 1
+
+        # each unknown item is drawn with the probability 10 / len(unknown)
+        p = 10. / len(unknown)
+        self.assertTrue(np.all(np.abs(freq[unknown] / n_trial - p) < 5 * np.sqrt(p * (1 - p) / n_trial)))
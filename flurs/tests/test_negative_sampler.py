@@ -0,0 +1,53 @@
+from unittest import TestCase
+import numpy as np
+from numpy.testing import assert_allclose
+
+from flurs.negative_sampler import alias_table, UniformNegativeSampler, PopularityNegativeSampler
+
+
+class NegativeSamplerTestCase(TestCase):
+
+    def test_alias_table(self):
+        rng = np.random.RandomState(0)
+        for weights in [rng.zipf(1.5, 1000).astype(float), np.r_[1e6, np.ones(999)], np.r_[np.zeros(10), 1.]]:
+            prob, alias = alias_table(weights)
+
+            # probability mass of each index over the cells
+            mass = prob.copy()
+            np.add.at(mass, alias, 1. - prob)
+            assert_allclose(mass / weights.size, weights / weights.sum(), atol=1e-12)
+
+    def test_uniform(self):
+        sampler = UniformNegativeSampler()
+        for i in range(100):
+            sampler.add_item(i)
+
+        known = set(range(90))
+        negatives = sampler.sample(known, 1000)
+        self.assertEqual(negatives.shape, (1000,))
+        self.assertEqual(set(negatives), set(range(90, 100)))
+
+        # no rejection round succeeds; unknown items are enumerated
+        sampler.max_trial = 1
+        self.assertEqual(set(sampler.sample(set(range(99)), 10)), {99})
+
+        self.assertEqual(sampler.sample(set(range(100)), 10).size, 0)
+
+    def test_popularity(self):
+        sampler = PopularityNegativeSampler()
+        for i in range(10):
+            sampler.add_item(i)
+
+        # item i is observed i times
+        for i in range(10):
+            for _ in range(i):
+                sampler.observe(i)
+        self.assertEqual(sampler.n_table + sampler.n_recent, 45)
+
+        np.random.seed(0)
+        negatives = sampler.sample({9}, 100000)
+        self.assertNotIn(0, negatives)
+        self.assertNotIn(9, negatives)
+
+        freq = np.bincount(negatives, minlength=10) / 100000.
+        assert_allclose(freq[1:9], np.arange(1, 9) / 36., atol=.01)
@@ -0,0 +1,89 @@
+import numpy as np
+import scipy.sparse as sp
+
+
+def conflict_free_rounds(*keys):
+    """Split a block of events into rounds in which no key appears twice.
+
+    Events sharing a key are assigned to strictly increasing rounds in their original order,
+    and every round touches each key at most once. Applying an update which only reads/writes
+    the rows of its own keys round by round is therefore equivalent to processing the events
+    one by one.
+
+    Args:
+        *keys (numpy array; (n_event,) or (n_event, m)):
+            Keys of each event such as user and item indices. The m columns of a 2d array
+            share a namespace (e.g. positive and negative items of a BPR triple).
+
+    Returns:
+        list of numpy array: Event indices of each round.
+
+    """
+    n_event = len(keys[0])
+    if n_event == 0:
+        return []
+
+    # map the keys of all the namespaces to a single range of ids
+    ids = []
+    n_id = 0
+    for k in keys:
+        uniq, inverse = np.unique(np.asarray(k).reshape((n_event, -1)), return_inverse=True)
+        ids.append(inverse.reshape((n_event, -1)) + n_id)
+        n_id += uniq.size
+    ids = np.hstack(ids).tolist()
+
+    # in a single ordered pass, an event runs one round after the latest round of its keys
+    last = [-1] * n_id
+    rnd = [0] * n_event
+    for t, event_ids in enumerate(ids):
+        r = max([last[i] for i in event_ids]) + 1
+        for i in event_ids:
+            last[i] = r
+        rnd[t] = r
+
+    rnd = np.array(rnd)
+    order = np.argsort(rnd, kind='stable')
+    return np.split(order, np.flatnonzero(np.diff(rnd[order])) + 1)
+
+
+def dot_scores(U, V, candidates):
+    """Compute inner products between user and item factors for many users at once.
+
+    Args:
+        U (numpy array; (n_user, k)): Factors of the target users.
+        V (numpy array; (n_item, k)): Item factors.
+        candidates (numpy array; (n_candidate,) or scipy CSR matrix; (n_user, n_item)):
+            Candidates shared by all users, or candidate lists of each user given by the
+            column indices of the corresponding CSR row.
+
+    Returns:
+        numpy array; (n_user, n_candidate) or scipy CSR matrix; (n_user, n_item):
+        Scores; for CSR candidates, the scores are the data of a CSR matrix with the
+        same structure (and order of indices) as `candidates`.
+
+    """
+    if not sp.issparse(candidates):
+        return np.dot(U, V[candidates].T)
+
+    indices, indptr = candidates.indices, candidates.indptr
+    lengths = np.diff(indptr)
+
+    # union of the candidates
+    mask = np.zeros(V.shape[0], dtype=bool)
+    mask[indices] = True
+    items = np.flatnonzero(mask)
+
+    if U.shape[0] * items.size <= 32 * indices.size:
+        # a single GEMM against the union of the candidates
+        rows = np.repeat(np.arange(U.shape[0]), lengths)
+        position = np.cumsum(mask)[indices] - 1
+        data = np.dot(U, V[items].T)[rows, position]
+    elif np.all(lengths == lengths[0]):
+        # the union is far larger than the candidate lists; batched GEMV over the equally long lists
+        data = np.matmul(V[indices].reshape((U.shape[0], lengths[0], -1)), U[:, :, np.newaxis]).ravel()
+    else:
+        data = np.empty(indices.size)
+        for u in np.flatnonzero(lengths):
+            data[indptr[u]:indptr[u + 1]] = np.dot(V[indices[indptr[u]:indptr[u + 1]]], U[u])
+
+    return sp.csr_matrix((data, indices.copy(), indptr.copy()), shape=candidates.shape)
@@ -0,0 +1,75 @@
+import numpy as np
+
+
+class FactorStore(object):
+
+    """Growable matrix of latent factors with amortized constant-time row insertion.
+
+    Rows live in a preallocated buffer whose capacity is doubled when it fills up,
+    so registering n new users/items costs O(n * k) overall instead of O(n^2 * k)
+    as repeated `np.concatenate` calls do. `matrix` is a view of the active rows;
+    writes into it go straight to the buffer.
+
+    """
+
+    def __init__(self, k, mean=0., std=0.2, capacity=16):
+        """Set/initialize parameters.
+
+        Args:
+            k (int): Number of latent factors (i.e. columns).
+            mean (float): Mean of the normal distribution new rows are drawn from.
+            std (float): Standard deviation of the normal distribution new rows are drawn from.
+            capacity (int): Number of rows allocated by the first growth.
+
+        """
+        self.k = k
+        self.mean = mean
+        self.std = std
+        self.initial_capacity = max(1, capacity)
+
+        self.n_row = 0
+        self.buffer = np.empty((0, k))
+
+    def __len__(self):
+        return self.n_row
+
+    @property
+    def capacity(self):
+        return self.buffer.shape[0]
+
+    @property
+    def matrix(self):
+        """numpy array; (n_row, k): View of the active rows.
+        """
+        return self.buffer[:self.n_row]
+
+    def grow(self, n_row):
+        """Make sure that at least `n_row` rows are active.
+
+        Newly activated rows are drawn from N(mean, std^2). When the buffer is too small,
+        it is reallocated with (at least) doubled capacity, so that earlier views of the
+        matrix must be refreshed by the caller.
+
+        Args:
+            n_row (int): Required number of active rows.
+
+        Returns:
+            numpy array; (n_row, k): View of the active rows.
+
+        """
+        if n_row <= self.n_row:
+            return self.matrix
+
+        if n_row > self.capacity:
+            capacity = max(self.initial_capacity, self.capacity)
+            while capacity < n_row:
+                capacity *= 2
+
+            buffer = np.empty((capacity, self.k))
+            buffer[:self.n_row] = self.buffer[:self.n_row]
+            self.buffer = buffer
+
+        self.buffer[self.n_row:n_row] = np.random.normal(self.mean, self.std, (n_row - self.n_row, self.k))
+        self.n_row = n_row
+
+        return self.matrix
@@ -0,0 +1,99 @@
+import numpy as np
+import scipy.sparse as sp
+
+from .growable import ensure_index
+
+
+class FeatureStore(object):
+
+    """Growable store of sparse feature vectors indexed by user/item indices.
+
+    The nonzero entries of each column are appended to shared buffers whose capacity is
+    doubled when they fill up, so that adding a column costs amortized O(nnz) instead of
+    rebuilding a sparse matrix with `sp.hstack`. A column which is set again is appended
+    anew; its former entries are simply left unused.
+
+    """
+
+    def __init__(self, n_row):
+        """Set/initialize parameters.
+
+        Args:
+            n_row (int): Number of feature dimensions (i.e. rows).
+
+        """
+        self.n_row = n_row
+        self.n_col = 0
+        self.nnz = 0
+
+        self.indices = np.zeros(0, dtype=int)
+        self.data = np.zeros(0)
+
+        # where the entries of each column start in the buffers (-1 if never set), and how many they are
+        self.starts = np.zeros(0, dtype=int)
+        self.lengths = np.zeros(0, dtype=int)
+
+    def __contains__(self, col):
+        return col < self.starts.shape[0] and self.starts[col] >= 0
+
+    def set(self, col, vector):
+        """Store a feature vector as a column.
+
+        Args:
+            col (int): Column (i.e. user/item) index.
+            vector (numpy array; (n_row,)): Feature vector.
+
+        """
+        if len(vector) != self.n_row:
+            raise ValueError('feature vector must have %d dimensions: %d' % (self.n_row, len(vector)))
+
+        nonzero = np.flatnonzero(vector)
+        start = self.nnz
+        end = start + nonzero.size
+        if end > start:
+            self.indices = ensure_index(self.indices, end - 1)
+            self.data = ensure_index(self.data, end - 1)
+            self.indices[start:end] = nonzero
+            self.data[start:end] = vector[nonzero]
+
+        self.starts = ensure_index(self.starts, col, -1)
+        self.lengths = ensure_index(self.lengths, col)
+        self.starts[col] = start
+        self.lengths[col] = nonzero.size
+
+        self.nnz = end
+        self.n_col = max(self.n_col, col + 1)
+
+    def gather(self, cols):
+        """Gather the entries of columns in the CSC format.
+
+        Args:
+            cols (numpy array; (n,)): Column indices; columns which have never been set are zeros.
+
+        Returns:
+            (numpy array, numpy array, numpy array): (indptr; (n + 1,), indices; (nnz,), data; (nnz,)).
+
+        """
+        cols = np.asarray(cols, dtype=int)
+        lengths = self.lengths[cols]
+
+        indptr = np.zeros(cols.size + 1, dtype=int)
+        np.cumsum(lengths, out=indptr[1:])
+
+        # positions of the entries of the selected columns in the buffers
+        positions = np.repeat(self.starts[cols] - indptr[:-1], lengths) + np.arange(indptr[-1], dtype=int)
+
+        return indptr, self.indices[positions], self.data[positions]
+
+    def select(self, cols):
+        """Gather columns into a sparse matrix.
+
+        Args:
+            cols (numpy array; (n,)): Column indices; columns which have never been set are zeros.
+
+        Returns:
+            scipy CSC matrix; (n_row, n): Selected columns.
+
+        """
+        indptr, indices, data = self.gather(cols)
+        return sp.csc_matrix((data, indices, indptr), shape=(self.n_row, indptr.size - 1))
@@ -1,3 +1,9 @@
+import numpy as np
+
+from .batch import conflict_free_rounds
+from .growable import ensure_index
+
+
 class FloatMetric:
     def __init__(self, decay):
         self.decay = decay
@@ -32,3 +38,84 @@ class FloatSTD(FloatMetric):
 
     def __repr__(self):
         return "{0:.10f}".format(self.get())
+
+
+class FloatMetricBank:
+    """Decayed metrics of many ids (e.g. user or item indices) stored in one contiguous array.
+
+    Ids are non-negative integers. The array grows on demand through `register`,
+    and unregistered entries start from 0.0 like `FloatMetric`.
+    """
+
+    def __init__(self, decay, size=0):
+        self.decay = decay
+        self.floating_values = np.zeros(size)
+
+    def __len__(self):
+        return len(self.floating_values)
+
+    def register(self, index):
+        self.floating_values = ensure_index(self.floating_values, np.max(index))
+
+    def next(self, ids, values):
+        """Update the metrics of `ids` with `values`; repeated ids are applied in order.
+        """
+        if np.ndim(ids) == 0:
+            self.update(ids, values)
+            return
+
+        ids = np.asarray(ids)
+        values = np.asarray(values)
+        for idx in conflict_free_rounds(ids):
+            self.update(ids[idx], values[idx])
+
+    def get(self, ids):
+        return self.floating_values[ids]
+
+    def __repr__(self):
+        return str(self.get(slice(None)))
+
+    def update(self, ids, values):
+        """Update the metrics of distinct `ids`.
+        """
+        return
+
+class FloatMeanBank(FloatMetricBank):
+    def update(self, ids, values):
+        self.floating_values[ids] = self.floating_values[ids] * self.decay + values * (1 - self.decay)
+
+class FloatSTDBank(FloatMetricBank):
+    def __init__(self, mean, size=0):
+        self.mean = mean
+        super().__init__(self.mean.decay, size)
+
+    def next(self, ids, values):
+        """Update the deviations of distinct `ids` with `values`, reading the current mean.
+
+        A repeated id would read the mean after all of its values rather than after the current one;
+        use `next_with_mean` to update both in order.
+        """
+        if np.ndim(ids) > 0 and np.unique(ids).size < len(ids):
+            raise ValueError('repeated ids; use next_with_mean to update the mean and the deviation in order')
+        super().next(ids, values)
+
+    def next_with_mean(self, ids, values):
+        """Update the mean and then the deviation of `ids` with `values`, as interleaved
+        `FloatMean.next` and `FloatSTD.next`; repeated ids are applied in order.
+        """
+        if np.ndim(ids) == 0:
+            self.mean.update(ids, values)
+            self.update(ids, values)
+            return
+
+        ids = np.asarray(ids)
+        values = np.asarray(values)
+        for idx in conflict_free_rounds(ids):
+            self.mean.update(ids[idx], values[idx])
+            self.update(ids[idx], values[idx])
+
+    def update(self, ids, values):
+        self.floating_values[ids] = (self.floating_values[ids] * self.decay + (values - self.mean.get(ids))**2) * (1 - self.decay)
+
+    def get(self, ids):
+        return self.floating_values[ids]**.5
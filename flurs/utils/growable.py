@@ -0,0 +1,26 @@
+import numpy as np
+
+
+def ensure_index(array, index, fill_value=0.):
+    """Make sure that `array[index]` exists by growing the array along its first axis.
+
+    The capacity is at least doubled on every reallocation, so growing an array
+    one index at a time costs amortized O(1) per index.
+
+    Args:
+        array (numpy array): Array indexed by user/item indices.
+        index (int): Index which must be valid.
+        fill_value (float): Value of the newly allocated entries.
+
+    Returns:
+        numpy array: `array` itself or its grown copy.
+
+    """
+    size = array.shape[0]
+    if index < size:
+        return array
+
+    capacity = max(index + 1, 2 * size, 16)
+    grown = np.full((capacity,) + array.shape[1:], fill_value, dtype=array.dtype)
+    grown[:size] = array
+    return grown
@@ -0,0 +1,238 @@
+import numpy as np
+
+from .batch import dot_scores
+from .growable import ensure_index
+
+
+class IVFIndex(object):
+
+    """Inverted-file index for approximate maximum inner product search over item factors.
+
+    Items are clustered by the direction of their factors (spherical k-means), and each
+    cluster keeps the list of its items. A query scores the centroids, and then exactly
+    scores only the items of the `n_probe` best clusters, i.e. O((n_list + n_probe * n / n_list) * k)
+    instead of O(n * k) for n items. With the default n_list = sqrt(n), the cost is O(sqrt(n) * k).
+
+    Rows of the factor matrix changed by incremental updates are reassigned to their
+    best centroid by `update`; the centroids themselves are only trained by `build`,
+    which can be called again when the factors have drifted a lot.
+
+    The factor matrix is passed to each call rather than stored, since it is reallocated
+    as the catalog grows.
+
+    """
+
+    def __init__(self, n_list=None, n_probe=8, n_iter=10, rnd_seed=None):
+        """Set/initialize parameters.
+
+        Args:
+            n_list (int): Number of clusters; sqrt(n_item) at the time of `build` by default.
+            n_probe (int): Number of clusters scanned by a query.
+            n_iter (int): Number of k-means iterations of `build`.
+            rnd_seed (int): Seed of the initial centroids.
+
+        """
+        self.n_list = n_list
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.rnd_seed = rnd_seed
+
+        self.centroids = None
+
+    @property
+    def built(self):
+        return self.centroids is not None
+
+    def build(self, V):
+        """Train the centroids and assign every row.
+
+        Args:
+            V (numpy array; (n_item, k)): Item factors.
+
+        """
+        n_item = V.shape[0]
+        if n_item == 0:
+            return
+
+        X = self.__normalize(V)
+
+        n_list = self.n_list or int(np.ceil(np.sqrt(n_item)))
+        n_list = min(n_list, n_item)
+
+        rng = np.random.RandomState(self.rnd_seed)
+        centroids = X[rng.choice(n_item, n_list, replace=False)]
+        for _ in range(self.n_iter):
+            assignment = np.argmax(np.dot(X, centroids.T), axis=1)
+            order = np.argsort(assignment, kind='stable')
+            sizes = np.bincount(assignment, minlength=n_list)
+
+            # empty clusters keep their previous centroid
+            nonempty = sizes > 0
+            starts = (np.cumsum(sizes) - sizes)[nonempty]
+            centroids[nonempty] = self.__normalize(np.add.reduceat(X[order], starts))
+        self.centroids = centroids
+
+        # lay out the lists from scratch
+        assignment = np.argmax(np.dot(X, centroids.T), axis=1)
+        order = np.argsort(assignment, kind='stable')
+        sizes = np.bincount(assignment, minlength=n_list)
+
+        self.assignment = assignment
+        self.sizes = sizes
+        self.lists = np.split(order, np.cumsum(sizes)[:-1])
+        self.position = np.empty(n_item, dtype=int)
+        for members in self.lists:
+            self.position[members] = np.arange(members.size)
+
+    def update(self, V, rows):
+        """Reassign new or changed rows to their best centroid.
+
+        Args:
+            V (numpy array; (n_item, k)): Item factors.
+            rows (int or numpy array): Indices of the new or changed rows.
+
+        """
+        if not self.built:
+            return
+
+        rows = np.atleast_1d(rows)
+        if rows.size == 0:
+            return
+
+        max_row = rows.max()
+        self.assignment = ensure_index(self.assignment, max_row, -1)
+        self.position = ensure_index(self.position, max_row, -1)
+
+        clusters = np.argmax(np.dot(V[rows], self.centroids.T), axis=1)
+        for row, cluster in zip(rows.tolist(), clusters.tolist()):
+            current = self.assignment[row]
+            if current == cluster:
+                continue
+            if current >= 0:
+                self.__remove(row, current)
+            self.__add(row, cluster)
+
+    def search(self, V, q, top_n):
+        """Find items having (approximately) the largest inner products with a query.
+
+        Args:
+            V (numpy array; (n_item, k)): Item factors.
+            q (numpy array; (k,)): Query (i.e. user) factors.
+            top_n (int): Number of items to return.
+
+        Returns:
+            (numpy array, numpy array) : (Sorted list of items, Sorted scores).
+
+        """
+        if not self.built:
+            self.build(V)
+        if not self.built:
+            return np.zeros(0, dtype=int), np.zeros(0)
+
+        n_list = len(self.centroids)
+        centroid_scores = np.dot(self.centroids, q)
+        if self.n_probe < n_list:
+            probes = np.argpartition(centroid_scores, n_list - self.n_probe)[n_list - self.n_probe:]
+        else:
+            probes = np.arange(n_list)
+
+        candidates = np.concatenate([self.lists[p][:self.sizes[p]] for p in probes])
+        scores = np.dot(V[candidates], q)
+
+        if top_n < len(scores):
+            top_indices = np.argpartition(scores, len(scores) - top_n)[len(scores) - top_n:]
+        else:
+            top_indices = np.arange(len(scores))
+        sorted_indices = top_indices[np.argsort(scores[top_indices])[::-1]]
+
+        return candidates[sorted_indices], scores[sorted_indices]
+
+    def __normalize(self, X):
+        norm = np.sqrt(np.sum(X ** 2, axis=1, keepdims=True))
+        return X / np.maximum(norm, 1e-12)
+
+    def __add(self, row, cluster):
+        size = self.sizes[cluster]
+        self.lists[cluster] = ensure_index(self.lists[cluster], size)
+        self.lists[cluster][size] = row
+        self.position[row] = size
+        self.assignment[row] = cluster
+        self.sizes[cluster] = size + 1
+
+    def __remove(self, row, cluster):
+        # move the last member into the hole
+        last_position = self.sizes[cluster] - 1
+        last = self.lists[cluster][last_position]
+        self.lists[cluster][self.position[row]] = last
+        self.position[last] = self.position[row]
+        self.sizes[cluster] = last_position
+
+
+class ItemIndexMixin(object):
+
+    """Item index and batch scoring shared by the models scoring users and items by inner products of factors.
+
+    The user and item factor matrices are the attributes named by `factor_names`. An item index
+    attached by `register_item_index` must be kept in sync by calling `update_item_index` with
+    the rows of the item factors which are added or changed.
+
+    """
+
+    # attributes holding the (n_user, k) user factors and the (n_item, k) item factors
+    factor_names = ('A', 'B')
+
+    # index for maximum inner product search over the item factors, if any
+    item_index = None
+
+    def update_item_index(self, rows):
+        """Reassign changed rows of the item factors in the attached item index, if any.
+
+        Args:
+            rows (int or numpy array): Item IDs.
+
+        """
+        if self.item_index is not None:
+            self.item_index.update(getattr(self, self.factor_names[1]), rows)
+
+    def register_item_index(self, item_index):
+        """Attach an item index (e.g. `IVFIndex`) used by `recommend_top`, and build it.
+
+        The index is kept in sync with the item factors as items are registered and updated.
+
+        Args:
+            item_index (IVFIndex): Index for maximum inner product search over the item factors.
+
+        """
+        self.item_index = item_index
+        self.item_index.build(getattr(self, self.factor_names[1]))
+
+    def recommend_top(self, user, top_n):
+        """Recommend the best items of the whole catalog.
+
+        With an item index attached, the items are (approximately) found in sublinear time;
+        otherwise, every item is scored.
+
+        Args:
+            user (User): Target user.
+            top_n (int): Number of items to recommend.
+        Returns:
+            (numpy array, numpy array) : (Sorted list of items, Sorted scores).
+
+        """
+        U, V = (getattr(self, name) for name in self.factor_names)
+        if self.item_index is not None:
+            return self.item_index.search(V, U[user.index], top_n)
+        return self.recommend(user, np.arange(len(V)), top_n=top_n)
+
+    def score_batch(self, users, candidates):
+        """Compute scores for many users by a single matrix product.
+
+        Args:
+            users (list of User): Target users.
+            candidates (numpy array or scipy CSR matrix): Shared candidates or per-user candidate lists.
+        Returns:
+            numpy array or scipy CSR matrix: Scores as `RecommenderMixin.score_batch`.
+
+        """
+        U, V = (getattr(self, name) for name in self.factor_names)
+        return dot_scores(U[[user.index for user in users]], V, candidates)
@@ -40,35 +40,73 @@ class BaseProjection(object):
         """
         return
 
+    def reduce_sparse(self, indices, values):
+        """Make projection for an input vector given by its nonzero entries.
+
+        Args:
+            indices (numpy array; (nnz,)): Indices of the nonzero entries.
+            values (numpy array; (nnz,)): Values of the nonzero entries.
+
+        Returns:
+            numpy array; (k,): Projected vector.
+
+        """
+        y = sp.csc_matrix((values, indices, [0, len(indices)]), shape=(self.p, 1))
+        y = self.reduce(y)
+        return np.ravel(y.toarray() if sp.issparse(y) else y)
+
 
 class Raw(BaseProjection):
 
     def __init__(self, k, p):
         # k == p
-        self.E = np.identity(p)
+        self.p = p
 
     def insert_proj_col(self, offset):
-        pass
+        self.p += 1
 
     def reduce(self, Y):
-        return safe_sparse_dot(self.E, Y)
+        # identity; skip the O(p^2) product with E
+        return Y.copy()
+
+    def reduce_sparse(self, indices, values):
+        y = np.zeros(self.p)
+        y[indices] = values
+        return y
 
 
 class RandomProjection(BaseProjection):
 
     def __init__(self, k, p, density=0.2):
         self.k = k
+        self.p = p
         self.density = density
         self.R = sp.csr_matrix(self.__create_proj_mat((k, p)))
 
+        # columns of R for `reduce_sparse`
+        self.R_csc = self.R.tocsc()
+
     def insert_proj_col(self, offset):
         col = self.__create_proj_mat((self.k, 1))
         R = self.R.toarray()
         self.R = sp.csr_matrix(np.concatenate((R[:, :offset], col, R[:, offset:]), axis=1))
+        self.R_csc = self.R.tocsc()
+        self.p += 1
 
     def reduce(self, Y):
         return safe_sparse_dot(self.R, Y)
 
+    def reduce_sparse(self, indices, values):
+        # sum of the columns of R weighted by the values
+        R = self.R_csc
+        starts = R.indptr[indices]
+        lengths = R.indptr[np.asarray(indices) + 1] - starts
+        offsets = np.zeros(lengths.size, dtype=int)
+        np.cumsum(lengths[:-1], out=offsets[1:])
+        positions = np.repeat(starts - offsets, lengths) + np.arange(np.sum(lengths), dtype=int)
+        return np.bincount(R.indices[positions], weights=R.data[positions] * np.repeat(values, lengths),
+                           minlength=self.k)
+
     def __create_proj_mat(self, size):
         """Create a random projection matrix
 
@@ -92,6 +130,7 @@ class RandomMaclaurinProjection(BaseProjection):
 
     def __init__(self, k, p):
         self.k = k
+        self.p = p
 
         self.W1 = np.random.choice([1, -1], size=(k, p))
         self.W2 = np.random.choice([1, -1], size=(k, p))
@@ -103,6 +142,8 @@ class RandomMaclaurinProjection(BaseProjection):
         col = np.random.choice([1, -1], size=(self.k, 1))
         self.W2 = np.concatenate((self.W2[:, :offset], col, self.W2[:, offset:]), axis=1)
 
+        self.p += 1
+
     def reduce(self, Y):
         return safe_sparse_dot(self.W1, Y) * safe_sparse_dot(self.W2, Y) / np.sqrt(self.k)
 
@@ -111,6 +152,7 @@ class TensorSketchProjection(BaseProjection):
 
     def __init__(self, k, p):
         self.k = k
+        self.p = p
 
         self.h1 = np.random.choice(range(k), size=p)
         self.h2 = np.random.choice(range(k), size=p)
@@ -131,6 +173,8 @@ class TensorSketchProjection(BaseProjection):
         self.s1 = np.concatenate((self.s1[:offset], np.random.choice([1, -1], (1, )), self.s1[offset:]))
         self.s2 = np.concatenate((self.s2[:offset], np.random.choice([1, -1], (1, )), self.s2[offset:]))
 
+        self.p += 1
+
     def reduce(self, Y):
         if sp.isspmatrix(Y):
             Y = Y.toarray()
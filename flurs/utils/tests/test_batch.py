@@ -0,0 +1,62 @@
+from unittest import TestCase
+import numpy as np
+from numpy.testing import assert_array_equal, assert_array_almost_equal
+
+import scipy.sparse as sp
+
+from flurs.utils.batch import conflict_free_rounds, dot_scores
+
+
+class BatchTestCase(TestCase):
+
+    def test_conflict_free_rounds(self):
+        users = np.array([0, 1, 0, 2, 1])
+        items = np.array([0, 0, 1, 2, 3])
+
+        rounds = conflict_free_rounds(users, items)
+        self.assertEqual(len(rounds), 3)
+        assert_array_equal(rounds[0], np.array([0, 3]))
+        assert_array_equal(rounds[1], np.array([1, 2]))
+        assert_array_equal(rounds[2], np.array([4]))
+
+    def test_shared_namespace(self):
+        users = np.array([0, 1])
+        items = np.array([[0, 1], [2, 0]])
+
+        rounds = conflict_free_rounds(users, items)
+        self.assertEqual(len(rounds), 2)
+
+    def test_chain(self):
+        # every event shares its user or its item with the previous one
+        i = np.arange(10000)
+        users, items = i // 2, (i + 1) // 2
+
+        rounds = conflict_free_rounds(users, items)
+        self.assertEqual(len(rounds), 10000)
+        assert_array_equal(np.concatenate(rounds), i)
+
+        # independent chains run side by side
+        rounds = conflict_free_rounds(np.r_[users, users + 10000], np.r_[items, items + 10000])
+        self.assertEqual(len(rounds), 10000)
+        assert_array_equal(rounds[1], np.array([1, 10001]))
+
+    def test_dot_scores(self):
+        rng = np.random.RandomState(0)
+        U = rng.normal(size=(40, 4))
+        V = rng.normal(size=(500, 4))
+
+        candidates = np.array([4, 2, 7])
+        assert_array_almost_equal(dot_scores(U, V, candidates), np.dot(U, V[candidates].T))
+
+        # overlapping lists (GEMM), disjoint lists of equal length (batched GEMV) and of various lengths
+        for lengths, n_item in [(rng.randint(0, 4, 40), 5), (np.full(40, 3), 500), (rng.randint(0, 4, 40), 500)]:
+            indptr = np.append(0, np.cumsum(lengths))
+            indices = rng.permutation(500)[:indptr[-1]] % n_item
+            csr = sp.csr_matrix((np.ones(indices.size), indices, indptr), shape=(40, 500))
+
+            scores = dot_scores(U, V, csr)
+            assert_array_equal(scores.indices, indices)
+            assert_array_equal(scores.indptr, indptr)
+            for u in range(40):
+                items = indices[indptr[u]:indptr[u + 1]]
+                assert_array_almost_equal(scores.data[indptr[u]:indptr[u + 1]], np.dot(V[items], U[u]))
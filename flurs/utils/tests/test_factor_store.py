@@ -0,0 +1,40 @@
+from unittest import TestCase
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from flurs.utils.factor_store import FactorStore
+
+
+class FactorStoreTestCase(TestCase):
+
+    def setUp(self):
+        self.k = 4
+        self.store = FactorStore(self.k, capacity=2)
+
+    def test_grow(self):
+        self.assertEqual(self.store.matrix.shape, (0, self.k))
+
+        A = self.store.grow(3)
+        self.assertEqual(A.shape, (3, self.k))
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(self.store.capacity, 4)
+
+        A = self.store.grow(5)
+        self.assertEqual(A.shape, (5, self.k))
+        self.assertEqual(self.store.capacity, 8)
+
+        # shrinking is not allowed
+        A = self.store.grow(1)
+        self.assertEqual(A.shape, (5, self.k))
+
+    def test_keep_rows(self):
+        A = self.store.grow(2)
+        A[1] = np.arange(self.k)
+
+        A = self.store.grow(100)
+        assert_array_equal(A[1], np.arange(self.k))
+
+    def test_view(self):
+        A = self.store.grow(2)
+        A[0] = 1.
+        assert_array_equal(self.store.buffer[0], np.ones(self.k))
@@ -0,0 +1,34 @@
+from unittest import TestCase
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from flurs.utils.feature_store import FeatureStore
+
+
+class FeatureStoreTestCase(TestCase):
+
+    def test_select(self):
+        store = FeatureStore(3)
+        vectors = {0: np.array([1., 0., 2.]), 2: np.array([0., 0., 0.]), 5: np.array([0., 3., 0.])}
+        for col, vector in vectors.items():
+            store.set(col, vector)
+        self.assertEqual(store.n_col, 6)
+
+        assert_array_equal(store.select([5, 0, 2, 1]).toarray(),
+                           np.array([vectors[5], vectors[0], vectors[2], np.zeros(3)]).T)
+
+        # a column set again is replaced
+        store.set(0, np.array([0., 4., 0.]))
+        assert_array_equal(store.select([0]).toarray().ravel(), [0., 4., 0.])
+
+    def test_dimensions(self):
+        store = FeatureStore(2)
+        self.assertRaises(ValueError, store.set, 0, np.zeros(3))
+
+    def test_contains(self):
+        store = FeatureStore(2)
+        store.set(3, np.array([1., 0.]))
+        self.assertIn(3, store)
+        self.assertNotIn(0, store)
+        self.assertNotIn(4, store)
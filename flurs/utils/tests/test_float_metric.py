@@ -0,0 +1,81 @@
+from unittest import TestCase
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from flurs.utils.float_metric import FloatMean, FloatSTD, FloatMeanBank, FloatSTDBank
+
+
+class FloatMetricBankTestCase(TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.ids = rng.randint(0, 20, 300)
+        self.values = rng.normal(size=300)
+
+    def replay(self, decay):
+        means = {}
+        stds = {}
+        for i, v in zip(self.ids, self.values):
+            if i not in means:
+                means[i] = FloatMean(decay)
+                stds[i] = FloatSTD(means[i])
+            means[i].next(v)
+            stds[i].next(v)
+        return means, stds
+
+    def test_register(self):
+        mean = FloatMeanBank(0.9)
+        mean.register(41)
+        self.assertGreaterEqual(len(mean), 42)
+        assert_allclose(mean.get(np.arange(42)), 0.)
+
+    def test_update_one_by_one(self):
+        means, stds = self.replay(0.9)
+
+        mean = FloatMeanBank(0.9)
+        std = FloatSTDBank(mean)
+        for i, v in zip(self.ids, self.values):
+            mean.register(i)
+            std.register(i)
+            mean.update(i, v)
+            std.update(i, v)
+
+        for i in means:
+            self.assertAlmostEqual(mean.get(i), means[i].get())
+            self.assertAlmostEqual(std.get(i), stds[i].get())
+
+    def test_next_repeated_ids(self):
+        means, _ = self.replay(0.9)
+
+        mean = FloatMeanBank(0.9)
+        mean.register(self.ids)
+        mean.next(self.ids, self.values)
+
+        for i in means:
+            self.assertAlmostEqual(mean.get(i), means[i].get())
+
+    def test_std_next_repeated_ids(self):
+        means, stds = self.replay(0.9)
+
+        mean = FloatMeanBank(0.9)
+        std = FloatSTDBank(mean)
+        mean.register(self.ids)
+        std.register(self.ids)
+        with self.assertRaises(ValueError):
+            std.next(self.ids, self.values)
+
+        std.next_with_mean(self.ids, self.values)
+        for i in means:
+            self.assertAlmostEqual(mean.get(i), means[i].get())
+            self.assertAlmostEqual(std.get(i), stds[i].get())
+
+        # distinct ids read the mean as updated by the caller
+        ids = np.unique(self.ids)
+        values = np.arange(ids.size, dtype=float)
+        mean.next(ids, values)
+        std.next(ids, values)
+        for i, v in zip(ids, values):
+            means[i].next(v)
+            stds[i].next(v)
+            self.assertAlmostEqual(std.get(i), stds[i].get())
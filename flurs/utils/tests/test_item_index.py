@@ -0,0 +1,46 @@
+from unittest import TestCase
+import numpy as np
+from numpy.testing import assert_array_equal, assert_array_almost_equal
+
+from flurs.utils.item_index import IVFIndex
+
+
+class IVFIndexTestCase(TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.V = rng.normal(size=(400, 8))
+        self.q = rng.normal(size=8)
+
+    def members(self, index):
+        return np.sort(np.concatenate([index.lists[c][:index.sizes[c]] for c in range(len(index.centroids))]))
+
+    def test_build(self):
+        index = IVFIndex(rnd_seed=0)
+        index.build(self.V)
+
+        self.assertEqual(len(index.centroids), 20)
+        assert_array_equal(self.members(index), np.arange(400))
+
+    def test_exhaustive_search(self):
+        index = IVFIndex(n_probe=20, rnd_seed=0)
+        index.build(self.V)
+
+        items, scores = index.search(self.V, self.q, 10)
+        expected = np.argsort(np.dot(self.V, self.q))[::-1][:10]
+        assert_array_equal(items, expected)
+        assert_array_almost_equal(scores, np.dot(self.V[expected], self.q))
+
+    def test_update(self):
+        index = IVFIndex(n_probe=1, rnd_seed=0)
+        index.build(self.V)
+
+        # move an item right next to the centroid a query probes first, and add a new one
+        best = np.argmax(np.dot(index.centroids, self.q))
+        V = np.vstack((self.V, 100. * index.centroids[best]))
+        V[3] = 50. * index.centroids[best]
+        index.update(V, np.array([3, 400]))
+
+        assert_array_equal(self.members(index), np.arange(401))
+        items, _ = index.search(V, self.q, 2)
+        assert_array_equal(items, [400, 3])
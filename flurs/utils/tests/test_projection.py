@@ -1,5 +1,6 @@
 from unittest import TestCase
 import numpy as np
+from numpy.testing import assert_allclose
 
 from flurs.utils.projection import Raw, RandomProjection, RandomMaclaurinProjection, TensorSketchProjection
 
@@ -30,3 +31,12 @@ class ProjectionsTestCase(TestCase):
         proj = TensorSketchProjection(self.k, self.p)
         Y_ = proj.reduce(self.Y)
         self.assertEqual(Y_.shape, (self.k, self.Y.shape[1]))
+
+    def test_reduce_sparse(self):
+        y = np.zeros(self.p)
+        y[[3, 10, 41]] = [1., -2., .5]
+        indices = np.flatnonzero(y)
+
+        for proj in [Raw(self.k, self.p), RandomProjection(self.k, self.p),
+                     RandomMaclaurinProjection(self.k, self.p), TensorSketchProjection(self.k, self.p)]:
+            assert_allclose(proj.reduce_sparse(indices, y[indices]), np.ravel(proj.reduce(y[:, np.newaxis])))
@@ -0,0 +1,60 @@
+from unittest import TestCase
+import logging
+
+from flurs.utils.trace import Tracer
+
+
+class ListHandler(logging.Handler):
+
+    def __init__(self):
+        super(ListHandler, self).__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class TracerTestCase(TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger('flurs.tests.trace')
+        self.logger.propagate = False
+        self.handler = ListHandler()
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+
+    def trace_events(self, trace, n):
+        for i in range(n):
+            trace.count('event')
+            if trace.enabled and trace.emit():
+                trace.log('event %d', i)
+
+    def test_disabled(self):
+        self.logger.setLevel(logging.INFO)
+        trace = Tracer(self.logger)
+        self.assertFalse(trace.enabled)
+        self.trace_events(trace, 5)
+        self.assertEqual(self.handler.messages, [])
+        self.assertEqual(trace.counts['event'], 5)
+
+        # the guard follows the logger configuration only on refresh
+        self.logger.setLevel(logging.DEBUG)
+        self.assertFalse(trace.enabled)
+        trace.refresh()
+        self.assertTrue(trace.enabled)
+
+    def test_sampled(self):
+        self.logger.setLevel(logging.INFO)
+        trace = Tracer(self.logger)
+        trace.sample(3, logging.INFO)
+        self.assertTrue(trace.enabled)
+        self.trace_events(trace, 7)
+        self.assertEqual(self.handler.messages, ['event 0', 'event 3', 'event 6'])
+
+        trace.sample(1)
+        self.trace_events(trace, 2)
+        self.assertEqual(self.handler.messages[3:], ['event 0', 'event 1'])
+
+        self.assertRaises(ValueError, trace.sample, 0)
@@ -0,0 +1,74 @@
+import logging
+
+from collections import Counter
+
+
+class Tracer(object):
+
+    """Level-guarded logging and counters for per-event code paths.
+
+    Whether the logger is enabled for the level is computed once (and again by `refresh`
+    or `sample`), so that a disabled trace costs a single attribute check per event;
+    messages take %-style arguments which are only formatted when a record is emitted.
+    Callers keep expensive arguments behind the guard::
+
+        if trace.enabled and trace.emit():
+            trace.log('Validating %s, A=%s', e, rec.A.shape)
+
+    Counters are always maintained, independently of the logging level.
+
+    In the sampled mode, only 1 in `every` guarded calls emits a record, e.g. to keep
+    an eye on a long run at INFO level.
+
+    """
+
+    def __init__(self, logger, level=logging.DEBUG, every=1):
+        """Set/initialize parameters.
+
+        Args:
+            logger (logging.Logger): Logger which receives the records.
+            level (int): Level of the records.
+            every (int): Emit 1 in `every` guarded calls.
+
+        """
+        self.logger = logger
+        self.counts = Counter()
+        self.sample(every, level)
+
+    def refresh(self):
+        """Recompute the guard after a change of the logger configuration.
+        """
+        self.enabled = self.logger.isEnabledFor(self.level)
+
+    def sample(self, every, level=None):
+        """Switch to (or out of, with `every=1`) the sampled trace mode.
+
+        Args:
+            every (int): Emit 1 in `every` guarded calls.
+            level (int): Level of the records; unchanged if not given.
+
+        """
+        if every < 1:
+            raise ValueError('every must be a positive integer: %s' % every)
+        self.every = every
+        if level is not None:
+            self.level = level
+        self.n_call = 0
+        self.refresh()
+
+    def emit(self):
+        """Check if the current guarded call is sampled; the first call always is.
+
+        Returns:
+            boolean: Whether a record should be emitted.
+
+        """
+        n_call = self.n_call
+        self.n_call = n_call + 1
+        return n_call % self.every == 0
+
+    def log(self, msg, *args):
+        self.logger.log(self.level, msg, *args)
+
+    def count(self, name, n=1):
+        self.counts[name] += n